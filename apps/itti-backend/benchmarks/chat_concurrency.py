@@ -0,0 +1,82 @@
+"""
+Concurrency benchmark for the /chat endpoint.
+
+Drives the FastAPI app in-process against a fake chat model with a fixed
+latency and reports throughput for an increasing number of concurrent clients.
+With the async generation path, throughput should scale roughly linearly with
+concurrency; the blocking path stays flat at ~1 / latency requests per second.
+
+Usage (from apps/itti-backend):
+    uv run python -m benchmarks.chat_concurrency --latency 0.2 --requests 64
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+
+import httpx
+
+from itti_backend.main import app, get_llm, get_response_cache
+from itti_backend.models.fintech_models import CustomerQuery
+from itti_backend.services.fake_llm import FakeLatencyChatModel
+from itti_backend.services.prompt_service import PromptService
+
+CONCURRENCY_LEVELS = [1, 2, 4, 8, 16, 32]
+QUERY = {"text": "Hola, quiero saber los beneficios de la tarjeta de débito"}
+
+
+async def _run_level(
+    client: httpx.AsyncClient, path: str, total: int, concurrency: int
+) -> float:
+    """Sends `total` requests with at most `concurrency` in flight; returns RPS."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _one() -> None:
+        async with semaphore:
+            response = await client.post(path, json=QUERY)
+            response.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(_one() for _ in range(total)))
+    return total / (time.perf_counter() - start)
+
+
+async def main(latency: float, total: int) -> None:
+    fake_llm = FakeLatencyChatModel(latency=latency)
+    app.dependency_overrides[get_llm] = lambda: fake_llm
+    # Every request sends the same query, so bypass the response cache
+    app.dependency_overrides[get_response_cache] = lambda: None
+
+    # Reproduces the previous behaviour: the blocking call inside `async def`.
+    blocking_service = PromptService(llm_client=fake_llm)
+
+    @app.post("/_bench/blocking-chat")
+    async def _blocking_chat(query: CustomerQuery):
+        return blocking_service.generate_response(query)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", timeout=None
+    ) as client:
+        print(f"Fake LLM latency: {latency * 1000:.0f} ms, {total} requests/level")
+        print(f"{'clients':>8} | {'async /chat RPS':>16} | {'blocking RPS':>13}")
+        print("-" * 44)
+        for concurrency in CONCURRENCY_LEVELS:
+            async_rps = await _run_level(client, "/chat", total, concurrency)
+            blocking_rps = await _run_level(
+                client, "/_bench/blocking-chat", total, concurrency
+            )
+            print(f"{concurrency:>8} | {async_rps:>16.1f} | {blocking_rps:>13.1f}")
+
+    app.dependency_overrides.clear()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds per call")
+    parser.add_argument("--requests", type=int, default=64, help="Requests per level")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    asyncio.run(main(args.latency, args.requests))
@@ -0,0 +1,74 @@
+"""
+Per-request overhead of /vuelaconnosotros/chat: per-request vs shared service.
+
+"Per-request" reproduces the previous behaviour, which built a new
+ChatbotService, its graph and its LLM-backed components for every call.
+"Shared" uses one application-scoped service, as the app does.
+Every component uses a zero-latency fake chat model, so only framework overhead
+is measured. Session state across requests is covered by
+tests/test_chatbot_service.py.
+
+Usage (from apps/itti-backend):
+    uv run python -m benchmarks.chatbot_service_overhead --requests 500
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+
+import httpx
+
+from itti_backend.api.chatbot_routes import get_chatbot_service
+from itti_backend.main import app
+from itti_backend.orchestrator.chatbot_graph import create_chatbot_graph
+from itti_backend.orchestrator.node_registry import NodeRegistry
+from itti_backend.services.chatbot_service import ChatbotService
+from itti_backend.services.fake_llm import FakeLatencyChatModel
+
+PATH = "/vuelaconnosotros/chat"
+
+
+def _build_service() -> ChatbotService:
+    """Builds a service whose components all answer 'saludo' instantly."""
+    registry = NodeRegistry.from_llm(FakeLatencyChatModel(response_text="saludo"))
+    return ChatbotService(create_chatbot_graph(registry))
+
+
+async def _mean_latency_ms(client: httpx.AsyncClient, total: int) -> float:
+    start = time.perf_counter()
+    for i in range(total):
+        response = await client.post(
+            PATH, json={"message": "hola", "session_id": f"bench-{i}"}
+        )
+        response.raise_for_status()
+    return (time.perf_counter() - start) / total * 1000
+
+
+async def main(total: int) -> None:
+    # Stands in for the shared service, which would use the real Gemini clients
+    app.state.chatbot_service = _build_service()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        app.dependency_overrides[get_chatbot_service] = _build_service
+        per_request_ms = await _mean_latency_ms(client, total)
+        app.dependency_overrides.clear()
+
+        shared_ms = await _mean_latency_ms(client, total)
+
+    print(f"Requests: {total}")
+    print(f"Per-request service: {per_request_ms:.2f} ms/request")
+    print(f"Shared service:      {shared_ms:.2f} ms/request")
+    print(f"Overhead removed:    {per_request_ms - shared_ms:.2f} ms/request")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=500, help="Requests per mode")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    asyncio.run(main(args.requests))
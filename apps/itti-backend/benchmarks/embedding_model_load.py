@@ -0,0 +1,79 @@
+"""
+Cold vs warm latency of /testing/run-single with the shared embedding model.
+
+"Cold" is the first request in the process, which loads the embedding model
+and the dataset. "Warm" requests reuse both from the process-wide registry.
+The "per-request load" row reproduces the previous behaviour, where every
+request built a new SentenceTransformer and re-read the CSV dataset. The LLM is
+a zero-latency fake, so only evaluator setup and scoring are measured.
+
+Usage (from apps/itti-backend):
+    uv run python -m benchmarks.embedding_model_load --requests 20
+"""
+
+import argparse
+import asyncio
+import logging
+import resource
+import time
+
+import httpx
+import pandas as pd
+from sentence_transformers import SentenceTransformer
+
+from itti_backend.main import app, get_llm
+from itti_backend.services.comprehensive_evaluator import DATASET_PATH
+from itti_backend.services.embedding_models import DEFAULT_EMBEDDING_MODEL
+from itti_backend.services.fake_llm import FakeLatencyChatModel
+
+QUERY = {"text": "Hola, quiero saber los beneficios de la tarjeta de débito"}
+
+
+async def _request_ms(client: httpx.AsyncClient) -> float:
+    start = time.perf_counter()
+    response = await client.post("/testing/run-single", json=QUERY)
+    response.raise_for_status()
+    return (time.perf_counter() - start) * 1000
+
+
+def _per_request_load_ms(runs: int) -> float:
+    """Mean cost of the previous per-request model and dataset load."""
+    start = time.perf_counter()
+    for _ in range(runs):
+        SentenceTransformer(DEFAULT_EMBEDDING_MODEL)
+        pd.read_csv(DATASET_PATH)
+    return (time.perf_counter() - start) / runs * 1000
+
+
+async def main(total: int, baseline_runs: int) -> None:
+    fake_llm = FakeLatencyChatModel()
+    app.dependency_overrides[get_llm] = lambda: fake_llm
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", timeout=None
+    ) as client:
+        cold_ms = await _request_ms(client)
+        warm = [await _request_ms(client) for _ in range(total)]
+    app.dependency_overrides.clear()
+
+    warm_ms = sum(warm) / len(warm)
+    load_ms = _per_request_load_ms(baseline_runs)
+    print(f"Cold request (loads model):     {cold_ms:8.1f} ms")
+    print(f"Warm request (shared model):    {warm_ms:8.1f} ms")
+    print(f"Per-request load (previous):  + {load_ms:8.1f} ms")
+    # ru_maxrss is reported in kilobytes on Linux
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"Peak RSS:                       {peak_mb:8.1f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=20, help="Warm requests")
+    parser.add_argument(
+        "--baseline-runs", type=int, default=3, help="Per-request loads to time"
+    )
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    asyncio.run(main(args.requests, args.baseline_runs))
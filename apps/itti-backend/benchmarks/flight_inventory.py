@@ -0,0 +1,155 @@
+"""
+Lookup latency of the flight inventory behind the flight tools.
+
+Generates a synthetic inventory (or opens one built with
+`benchmarks.generate_flight_inventory`) and times `--lookups` random flight
+status, reservation and availability lookups, half of them for keys that don't
+exist; status and reservation lookups give no date, as the tools do, so they
+look for the next departure. Then `--threads` threads run status lookups at
+once, each on its own connection. The run fails if a p99 is above
+`--max-p99-us`. That every query is an index search and finds the stored rows
+is covered by tests/test_flight_inventory.py.
+
+Usage (from apps/itti-backend):
+    uv run python -m benchmarks.flight_inventory --flights 100000 --passengers 20
+    uv run python -m benchmarks.flight_inventory --db inventory.sqlite
+"""
+
+import argparse
+import logging
+import os
+import random
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.generate_flight_inventory import write_inventory
+from itti_backend.services.flight_inventory import FlightInventory
+
+
+def _sample(inventory: FlightInventory, count: int) -> list[tuple]:
+    flights = inventory._conn.execute(
+        "SELECT flight_number, origin, destination, date FROM flights "
+        "ORDER BY random() LIMIT ?",
+        (count,),
+    ).fetchall()
+    rows = []
+    for flight in flights:
+        passenger = inventory._conn.execute(
+            "SELECT passenger_name FROM reservations "
+            "WHERE flight_number = ? AND date = ? LIMIT 1",
+            (flight[0], flight[3]),
+        ).fetchone()
+        if passenger:
+            rows.append((*flight, passenger[0]))
+    if not rows:
+        raise SystemExit("The inventory has no reservations")
+    return rows
+
+
+def _time(lookup, arguments: list[tuple]) -> list[float]:
+    latencies = []
+    for args in arguments:
+        start = time.perf_counter()
+        lookup(*args)
+        latencies.append((time.perf_counter() - start) * 1e6)
+    return latencies
+
+
+def _concurrent_rate(inventory: FlightInventory, numbers: list[str], threads: int):
+    def run(chunk: list[str]) -> None:
+        for number in chunk:
+            inventory.flight_status(number)
+
+    chunks = [numbers[i::threads] for i in range(threads)]
+    with ThreadPoolExecutor(threads) as pool:
+        # Open every thread's connection before timing
+        list(pool.map(run, [chunk[:1] for chunk in chunks]))
+        start = time.perf_counter()
+        list(pool.map(run, chunks))
+    return len(numbers) / (time.perf_counter() - start)
+
+
+def main(db: str, lookups: int, threads: int, max_p99_us: float) -> None:
+    inventory = FlightInventory(db)
+    flights, reservations = inventory.counts()
+    print(f"{flights} flights, {reservations} reservations")
+    rows = _sample(inventory, lookups)
+
+    rng = random.Random(0)
+    half = [rng.choice(rows) for _ in range(lookups // 2)]
+    missing = [
+        (f"ZZ{i % 9000 + 1000}", "Nadie Nadie", "XXX", "2030-01-01")
+        for i in range(lookups // 2)
+    ]
+    print(f"{'lookup':>20} | {'p50 µs':>8} | {'p99 µs':>8} | {'max µs':>8}")
+    print("-" * 54)
+    failed = []
+    for name, lookup, arguments in [
+        (
+            "flight_status",
+            inventory.flight_status,
+            [(r[0],) for r in half] + [(m[0],) for m in missing],
+        ),
+        (
+            "reservation",
+            inventory.reservation,
+            [(r[0], r[4]) for r in half] + [(m[0], m[1]) for m in missing],
+        ),
+        (
+            "available_flights",
+            inventory.available_flights,
+            [r[1:4] for r in half] + [(m[2], m[2], m[3]) for m in missing],
+        ),
+    ]:
+        rng.shuffle(arguments)
+        latencies = _time(lookup, arguments)
+        p50 = statistics.median(latencies)
+        p99 = statistics.quantiles(latencies, n=100)[98]
+        print(f"{name:>20} | {p50:>8.1f} | {p99:>8.1f} | {max(latencies):>8.1f}")
+        if p99 > max_p99_us:
+            failed.append(name)
+
+    numbers = [r[0] for r in half]
+    single = _concurrent_rate(inventory, numbers, 1)
+    concurrent = _concurrent_rate(inventory, numbers, threads)
+    print(
+        f"flight_status: {single:,.0f} lookups/s in 1 thread, "
+        f"{concurrent:,.0f} lookups/s in {threads} threads"
+    )
+    inventory.close()
+    if failed:
+        raise SystemExit(f"p99 above {max_p99_us:.0f} µs: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--db", help="Existing inventory (default: generate one)")
+    parser.add_argument("--flights", type=int, default=100_000, help="Flights")
+    parser.add_argument(
+        "--passengers", type=int, default=20, help="Reservations per flight"
+    )
+    parser.add_argument(
+        "--departures", type=int, default=7, help="Days each flight number flies"
+    )
+    parser.add_argument("--lookups", type=int, default=20_000, help="Per lookup")
+    parser.add_argument("--threads", type=int, default=8, help="Concurrent lookups")
+    parser.add_argument("--max-p99-us", type=float, default=1000, help="Budget")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    if args.db:
+        main(args.db, args.lookups, args.threads, args.max_p99_us)
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            db = os.path.join(directory, "inventory.sqlite")
+            start = time.perf_counter()
+            write_inventory(
+                db,
+                flights=args.flights,
+                passengers=args.passengers,
+                departures=args.departures,
+            )
+            print(f"Generated in {time.perf_counter() - start:.1f} s")
+            main(db, args.lookups, args.threads, args.max_p99_us)
@@ -0,0 +1,91 @@
+"""
+Flight status burst through the travel graph: threaded vs async tools, cold vs cached.
+
+`--users` sessions ask for the status of different flights at the same time,
+with a simulated flight-ops backend latency. The previous path runs the agent
+node in the graph's thread pool, so at most a handful of tool calls wait at
+once; the async path awaits them on the event loop. The burst is run again
+with a warm cache. The cache semantics (hits, negative hits, copies,
+invalidation, coalesced misses) are covered by tests/test_flight_tools.py.
+
+Usage (from apps/itti-backend):
+    uv run python -m benchmarks.flight_tool_cache --users 32 --latency 0.3
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from functools import partial
+
+from itti_backend.agents import tools
+from itti_backend.agents.base_agent import BaseAgent
+from itti_backend.agents.flight_change_agent import FlightChangeAgent
+from itti_backend.agents.flight_status_agent import FlightStatusAgent
+from itti_backend.nlu.intent_classifier import IntentClassifier
+from itti_backend.orchestrator.chatbot_graph import create_chatbot_graph
+from itti_backend.orchestrator.node_registry import NodeRegistry
+from itti_backend.services.chatbot_service import ChatbotService
+from itti_backend.services.fake_llm import FakeLatencyChatModel
+
+
+def _build_service(llm: FakeLatencyChatModel, threaded: bool) -> ChatbotService:
+    registry = NodeRegistry(
+        classifier=IntentClassifier(llm=llm),
+        flight_status_agent=FlightStatusAgent(llm=llm),
+        flight_change_agent=FlightChangeAgent(llm=llm),
+    )
+    if threaded:
+        # The previous node: the sync agent in the graph's thread pool
+        agent = registry.flight_status_agent
+        agent.arun = partial(BaseAgent.arun, agent)
+    return ChatbotService(create_chatbot_graph(registry))
+
+
+async def _burst(service: ChatbotService, users: int, label: str) -> None:
+    start = time.perf_counter()
+    responses = await asyncio.gather(
+        *(
+            service.aprocess_message(
+                f"estado del vuelo VW{100 + i}", session_id=f"{label}-{i}"
+            )
+            for i in range(users)
+        )
+    )
+    elapsed = time.perf_counter() - start
+    if not all(responses):
+        raise SystemExit(f"{label}: empty responses")
+    print(f"{label:>18} | {users / elapsed:>9.1f} | {elapsed:>7.2f} s")
+
+
+async def main(users: int, latency: float, llm_latency: float) -> None:
+    tools.FLIGHT_OPS_LATENCY_SECONDS = latency
+    llm = FakeLatencyChatModel(
+        response_text="Tu vuelo está a tiempo.", latency=llm_latency
+    )
+    print(
+        f"{users} users, flight-ops latency {latency * 1000:.0f} ms, "
+        f"fake LLM latency {llm_latency * 1000:.0f} ms"
+    )
+    print(f"{'burst':>18} | {'msg/s':>9} | {'time':>9}")
+    print("-" * 42)
+    await _burst(_build_service(llm, threaded=True), users, "previous")
+    tools.clear_tool_caches()
+    service = _build_service(llm, threaded=False)
+    await _burst(service, users, "async cold")
+    await _burst(service, users, "async cached")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=32, help="Concurrent users")
+    parser.add_argument(
+        "--latency", type=float, default=0.3, help="Flight-ops seconds per call"
+    )
+    parser.add_argument(
+        "--llm-latency", type=float, default=0.05, help="Fake LLM seconds per call"
+    )
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    asyncio.run(main(args.users, args.latency, args.llm_latency))
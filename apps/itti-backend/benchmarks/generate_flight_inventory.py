@@ -0,0 +1,230 @@
+"""
+Synthetic flight inventory: flights on random routes and dates, and their passengers.
+
+Writes flights and reservations as CSV or Parquet files (to import with
+`python -m itti_backend.services.flight_inventory`), or straight into a SQLite
+inventory with --db. Rows are generated `--chunk-flights` flights at a time,
+so tens of millions of reservations never have to fit in memory. Flight
+numbers look like the ones the agents extract (two letters and four digits);
+each one flies on `--departures` consecutive days, and every passenger name is
+unique within its departure.
+
+Usage (from apps/itti-backend):
+    uv run python -m benchmarks.generate_flight_inventory --flights 500000 \\
+        --passengers 40 --db inventory.sqlite
+    uv run python -m benchmarks.generate_flight_inventory --flights 500000 \\
+        --output-dir inventory --format parquet
+"""
+
+import argparse
+import itertools
+import logging
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from itti_backend.services.flight_inventory import FlightInventory
+
+AIRPORTS = np.array(
+    [
+        "BUE", "MAD", "MIA", "ASU", "SCL", "LIM", "BOG", "GRU", "MEX", "JFK",
+        "BCN", "LAX", "CUN", "PTY", "MVD", "COR", "MDZ", "FCO", "CDG", "LHR",
+    ]
+)  # fmt: skip
+FIRST_NAMES = [
+    "Juan", "María", "José", "Ana", "Luis", "Carmen", "Carlos", "Lucía",
+    "Jorge", "Sofía", "Miguel", "Valentina", "Pedro", "Camila", "Diego", "Paula",
+]  # fmt: skip
+LAST_NAMES = [
+    "Pérez", "González", "Rodríguez", "Fernández", "López", "Martínez",
+    "Sánchez", "Gómez", "Díaz", "Romero", "Benítez", "Acosta", "Álvarez",
+    "Ruiz", "Torres", "Ramírez",
+]  # fmt: skip
+# "First Last Last" names, each passenger of a flight gets a different one
+PASSENGER_NAMES = np.array(
+    [
+        " ".join(parts)
+        for parts in itertools.product(FIRST_NAMES, LAST_NAMES, LAST_NAMES)
+    ]
+)
+STATUSES = np.array(["a tiempo", "programado", "demorado", "cancelado"])
+STATUS_WEIGHTS = [0.6, 0.2, 0.15, 0.05]
+FIRST_DATE = np.datetime64("2025-08-01")
+DATES = np.datetime_as_string(FIRST_DATE + np.arange(365))
+TIMES = np.array([f"{m // 60:02d}:{m % 60:02d}" for m in range(24 * 60)])
+# Four-digit numbers per two-letter prefix
+NUMBERS_PER_PREFIX = 9000
+MAX_FLIGHTS = 26 * 26 * NUMBERS_PER_PREFIX
+
+
+def flight_numbers(start: int, count: int, departures: int = 1) -> np.ndarray:
+    """Returns the flight numbers of flights `start` to `start + count`."""
+    index = np.arange(start, start + count) // departures
+    prefix = index // NUMBERS_PER_PREFIX
+    letters = np.array([chr(65 + i) for i in range(26)], dtype=object)
+    return (
+        letters[prefix // 26]
+        + letters[prefix % 26]
+        + (1000 + index % NUMBERS_PER_PREFIX).astype(str).astype(object)
+    )
+
+
+def departure_dates(start: int, count: int, departures: int = 1) -> np.ndarray:
+    """Returns the dates of flights `start` to `start + count`, one day apart."""
+    index = np.arange(start, start + count)
+    # Spread flight numbers over the year; a number's departures never collide
+    first_day = (index // departures * 7919) % (len(DATES) - departures + 1)
+    return DATES[first_day + index % departures]
+
+
+def generate_flights(
+    start: int, count: int, rng: np.random.Generator, departures: int = 1
+) -> pd.DataFrame:
+    """Generates `count` flights with the inventory's FLIGHT_COLUMNS."""
+    origin = rng.integers(len(AIRPORTS), size=count)
+    destination = (origin + rng.integers(1, len(AIRPORTS), size=count)) % len(AIRPORTS)
+    departure = rng.integers(0, 24 * 12, size=count) * 5
+    arrival = (departure + rng.integers(12, 14 * 12, size=count) * 5) % (24 * 60)
+    return pd.DataFrame(
+        {
+            "flight_number": flight_numbers(start, count, departures),
+            "origin": AIRPORTS[origin],
+            "destination": AIRPORTS[destination],
+            "date": departure_dates(start, count, departures),
+            "departure": TIMES[departure],
+            "arrival": TIMES[arrival],
+            "status": rng.choice(STATUSES, size=count, p=STATUS_WEIGHTS),
+            "seats_available": rng.integers(0, 40, size=count),
+        }
+    )
+
+
+def generate_reservations(
+    start: int, flights: pd.DataFrame, passengers: int
+) -> pd.DataFrame:
+    """Generates `passengers` reservations per flight, with distinct names."""
+    numbers = flights["flight_number"].to_numpy()
+    dates = flights["date"].to_numpy()
+    flight = np.repeat(np.arange(len(numbers)), passengers)
+    seat = np.tile(np.arange(passengers), len(numbers))
+    name = ((start + flight) * 7919 + seat) % len(PASSENGER_NAMES)
+    return pd.DataFrame(
+        {
+            "flight_number": numbers[flight],
+            "date": dates[flight],
+            "passenger_name": PASSENGER_NAMES[name],
+        }
+    )
+
+
+def generate(
+    flights: int,
+    passengers: int,
+    departures: int = 1,
+    chunk_flights: int = 50_000,
+    seed: int = 0,
+):
+    """
+    Yields (flights, reservations) frames, `chunk_flights` flights at a time.
+
+    Args:
+        flights: Number of flights (departures, not flight numbers).
+        passengers: Reservations per flight.
+        departures: Consecutive days each flight number flies.
+        chunk_flights: Flights per yielded chunk.
+        seed: Seed of the random routes, times and statuses.
+    """
+    if not 1 <= departures <= len(DATES):
+        raise ValueError(f"Between 1 and {len(DATES)} departures per flight number")
+    if flights > MAX_FLIGHTS * departures:
+        raise ValueError(f"At most {MAX_FLIGHTS} distinct flight numbers")
+    if passengers > len(PASSENGER_NAMES):
+        raise ValueError(f"At most {len(PASSENGER_NAMES)} passengers per flight")
+    rng = np.random.default_rng(seed)
+    for start in range(0, flights, chunk_flights):
+        count = min(chunk_flights, flights - start)
+        frame = generate_flights(start, count, rng, departures)
+        yield frame, generate_reservations(start, frame, passengers)
+
+
+def write_inventory(db: str, **kwargs) -> tuple[int, int]:
+    """Generates an inventory into the SQLite database `db`; returns row counts."""
+    inventory = FlightInventory(db)
+    for flights, reservations in generate(**kwargs):
+        inventory.insert_flights(flights)
+        inventory.insert_reservations(reservations)
+    inventory.analyze()
+    counts = inventory.counts()
+    inventory.close()
+    return counts
+
+
+def write_files(output_dir: str, file_format: str, **kwargs) -> tuple[int, int]:
+    """Generates flights and reservations files in `output_dir`; returns row counts."""
+    os.makedirs(output_dir, exist_ok=True)
+    paths = [
+        os.path.join(output_dir, f"{name}.{file_format}")
+        for name in ("flights", "reservations")
+    ]
+    writers = [None, None]
+    counts = [0, 0]
+    for frames in generate(**kwargs):
+        for i, frame in enumerate(frames):
+            if file_format == "csv":
+                mode = "a" if counts[i] else "w"
+                frame.to_csv(paths[i], mode=mode, header=not counts[i], index=False)
+            else:
+                import pyarrow as pa  # Optional: only needed for Parquet output
+                import pyarrow.parquet as pq
+
+                table = pa.Table.from_pandas(frame, preserve_index=False)
+                if writers[i] is None:
+                    writers[i] = pq.ParquetWriter(paths[i], table.schema)
+                writers[i].write_table(table)
+            counts[i] += len(frame)
+    for writer in writers:
+        if writer is not None:
+            writer.close()
+    return counts[0], counts[1]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--flights", type=int, default=100_000, help="Flights")
+    parser.add_argument(
+        "--passengers", type=int, default=20, help="Reservations per flight"
+    )
+    parser.add_argument(
+        "--departures", type=int, default=1, help="Days each flight number flies"
+    )
+    parser.add_argument("--chunk-flights", type=int, default=50_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--db", help="Write a SQLite inventory here")
+    parser.add_argument("--output-dir", help="Write flights/reservations files here")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    args = parser.parse_args()
+    if not args.db and not args.output_dir:
+        parser.error("Give --db and/or --output-dir")
+
+    logging.disable(logging.INFO)
+    options = {
+        "flights": args.flights,
+        "passengers": args.passengers,
+        "departures": args.departures,
+        "chunk_flights": args.chunk_flights,
+        "seed": args.seed,
+    }
+    for target in (args.db, args.output_dir):
+        if not target:
+            continue
+        start = time.perf_counter()
+        if target == args.db:
+            flights, reservations = write_inventory(target, **options)
+        else:
+            flights, reservations = write_files(target, args.format, **options)
+        elapsed = time.perf_counter() - start
+        print(
+            f"{target}: {flights} flights, {reservations} reservations, {elapsed:.1f} s"
+        )
@@ -0,0 +1,122 @@
+"""
+Upstream calls and prompt tokens of LLM intent classification, with micro-batching.
+
+`--users` threads (like LangGraph's sync node pool) each classify
+`--messages` different messages in a row, against a fake chat model that takes
+`--latency` seconds per call and answers batched prompts with a JSON list. The
+run compares upstream calls, prompt tokens and latency with batching off and
+on. The batching semantics (fan-out, full batches, fallbacks and errors) are
+covered by tests/test_intent_batching.py.
+
+Usage (from apps/itti-backend):
+    uv run python -m benchmarks.intent_batching --users 16 --messages 20
+"""
+
+import argparse
+import json
+import logging
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from itti_backend.nlu.intent_classifier import IntentClassifier
+from itti_backend.services.fake_llm import FakeLatencyChatModel
+
+# Messages the rule tier does not answer, with the intent the fake gives them
+TOPICS = [
+    (
+        "¿Me podrían decir si hay novedades del AR{} de mañana?",
+        "consultar_estado_vuelo",
+    ),
+    ("Quiero pasar mi reserva {} para otro día", "cambiar_vuelo"),
+    ("¿Cuántas valijas puedo llevar en la reserva {}?", "desconocida"),
+]
+
+
+def message(i: int) -> tuple[str, str]:
+    template, intent = TOPICS[i % len(TOPICS)]
+    return template.format(1000 + i), intent
+
+
+INTENTS = dict(message(i) for i in range(10_000))
+
+
+class BatchingFakeChatModel(FakeLatencyChatModel):
+    """Fake classifier: answers a JSON list of messages with a JSON list."""
+
+    calls: int = 0
+    input_tokens: int = 0
+
+    def _build_result(self, messages, tools=None):
+        text = str(messages[-1].content)
+        if text.startswith("["):
+            texts = json.loads(text)
+            answer = [INTENTS.get(t, "desconocida") for t in texts]
+            reply = json.dumps(answer)
+        else:
+            reply = INTENTS.get(text, "desconocida")
+        result = self.model_copy(update={"response_text": reply})
+        return FakeLatencyChatModel._build_result(result, messages, tools)
+
+    def _generate(self, messages: Any, *args: Any, **kwargs: Any):
+        self.calls += 1
+        result = super()._generate(messages, *args, **kwargs)
+        self.input_tokens += result.generations[0].message.usage_metadata[
+            "input_tokens"
+        ]
+        return result
+
+
+def classifier(llm: BatchingFakeChatModel, **settings: Any) -> IntentClassifier:
+    return IntentClassifier(llm=llm, use_fast_path=False, **settings)
+
+
+def _classify_all(
+    model: IntentClassifier, texts: list[str], threads: int
+) -> tuple[list[str], list[float]]:
+    def classify(text: str) -> tuple[str, float]:
+        start = time.perf_counter()
+        intent = model.classify(text)
+        return intent, time.perf_counter() - start
+
+    with ThreadPoolExecutor(threads) as pool:
+        results = list(pool.map(classify, texts))
+    return [intent for intent, _ in results], [latency for _, latency in results]
+
+
+def main(users: int, messages: int, latency: float, window_ms: float) -> None:
+    texts = [message(i)[0] for i in range(users * messages)]
+    print(
+        f"{users} users x {messages} messages; {latency * 1000:.0f} ms per call; "
+        f"{window_ms:g} ms window"
+    )
+    print(
+        f"{'batching':>10} | {'calls':>6} | {'prompt tokens':>13} | "
+        f"{'p50 ms':>7} | {'p99 ms':>7} | {'total s':>7}"
+    )
+    print("-" * 66)
+    for label, window in [("off", 0), ("on", window_ms)]:
+        llm = BatchingFakeChatModel(latency=latency)
+        model = classifier(llm, batch_window_ms=window, max_batch_size=users)
+        start = time.perf_counter()
+        _, latencies = _classify_all(model, texts, users)
+        elapsed = time.perf_counter() - start
+        cuts = statistics.quantiles(latencies, n=100)
+        print(
+            f"{label:>10} | {llm.calls:>6} | {llm.input_tokens:>13} | "
+            f"{statistics.median(latencies) * 1000:>7.0f} | "
+            f"{cuts[98] * 1000:>7.0f} | {elapsed:>7.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=16, help="Concurrent threads")
+    parser.add_argument("--messages", type=int, default=20, help="Per user")
+    parser.add_argument("--latency", type=float, default=0.2, help="Call seconds")
+    parser.add_argument("--window-ms", type=float, default=10, help="Batch window")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    main(args.users, args.messages, args.latency, args.window_ms)
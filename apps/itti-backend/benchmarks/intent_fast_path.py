@@ -0,0 +1,54 @@
+"""
+Accuracy and latency of the IntentClassifier rule tier.
+
+Prints the rule tier's answer for each few-shot example in the classifier
+prompt and the share it answers without the LLM, then times the tier per
+message. Its answers and fallbacks are covered by tests/test_intent_rules.py.
+
+Usage (from apps/itti-backend):
+    uv run python -m benchmarks.intent_fast_path --iterations 100000
+"""
+
+import argparse
+import time
+
+from itti_backend.nlu.intent_classifier import FEW_SHOT_EXAMPLES
+from itti_backend.nlu.intent_rules import IntentRuleMatcher
+
+
+def print_answers(matcher: IntentRuleMatcher) -> None:
+    """Prints the rule tier's answer for each few-shot example."""
+    for text, expected in FEW_SHOT_EXAMPLES:
+        predicted = matcher.match(text)
+        if predicted is None:
+            outcome = "LLM fallback"
+        elif predicted == expected:
+            outcome = "ok"
+        else:
+            outcome = f"WRONG ({predicted})"
+        print(f"  {text!r:50} -> {expected:24} {outcome}")
+
+
+def main(iterations: int) -> None:
+    matcher = IntentRuleMatcher()
+    print("Few-shot examples:")
+    print_answers(matcher)
+    stats = matcher.get_stats()
+    print(f"Coverage: {stats['hit_rate']:.0%} answered without the LLM")
+
+    texts = [text for text, _ in FEW_SHOT_EXAMPLES]
+    start = time.perf_counter()
+    for i in range(iterations):
+        matcher.match(texts[i % len(texts)])
+    elapsed = time.perf_counter() - start
+    print(f"Latency: {elapsed / iterations * 1e6:.1f} µs/message")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--iterations", type=int, default=100_000, help="Messages to time"
+    )
+    args = parser.parse_args()
+
+    main(args.iterations)
@@ -0,0 +1,146 @@
+"""
+Tail latency and availability of the LLM router, with scripted fake providers.
+
+Each fake provider follows a script of latencies and failures. The run sends
+`--requests` calls through a primary whose latency has a slow tail and a
+steady secondary, and compares the latency percentiles with those of the
+primary alone. Failover, hedging and the circuit breakers are covered by
+tests/test_llm_router.py.
+
+Usage (from apps/itti-backend):
+    uv run python -m benchmarks.llm_router --requests 400 --slow-rate 0.05
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import statistics
+import time
+from collections.abc import Iterator
+from typing import Any, Optional
+
+from langchain_core.messages import AIMessageChunk, HumanMessage
+from langchain_core.outputs import ChatGenerationChunk
+
+from itti_backend.services.fake_llm import FakeLatencyChatModel
+from itti_backend.services.llm_router import RouterChatModel
+
+MESSAGES = [HumanMessage(content="¿Cuál es el estado de mi vuelo?")]
+
+
+class ScriptedChatModel(FakeLatencyChatModel):
+    """Fake provider whose calls follow a script of (latency, succeeds) steps."""
+
+    script: Any = None  # Iterator of (latency, ok) steps
+    calls: int = 0
+
+    def _step(self) -> tuple[float, bool]:
+        self.calls += 1
+        return next(self.script)
+
+    def _raise(self) -> None:
+        raise RuntimeError(f"{self.response_text} failed")
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        latency, ok = self._step()
+        time.sleep(latency)
+        if not ok:
+            self._raise()
+        return self._build_result(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        latency, ok = self._step()
+        await asyncio.sleep(latency)
+        if not ok:
+            self._raise()
+        return self._build_result(messages)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        latency, ok = self._step()
+        await asyncio.sleep(latency)
+        if not ok:
+            self._raise()
+        yield ChatGenerationChunk(message=AIMessageChunk(content=self.response_text))
+
+
+def steady(latency: float, ok: bool = True) -> Iterator[tuple[float, bool]]:
+    while True:
+        yield latency, ok
+
+
+def tail(
+    fast: float, slow: float, slow_rate: float, seed: int = 0
+) -> Iterator[tuple[float, bool]]:
+    rng = random.Random(seed)
+    while True:
+        yield (slow if rng.random() < slow_rate else fast), True
+
+
+def provider(name: str, script: Iterator[tuple[float, bool]]) -> ScriptedChatModel:
+    return ScriptedChatModel(response_text=name, script=script)
+
+
+def router(*clients: ScriptedChatModel, **settings: Any) -> RouterChatModel:
+    return RouterChatModel(
+        clients=list(clients),
+        providers=[client.response_text for client in clients],
+        **settings,
+    )
+
+
+async def _latencies(model, requests: int, concurrency: int = 16) -> list[float]:
+    latencies: list[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def call() -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            await model.ainvoke(MESSAGES)
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(call() for _ in range(requests)))
+    return latencies
+
+
+def _row(label: str, latencies: list[float], hedges: Optional[int] = None) -> None:
+    cuts = statistics.quantiles(latencies, n=100)
+    hedged = "" if hedges is None else f"{hedges / len(latencies):.1%}"
+    print(
+        f"{label:>16} | {statistics.median(latencies) * 1000:>7.0f} | "
+        f"{cuts[94] * 1000:>7.0f} | {cuts[98] * 1000:>7.0f} | {hedged:>7}"
+    )
+
+
+async def main(requests: int, slow_rate: float, fast: float, slow: float) -> None:
+    print(
+        f"{requests} calls; primary {fast * 1000:.0f} ms, {slow_rate:.0%} at "
+        f"{slow * 1000:.0f} ms; secondary {fast * 1.5 * 1000:.0f} ms"
+    )
+    print(f"{'calls to':>16} | {'p50 ms':>7} | {'p95 ms':>7} | {'p99 ms':>7} | hedged")
+    print("-" * 58)
+    _row(
+        "primary only",
+        await _latencies(provider("p", tail(fast, slow, slow_rate)), requests),
+    )
+
+    primary = provider("primary", tail(fast, slow, slow_rate))
+    secondary = provider("secondary", steady(fast * 1.5))
+    model = router(primary, secondary, hedge_quantile=0.9, hedge_min_delay=fast)
+    # Warm-up, so the hedge delay comes from the primary's observed percentile
+    await _latencies(model, 50)
+    warm = secondary.calls
+    latencies = await _latencies(model, requests)
+    _row("router", latencies, hedges=secondary.calls - warm)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=400, help="Calls per run")
+    parser.add_argument("--slow-rate", type=float, default=0.05, help="Slow share")
+    parser.add_argument("--fast", type=float, default=0.05, help="Usual seconds")
+    parser.add_argument("--slow", type=float, default=1.0, help="Slow seconds")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    asyncio.run(main(args.requests, args.slow_rate, args.fast, args.slow))
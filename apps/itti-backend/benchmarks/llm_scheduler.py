@@ -0,0 +1,105 @@
+"""
+Chat latency during an evaluation run, with and without LLM priority classes.
+
+A fake provider is limited to `--rps` requests per second by a
+`PriorityRateLimiter`, as get_llm_client sets one up. The run sends
+`--evaluations` evaluation calls (`--concurrency` at a time) and, while they
+run, `--chats` chat calls, once with every call in the same class and once
+with the evaluation calls in the "evaluation" class, and compares the chat
+calls' latency. The limiter's admission order, token charging and reserve are
+covered by tests/test_llm_scheduler.py.
+
+Usage (from apps/itti-backend):
+    uv run python -m benchmarks.llm_scheduler --rps 20 --evaluations 100 --chats 20
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+from contextlib import nullcontext
+
+from langchain_core.messages import HumanMessage
+
+from itti_backend.services.fake_llm import FakeLatencyChatModel
+from itti_backend.services.llm_scheduler import PriorityRateLimiter, llm_priority
+
+MESSAGES = [HumanMessage(content="¿Cuáles son los beneficios de la tarjeta?")]
+
+
+def fake_client(limiter: PriorityRateLimiter, latency: float = 0.0):
+    return FakeLatencyChatModel(
+        latency=latency, rate_limiter=limiter, callbacks=[limiter.usage_callback]
+    )
+
+
+async def _run(
+    prioritized: bool,
+    rps: float,
+    evaluations: int,
+    chats: int,
+    concurrency: int,
+    latency: float,
+) -> tuple[list[float], float]:
+    limiter = PriorityRateLimiter("fake", requests_per_second=rps)
+    client = fake_client(limiter, latency)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def evaluate() -> None:
+        async with semaphore:
+            with llm_priority("evaluation") if prioritized else nullcontext():
+                await client.ainvoke(MESSAGES)
+
+    async def chat(delay: float) -> float:
+        await asyncio.sleep(delay)
+        start = time.perf_counter()
+        await client.ainvoke(MESSAGES)
+        return time.perf_counter() - start
+
+    # Chat calls arrive evenly while the evaluation run is using the budget
+    interval = 0.8 * evaluations / rps / chats
+    start = time.perf_counter()
+    evaluation = asyncio.gather(*(evaluate() for _ in range(evaluations)))
+    latencies = await asyncio.gather(*(chat(i * interval) for i in range(chats)))
+    await evaluation
+    return list(latencies), time.perf_counter() - start
+
+
+def _row(label: str, latencies: list[float], total: float) -> None:
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    print(
+        f"{label:>14} | {statistics.median(latencies) * 1000:>7.0f} | "
+        f"{cuts[98] * 1000:>7.0f} | {max(latencies) * 1000:>7.0f} | {total:>6.1f}"
+    )
+
+
+async def main(
+    rps: float, evaluations: int, chats: int, concurrency: int, latency: float
+) -> None:
+    print(
+        f"{rps:g} requests/s; {evaluations} evaluation calls, {concurrency} at a "
+        f"time; {chats} chat calls; {latency * 1000:.0f} ms per call"
+    )
+    print(f"{'classes':>14} | {'p50 ms':>7} | {'p99 ms':>7} | {'max ms':>7} | eval s")
+    print("-" * 56)
+    for label, prioritized in [("shared", False), ("prioritized", True)]:
+        latencies, total = await _run(
+            prioritized, rps, evaluations, chats, concurrency, latency
+        )
+        _row(label, latencies, total)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rps", type=float, default=20, help="Requests per second")
+    parser.add_argument("--evaluations", type=int, default=100, help="Eval calls")
+    parser.add_argument("--chats", type=int, default=20, help="Chat calls")
+    parser.add_argument("--concurrency", type=int, default=8, help="Eval in flight")
+    parser.add_argument("--latency", type=float, default=0.05, help="Call seconds")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    asyncio.run(
+        main(args.rps, args.evaluations, args.chats, args.concurrency, args.latency)
+    )
@@ -0,0 +1,311 @@
+"""
+HTTP load test for the chat, VuelaConNosotros and evaluation endpoints.
+
+By default the FastAPI app runs in-process with every LLM replaced by a
+deterministic fake chat model with `--latency` seconds of injected latency, so
+runs are offline and comparable between builds. Pass `--base-url` to target a
+live server instead (it then uses its own, real LLM).
+
+Two load models are supported:
+
+- Closed loop (default): `--concurrency` clients send requests back to back.
+- Open loop: `--rate` new sessions per second arrive on a Poisson schedule, with
+  at most `--concurrency` in flight. Latency is measured from the scheduled
+  arrival, so time spent queueing behind slow requests is included.
+
+The `travel` scenario replays multi-turn conversations (as in
+`test_app.run_conversational_flows`), each in its own session, turn by turn.
+The report (p50/p95/p99 latency, RPS, error rate, overall and per endpoint) is
+printed as JSON and can be written to a file with `--output`.
+
+Usage (from apps/itti-backend):
+    uv run python -m benchmarks.load_test --scenario chat --concurrency 16
+    uv run python -m benchmarks.load_test --scenario travel --rate 20 --duration 30
+    uv run python -m benchmarks.load_test --scenario evaluation-single \\
+        --base-url http://localhost:8000 --output load_test.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import random
+import sys
+import time
+import uuid
+from collections import defaultdict
+
+import httpx
+import numpy as np
+
+from itti_backend.agents.flight_change_agent import FlightChangeAgent
+from itti_backend.agents.flight_status_agent import FlightStatusAgent
+from itti_backend.main import app, get_llm, get_response_cache
+from itti_backend.nlu.intent_classifier import IntentClassifier
+from itti_backend.orchestrator.chatbot_graph import create_chatbot_graph
+from itti_backend.orchestrator.node_registry import NodeRegistry
+from itti_backend.services.chatbot_service import ChatbotService
+from itti_backend.services.fake_llm import FakeLatencyChatModel
+
+CHAT_QUERIES = [
+    "Hola, quiero saber los beneficios de la tarjeta de débito",
+    "¿Cuánto cuesta la cuota de manejo de la tarjeta de crédito?",
+    "¿Cómo abro una cuenta de ahorros?",
+    "Perdí mi tarjeta, ¿qué hago?",
+]
+
+# Multi-turn flows from test_app.run_conversational_flows plus its edge cases
+CONVERSATIONS = [
+    [
+        "Me puedes decir cómo viene el vuelo VW123?",
+        "Perfecto, gracias",
+    ],
+    [
+        "Necesito cambiar mi vuelo",
+        "Mi vuelo es VW123 y mi nombre es Juan Pérez",
+        "Quiero viajar a Miami el 2025-09-20",
+        "Gracias por la información",
+    ],
+    [
+        "¿Cómo viene el vuelo XX999?",
+        "¿Qué tiempo hace en París?",
+        "Hola, quiero cambiar mi vuelo VW123 a Madrid, gracias",
+        "Sí",
+        "Adiós",
+    ],
+]
+
+SCENARIOS = ["chat", "travel", "evaluation-single", "evaluation-full"]
+
+
+def _build_session(scenario: str, rng: random.Random) -> list[tuple[str, dict]]:
+    """Returns the (path, payload) requests of one session, sent in order."""
+    if scenario == "chat":
+        return [("/chat", {"text": rng.choice(CHAT_QUERIES)})]
+    if scenario == "travel":
+        session_id = f"load-{uuid.uuid4()}"
+        return [
+            ("/vuelaconnosotros/chat", {"message": m, "session_id": session_id})
+            for m in rng.choice(CONVERSATIONS)
+        ]
+    if scenario == "evaluation-single":
+        return [("/testing/run-single", {"text": rng.choice(CHAT_QUERIES)})]
+    return [("/evaluation/run-full-dataset", {})]
+
+
+def _install_fakes(latency: float, use_cache: bool) -> None:
+    """Replaces every LLM used by the app with a fake of the given latency."""
+    fake_llm = FakeLatencyChatModel(latency=latency)
+    app.dependency_overrides[get_llm] = lambda: fake_llm
+    if not use_cache:
+        app.dependency_overrides[get_response_cache] = lambda: None
+
+    # The classifier's fallback always routes to the flight change agent, so
+    # messages the rule tier does not answer exercise an agent's LLM call too.
+    agent_llm = FakeLatencyChatModel(
+        response_text="Respuesta simulada del asistente.", latency=latency
+    )
+    registry = NodeRegistry(
+        # The fake answers one label, not the JSON list of a batched call, so
+        # every batch would be retried message by message: count one call each
+        classifier=IntentClassifier(
+            llm=FakeLatencyChatModel(response_text="cambiar_vuelo", latency=latency),
+            batch_window_ms=0,
+        ),
+        flight_status_agent=FlightStatusAgent(llm=agent_llm),
+        flight_change_agent=FlightChangeAgent(llm=agent_llm),
+    )
+    # httpx.ASGITransport does not run the lifespan, so set the state directly
+    app.state.chatbot_service = ChatbotService(create_chatbot_graph(registry))
+
+
+def _summarize(samples: list[tuple[str, float, bool]], elapsed: float) -> dict:
+    """Aggregates (path, latency_seconds, ok) samples into a report section."""
+    latencies = np.array([latency for _, latency, _ in samples]) * 1000
+    errors = sum(1 for _, _, ok in samples if not ok)
+    total = len(samples)
+    summary = {
+        "requests": total,
+        "errors": errors,
+        "error_rate": errors / total if total else 0.0,
+        "rps": total / elapsed if elapsed else 0.0,
+    }
+    if total:
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        summary["latency_ms"] = {
+            "mean": float(latencies.mean()),
+            "p50": float(p50),
+            "p95": float(p95),
+            "p99": float(p99),
+            "max": float(latencies.max()),
+        }
+    return summary
+
+
+class LoadTest:
+    """Drives one scenario against the app and collects per-request samples."""
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        scenario: str,
+        total_requests: int,
+        duration: float | None,
+        seed: int,
+    ):
+        self.client = client
+        self.scenario = scenario
+        self.total_requests = total_requests
+        self.duration = duration
+        self.rng = random.Random(seed)
+        self.samples: list[tuple[str, float, bool]] = []
+        self.issued = 0
+        self.start = 0.0
+
+    def _done(self) -> bool:
+        if self.duration is not None:
+            return time.perf_counter() - self.start >= self.duration
+        return self.issued >= self.total_requests
+
+    async def _send(self, path: str, payload: dict, started: float) -> bool:
+        try:
+            response = await self.client.post(path, json=payload)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            ok = False
+        self.samples.append((path, time.perf_counter() - started, ok))
+        return ok
+
+    def _next_session(self) -> list[tuple[str, dict]] | None:
+        """Builds the next session and counts it against the budget."""
+        if self._done():
+            return None
+        session = _build_session(self.scenario, self.rng)
+        self.issued += len(session)
+        return session
+
+    async def _run_session(
+        self, session: list[tuple[str, dict]], scheduled: float | None = None
+    ) -> None:
+        """Sends a session's requests in order, stopping at the first error."""
+        for i, (path, payload) in enumerate(session):
+            # Only the first request of an open-loop session waited in the queue
+            started = scheduled if i == 0 and scheduled else time.perf_counter()
+            if not await self._send(path, payload, started):
+                return
+
+    async def run_closed(self, concurrency: int) -> float:
+        """Runs `concurrency` back-to-back clients; returns elapsed seconds."""
+
+        async def _client() -> None:
+            while (session := self._next_session()) is not None:
+                await self._run_session(session)
+
+        self.start = time.perf_counter()
+        await asyncio.gather(*(_client() for _ in range(concurrency)))
+        return time.perf_counter() - self.start
+
+    async def run_open(self, rate: float, concurrency: int) -> float:
+        """Starts sessions at `rate` per second; returns elapsed seconds."""
+        semaphore = asyncio.Semaphore(concurrency)
+        tasks = []
+
+        async def _session(session: list, scheduled: float) -> None:
+            async with semaphore:
+                await self._run_session(session, scheduled)
+
+        self.start = time.perf_counter()
+        next_arrival = self.start
+        while (session := self._next_session()) is not None:
+            delay = next_arrival - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(_session(session, next_arrival)))
+            next_arrival += self.rng.expovariate(rate)
+        await asyncio.gather(*tasks)
+        return time.perf_counter() - self.start
+
+    def report(self, elapsed: float) -> dict:
+        """Builds the JSON report: overall and per-endpoint summaries."""
+        by_endpoint = defaultdict(list)
+        for sample in self.samples:
+            by_endpoint[sample[0]].append(sample)
+        return {
+            **_summarize(self.samples, elapsed),
+            "duration_seconds": elapsed,
+            "by_endpoint": {
+                path: _summarize(samples, elapsed)
+                for path, samples in by_endpoint.items()
+            },
+        }
+
+
+async def main(args: argparse.Namespace) -> dict:
+    if args.base_url:
+        transport = None
+        base_url = args.base_url
+    else:
+        _install_fakes(args.latency, args.cache)
+        # Unhandled app errors become 500s and count as errors
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        base_url = "http://load-test"
+
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(
+        transport=transport, base_url=base_url, timeout=args.timeout, limits=limits
+    ) as client:
+        load_test = LoadTest(
+            client, args.scenario, args.requests, args.duration, args.seed
+        )
+        if args.rate:
+            elapsed = await load_test.run_open(args.rate, args.concurrency)
+        else:
+            elapsed = await load_test.run_closed(args.concurrency)
+
+    app.dependency_overrides.clear()
+    return {
+        "scenario": args.scenario,
+        "target": args.base_url or "in-process",
+        "load_model": "open" if args.rate else "closed",
+        "concurrency": args.concurrency,
+        "arrival_rate": args.rate,
+        "fake_llm_latency": None if args.base_url else args.latency,
+        "response_cache": args.cache,
+        **load_test.report(elapsed),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scenario", choices=SCENARIOS, default="chat")
+    parser.add_argument(
+        "--concurrency", type=int, default=8, help="Clients, or max in flight"
+    )
+    parser.add_argument(
+        "--rate", type=float, default=None, help="Open-loop sessions per second"
+    )
+    parser.add_argument("--requests", type=int, default=200, help="Total requests")
+    parser.add_argument(
+        "--duration", type=float, default=None, help="Run for N seconds instead"
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.2, help="Fake LLM seconds per call"
+    )
+    parser.add_argument(
+        "--cache", action="store_true", help="Keep the /chat response cache on"
+    )
+    parser.add_argument("--base-url", default=None, help="Target a live server")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Also write JSON here")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    # Graph nodes print progress; keep stdout for the JSON report
+    with contextlib.redirect_stdout(sys.stderr):
+        report = asyncio.run(main(args))
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
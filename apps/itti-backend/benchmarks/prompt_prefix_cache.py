@@ -0,0 +1,107 @@
+"""
+Per-request cost of the system prompt and the token accounting of PromptService.
+
+The setup baseline reproduces the previous PromptService, which read the 8 KB
+system prompt from disk and hashed it for the cache namespace on every request;
+it is timed against building a PromptService now. The fake chat model then
+reports usage like a provider with automatic prompt caching (a repeated system
+message is cached input), and the input, cached and output tokens of the
+blocking, async, streaming and structured paths are totalled. Their accounting
+is checked by tests/test_prompt_prefix_cache.py.
+
+Usage (from apps/itti-backend):
+    uv run python -m benchmarks.prompt_prefix_cache --queries 15 --services 10000
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+
+from langchain_core.messages import SystemMessage
+
+from itti_backend.models.fintech_models import BotResponse, CustomerQuery
+from itti_backend.services.comprehensive_evaluator import load_evaluation_dataset
+from itti_backend.services.fake_llm import FakeLatencyChatModel
+from itti_backend.services.prompt_prefix_cache import PromptPrefixCache
+from itti_backend.services.prompt_service import SYSTEM_PROMPT_PATH, PromptService
+from itti_backend.services.response_cache import build_namespace
+
+
+def _legacy_setup(model_name: str) -> None:
+    with open(SYSTEM_PROMPT_PATH, encoding="utf-8") as f:
+        system_prompt = f.read()
+    SystemMessage(content=system_prompt)
+    build_namespace(system_prompt, model_name)
+
+
+def _time_setup(count: int, fake_llm: FakeLatencyChatModel) -> None:
+    prefix_cache = PromptPrefixCache()
+    start = time.perf_counter()
+    for _ in range(count):
+        _legacy_setup(fake_llm._llm_type)
+    baseline = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(count):
+        PromptService(llm_client=fake_llm, prefix_cache=prefix_cache)
+    elapsed = time.perf_counter() - start
+    print(
+        f"Per-request setup: previous {baseline / count * 1e6:.1f} µs, "
+        f"now {elapsed / count * 1e6:.1f} µs ({baseline / elapsed:.1f}x)"
+    )
+
+
+async def _generate(
+    service: PromptService, path: str, query: CustomerQuery
+) -> BotResponse:
+    if path == "blocking":
+        return await asyncio.to_thread(service.generate_response, query)
+    if path == "stream":
+        async for name, payload in service.astream_response(query):
+            if name == "final":
+                return BotResponse(**payload["response"])
+    return await service.agenerate_response(query)
+
+
+async def _report_tokens(texts: list[str]) -> None:
+    print(f"{'path':>20} | {'input':>7} | {'cached':>7} | {'output':>7} | cached %")
+    for mode, path in [
+        ("text", "blocking"),
+        ("text", "async"),
+        ("text", "stream"),
+        ("structured", "async"),
+    ]:
+        service = PromptService(
+            llm_client=FakeLatencyChatModel(),
+            output_mode=mode,
+            prefix_cache=PromptPrefixCache(),
+        )
+        totals = [0, 0, 0]
+        for text in texts:
+            response = await _generate(service, path, CustomerQuery(text=text))
+            totals[0] += response.input_tokens
+            totals[1] += response.cached_input_tokens
+            totals[2] += response.output_tokens
+        print(
+            f"{mode + '/' + path:>20} | {totals[0]:>7} | {totals[1]:>7} | "
+            f"{totals[2]:>7} | {totals[1] / totals[0]:7.1%}"
+        )
+
+
+def main(queries: int, services: int) -> None:
+    texts = list(load_evaluation_dataset()["query"])[:queries]
+    _time_setup(services, FakeLatencyChatModel())
+    asyncio.run(_report_tokens(texts))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--queries", type=int, default=15, help="Queries per path")
+    parser.add_argument(
+        "--services", type=int, default=10_000, help="PromptServices to build"
+    )
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    main(args.queries, args.services)
@@ -0,0 +1,122 @@
+"""
+Throughput of the lexicon-based quality metrics (empathy, actionability, tone).
+
+The baseline reproduces the previous implementation, which lowercased the text
+again for every phrase group and scanned it once per phrase. The compiled
+LexiconEngine is timed per text (`score`) and per batch (`score_many`). Every
+engine score is checked against the baseline first.
+
+Usage (from apps/itti-backend):
+    uv run python -m benchmarks.quality_lexicons --responses 100000
+"""
+
+import argparse
+import logging
+import random
+import time
+
+from itti_backend.services.comprehensive_evaluator import load_evaluation_dataset
+from itti_backend.services.quality_lexicons import load_lexicon_engine
+
+# Phrases inserted into the dataset responses so that every group gets hits
+EXTRA_PHRASES = [
+    "Entiendo tu preocupación.",
+    "¡Hola! Claro que sí.",
+    "Creo que podría ser un cargo duplicado.",
+    "**Próximos pasos:** revisa tu app.",
+    "Te gustaría activar las alertas?",
+    "Pues... chao parce.",
+]
+
+
+def _legacy_scores(text: str) -> dict[str, float]:
+    empathy = 0.0
+    if any(p in text.lower() for p in ["entiendo tu", "comprendo tu", "lamento"]):
+        empathy += 0.5
+    if any(p in text.lower() for p in ["me alegra", "qué bueno", "claro que sí"]):
+        empathy += 0.25
+    if "¡hola!" in text.lower():
+        empathy += 0.25
+
+    if "**próximos pasos:**" in text.lower():
+        actionability = 1.0
+    elif any(p in text.lower() for p in ["puedes", "te gustaría", "anímate a"]):
+        actionability = 0.5
+    else:
+        actionability = 0.0
+
+    tone = 1.0
+    if any(p in text.lower() for p in ["creo que", "parece que", "podría ser"]):
+        tone -= 0.25
+    if any(p in text.lower() for p in ["chao", "parce", "pues..."]):
+        tone -= 0.5
+
+    return {
+        "empathy": min(1.0, empathy),
+        "actionability": actionability,
+        "professional_tone": max(0.0, tone),
+    }
+
+
+def _build_responses(count: int, seed: int) -> list[str]:
+    """Builds `count` responses from the dataset's ideal responses."""
+    rng = random.Random(seed)
+    ideals = [text for text in load_evaluation_dataset()["ideal_response"] if text]
+    responses = []
+    for _ in range(count):
+        parts = [rng.choice(ideals)]
+        parts += rng.sample(EXTRA_PHRASES, rng.randint(0, 2))
+        rng.shuffle(parts)
+        responses.append(" ".join(parts))
+    return responses
+
+
+def _time(label: str, func, responses: list[str], baseline: float | None) -> float:
+    start = time.perf_counter()
+    func(responses)
+    elapsed = time.perf_counter() - start
+    speedup = f"  ({baseline / elapsed:.1f}x)" if baseline else ""
+    print(
+        f"{label:28} {elapsed:7.3f} s  "
+        f"{elapsed / len(responses) * 1e6:6.2f} µs/response{speedup}"
+    )
+    return elapsed
+
+
+def main(count: int, seed: int) -> None:
+    engine = load_lexicon_engine()
+    responses = _build_responses(count, seed)
+    print(f"Lexicons v{engine.version}, {count} responses")
+
+    expected = [_legacy_scores(text) for text in responses]
+    if (
+        engine.score_many(responses) != expected
+        or [engine.score(text) for text in responses] != expected
+    ):
+        raise SystemExit("LexiconEngine scores differ from the previous metrics")
+
+    baseline = _time(
+        "Per-phrase scans (previous)",
+        lambda texts: [_legacy_scores(text) for text in texts],
+        responses,
+        None,
+    )
+    _time(
+        "LexiconEngine.score",
+        lambda texts: [engine.score(text) for text in texts],
+        responses,
+        baseline,
+    )
+    _time("LexiconEngine.score_many", engine.score_many, responses, baseline)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--responses", type=int, default=100_000, help="Responses to score"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    main(args.responses, args.seed)
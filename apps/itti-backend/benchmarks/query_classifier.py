@@ -0,0 +1,115 @@
+"""
+Accuracy, calibration and latency of the local Intent/Product classifier.
+
+Scores every labelled query (the evaluation dataset plus `--labelled` files)
+with itself left out of the vote, then prints the classifier's accuracy, the
+accuracy per confidence band (calibration: a band's accuracy should be close
+to its confidences), and the share of queries `/chat/route` would answer
+without the LLM at `--min-confidence`, with their accuracy. It then times
+`--queries` single-query classifications, split into embedding and kNN vote
+(the split needs METRICS_ENABLED).
+
+Usage (from apps/itti-backend):
+    uv run python -m benchmarks.query_classifier --labelled labelled_logs.csv
+"""
+
+import argparse
+import logging
+import statistics
+import time
+
+from prometheus_client import REGISTRY
+
+from itti_backend.services.embedding_models import (
+    DEFAULT_EMBEDDING_MODEL,
+    get_embedding_model,
+)
+from itti_backend.services.query_classifier import (
+    KNNQueryClassifier,
+    load_labelled_queries,
+)
+
+BANDS = [(0.0, 0.5), (0.5, 0.7), (0.7, 0.9), (0.9, 1.01)]
+
+
+def _stage_seconds() -> dict[str, float]:
+    return {
+        stage: REGISTRY.get_sample_value(
+            "query_classifier_duration_seconds_sum", {"stage": stage}
+        )
+        or 0.0
+        for stage in ("embed", "knn")
+    }
+
+
+def main(paths: list[str], model: str, k: int, min_confidence: float, queries: int):
+    labelled = load_labelled_queries(paths)
+    classifier = KNNQueryClassifier(
+        get_embedding_model(model), labelled, k=k, min_confidence=min_confidence
+    )
+    texts = labelled["query"].tolist()
+    results = classifier.classify_many(texts, exclude_same=True)
+    intents = [
+        r.intent.value == i for r, i in zip(results, labelled["expected_intent"])
+    ]
+    products = [
+        r.product.value == p for r, p in zip(results, labelled["expected_product"])
+    ]
+    rows = [(r, i and p) for r, i, p in zip(results, intents, products)]
+    print(f"{len(texts)} labelled queries, k={classifier.k} (leave-one-out)")
+    print(
+        f"Accuracy: intent {sum(intents) / len(texts):.1%}, "
+        f"product {sum(products) / len(texts):.1%}, "
+        f"both {sum(ok for _, ok in rows) / len(rows):.1%}"
+    )
+
+    print(f"{'confidence':>12} | {'queries':>7} | {'mean conf':>9} | {'accuracy':>8}")
+    print("-" * 46)
+    for low, high in BANDS:
+        band = [(r, ok) for r, ok in rows if low <= r.confidence < high]
+        if not band:
+            continue
+        mean = statistics.mean(r.confidence for r, _ in band)
+        accuracy = sum(ok for _, ok in band) / len(band)
+        label = f"{low:.1f}-{min(high, 1.0):.1f}"
+        print(f"{label:>12} | {len(band):>7} | {mean:>9.2f} | {accuracy:>8.1%}")
+
+    routed = [ok for r, ok in rows if classifier.is_confident(r)]
+    accuracy = f"{sum(routed) / len(routed):.1%}" if routed else "-"
+    print(
+        f"Routed without the LLM at {min_confidence:.2f}: "
+        f"{len(routed) / len(rows):.1%} of queries, {accuracy} correct"
+    )
+
+    sample = (texts * (queries // len(texts) + 1))[:queries]
+    classifier.classify(sample[0])  # Warm-up
+    before = _stage_seconds()
+    latencies = []
+    for text in sample:
+        start = time.perf_counter()
+        classifier.classify(text)
+        latencies.append((time.perf_counter() - start) * 1000)
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    stages = ", ".join(
+        f"{stage} {(seconds - before[stage]) * 1000 / len(sample):.3f} ms"
+        for stage, seconds in _stage_seconds().items()
+    )
+    print(
+        f"One query: p50 {statistics.median(latencies):.3f} ms, "
+        f"p99 {cuts[98]:.3f} ms (mean {stages})"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--labelled", nargs="*", default=[], help="Labelled query CSV/JSONL files"
+    )
+    parser.add_argument("--model", default=DEFAULT_EMBEDDING_MODEL)
+    parser.add_argument("--k", type=int, default=5, help="Neighbours per vote")
+    parser.add_argument("--min-confidence", type=float, default=0.9)
+    parser.add_argument("--queries", type=int, default=1000, help="Timed queries")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    main(args.labelled, args.model, args.k, args.min_confidence, args.queries)
@@ -0,0 +1,118 @@
+"""
+Upstream calls made for a burst of identical messages, with and without coalescing.
+
+Simulates a traffic spike (e.g. a delayed flight): `--users` clients send the
+same message at the same time, once to the travel assistant ("estado del vuelo
+VW123": intent classification, get_flight_status and the agent's LLM answer)
+and once to /chat's PromptService. Every component uses a fake chat model with
+a fixed latency that counts its calls. The coalescing semantics (errors,
+cancellation) are covered by tests/test_singleflight.py.
+
+Usage (from apps/itti-backend):
+    uv run python -m benchmarks.request_coalescing --users 32 --latency 0.2
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from typing import Any
+
+from itti_backend.agents import tools
+from itti_backend.agents.flight_change_agent import FlightChangeAgent
+from itti_backend.agents.flight_status_agent import FlightStatusAgent
+from itti_backend.models.fintech_models import CustomerQuery
+from itti_backend.nlu.intent_classifier import IntentClassifier
+from itti_backend.orchestrator.chatbot_graph import create_chatbot_graph
+from itti_backend.orchestrator.node_registry import NodeRegistry
+from itti_backend.services import prompt_service
+from itti_backend.services.chatbot_service import ChatbotService
+from itti_backend.services.fake_llm import FakeLatencyChatModel
+from itti_backend.services.prompt_service import PromptService
+
+TRAVEL_MESSAGE = "estado del vuelo VW123"
+CHAT_QUERY = "Hola, quiero saber los beneficios de la tarjeta de débito"
+
+
+class CountingChatModel(FakeLatencyChatModel):
+    """Fake chat model that counts the calls it answers."""
+
+    calls: int = 0
+
+    def _generate(self, *args: Any, **kwargs: Any):
+        self.calls += 1
+        return super()._generate(*args, **kwargs)
+
+    async def _agenerate(self, *args: Any, **kwargs: Any):
+        self.calls += 1
+        return await super()._agenerate(*args, **kwargs)
+
+
+def _build_travel_service(
+    llm: FakeLatencyChatModel, enabled: bool
+) -> tuple[ChatbotService, NodeRegistry]:
+    registry = NodeRegistry(
+        # The rule tier would answer this message without the LLM
+        classifier=IntentClassifier(llm=llm, use_fast_path=False),
+        flight_status_agent=FlightStatusAgent(llm=llm),
+        flight_change_agent=FlightChangeAgent(llm=llm),
+    )
+    for flights in (
+        registry.classifier._flights,
+        tools.STATUS_CACHE._misses,
+        registry.flight_status_agent._response_flights,
+    ):
+        flights.enabled = enabled
+    return ChatbotService(create_chatbot_graph(registry)), registry
+
+
+async def _travel_burst(users: int, latency: float, enabled: bool) -> None:
+    llm = CountingChatModel(response_text="consultar_estado_vuelo", latency=latency)
+    service, _ = _build_travel_service(llm, enabled)
+    tools.invalidate_flight(TRAVEL_MESSAGE.split()[-1])
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            service.aprocess_message(TRAVEL_MESSAGE, session_id=f"user-{i}")
+            for i in range(users)
+        )
+    )
+    elapsed = time.perf_counter() - start
+    label = "coalesced" if enabled else "previous"
+    print(f"{'travel ' + label:>18} | {llm.calls:>9} | {elapsed:>7.2f} s")
+
+
+async def _chat_burst(users: int, latency: float, enabled: bool) -> None:
+    llm = CountingChatModel(latency=latency)
+    service = PromptService(llm_client=llm)
+    prompt_service._GENERATIONS.enabled = enabled
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            service.agenerate_response(CustomerQuery(text=CHAT_QUERY))
+            for _ in range(users)
+        )
+    )
+    elapsed = time.perf_counter() - start
+    label = "coalesced" if enabled else "previous"
+    print(f"{'/chat ' + label:>18} | {llm.calls:>9} | {elapsed:>7.2f} s")
+
+
+async def main(users: int, latency: float) -> None:
+    print(f"{users} users, fake LLM latency {latency * 1000:.0f} ms")
+    print(f"{'burst':>18} | {'LLM calls':>9} | {'time':>9}")
+    print("-" * 42)
+    for enabled in (False, True):
+        await _travel_burst(users, latency, enabled)
+    for enabled in (False, True):
+        await _chat_burst(users, latency, enabled)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=32, help="Concurrent users")
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds per call")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    asyncio.run(main(args.users, args.latency))
@@ -0,0 +1,67 @@
+"""
+Per-row vs batched throughput of the evaluator's semantic-similarity metric.
+
+The per-row baseline reproduces the previous implementation (two `encode`
+calls and one `cos_sim` per row); the batched path is
+`ComprehensiveEvaluator._calculate_semantic_similarities`.
+
+Usage (from apps/itti-backend):
+    uv run python -m benchmarks.semantic_similarity --rows 1024
+"""
+
+import argparse
+import logging
+import time
+
+from sentence_transformers import util
+
+from itti_backend.services.comprehensive_evaluator import ComprehensiveEvaluator
+
+
+def _build_pairs(evaluator: ComprehensiveEvaluator, rows: int):
+    """Builds `rows` (generated, ideal) pairs from the evaluation dataset."""
+    ideals = [text for text in evaluator.dataset["ideal_response"] if text]
+    generated = ideals[1:] + ideals[:1]  # Pair each ideal with a different text
+    repeats = rows // len(ideals) + 1
+    return (generated * repeats)[:rows], (ideals * repeats)[:rows]
+
+
+def _per_row(evaluator: ComprehensiveEvaluator, generated, ideals) -> list[float]:
+    scores = []
+    for generated_text, ideal_text in zip(generated, ideals):
+        embedding1 = evaluator.model.encode(generated_text, convert_to_tensor=True)
+        embedding2 = evaluator.model.encode(ideal_text, convert_to_tensor=True)
+        scores.append(util.cos_sim(embedding1, embedding2).item())
+    return scores
+
+
+def main(rows: int) -> None:
+    evaluator = ComprehensiveEvaluator(llm_client=None)
+    generated, ideals = _build_pairs(evaluator, rows)
+
+    # Warm up the model so neither path pays first-call overhead
+    evaluator._calculate_semantic_similarities(generated[:8], ideals[:8])
+
+    start = time.perf_counter()
+    per_row_scores = _per_row(evaluator, generated, ideals)
+    per_row_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched_scores = evaluator._calculate_semantic_similarities(generated, ideals)
+    batched_seconds = time.perf_counter() - start
+
+    max_diff = max(abs(a - b) for a, b in zip(per_row_scores, batched_scores))
+    print(f"Rows: {rows}")
+    print(f"Per-row: {per_row_seconds:.2f}s ({rows / per_row_seconds:.1f} rows/s)")
+    print(f"Batched: {batched_seconds:.2f}s ({rows / batched_seconds:.1f} rows/s)")
+    print(f"Speed-up: {per_row_seconds / batched_seconds:.1f}x")
+    print(f"Max score difference: {max_diff:.2e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1024, help="Rows to score")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    main(args.rows)
@@ -1,5 +1,6 @@
 """Base agent definition for the VuelaConNosotros chatbot."""
 
+import asyncio
 from abc import ABC, abstractmethod
 
 
@@ -24,3 +25,19 @@ class BaseAgent(ABC):
             A dictionary containing the updated state after the agent's execution.
         """
         pass
+
+    async def arun(self, state: dict) -> dict:
+        """
+        Asynchronous variant of `run`, used when the graph runs with `ainvoke`.
+
+        Defaults to `run` in a worker thread; agents that call tools or the LLM
+        override it with their async variants, so waiting on them doesn't hold
+        a thread.
+
+        Args:
+            state: A dictionary representing the current state of the conversation.
+
+        Returns:
+            A dictionary containing the updated state after the agent's execution.
+        """
+        return await asyncio.to_thread(self.run, state)
@@ -1,9 +1,10 @@
 """Agent to handle flight change requests."""
 
+from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
 
-from ..core.config import settings
+from ..core.metrics import FALLBACK_RESPONSES, LLM_LATENCY, count, track
+from ..services.llm_service import get_llm_client
 from .base_agent import BaseAgent
 from .tools import check_flight_availability, get_flight_details
 
@@ -17,13 +18,17 @@ class FlightChangeAgent(BaseAgent):
     check for alternatives. It adheres to the Single Responsibility Principle.
     """
 
-    def __init__(self):
-        """Initializes the FlightChangeAgent."""
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.0-flash",
-            google_api_key=settings.GEMINI_API_KEY,
-            temperature=0.7,
-        )
+    def __init__(self, llm: BaseChatModel | None = None):
+        """
+        Initializes the FlightChangeAgent.
+
+        Args:
+            llm: An optional chat model for response generation. Defaults to
+                the client configured by LLM_PROVIDER.
+        """
+        self.llm = llm or get_llm_client(temperature=0.7)
+        # The prompt chain is built once and reused for every message
+        self.response_chain = self._build_response_prompt() | self.llm
 
     def run(self, state: dict) -> dict:
         """
@@ -36,6 +41,47 @@ class FlightChangeAgent(BaseAgent):
             The updated state with the agent's response.
         """
         print("--- Running Flight Change Agent ---")
+        reply = self._ask_for_missing_details(state)
+        if reply is not None:
+            return reply
+
+        # Once we have flight and passenger, verify details
+        if not state.get("flight_details_verified"):
+            return self._verify_flight_details(state)
+
+        reply = self._ask_for_new_flight(state)
+        if reply is not None:
+            return reply
+
+        # Check availability
+        return self._check_new_flight_availability(state)
+
+    async def arun(self, state: dict) -> dict:
+        """
+        Asynchronous variant of `run`: awaits the tools and the LLM.
+
+        Args:
+            state: The current conversation state.
+
+        Returns:
+            The updated state with the agent's response.
+        """
+        print("--- Running Flight Change Agent ---")
+        reply = self._ask_for_missing_details(state)
+        if reply is not None:
+            return reply
+
+        if not state.get("flight_details_verified"):
+            return await self._averify_flight_details(state)
+
+        reply = self._ask_for_new_flight(state)
+        if reply is not None:
+            return reply
+
+        return await self._acheck_new_flight_availability(state)
+
+    def _ask_for_missing_details(self, state: dict) -> dict | None:
+        """Asks for the flight number or passenger name, if still missing."""
         # Simplified state management within the agent for this PoC
         # In a real app, this might be a more robust state machine
         if not state.get("flight_number") or not state.get("passenger_name"):
@@ -49,12 +95,10 @@ class FlightChangeAgent(BaseAgent):
                 return {
                     "agent_response": "Gracias. Ahora, por favor, dime el nombre completo del pasajero."
                 }
+        return None
 
-        # Once we have flight and passenger, verify details
-        if not state.get("flight_details_verified"):
-            return self._verify_flight_details(state)
-
-        # Now, ask for new flight preferences
+    def _ask_for_new_flight(self, state: dict) -> dict | None:
+        """Asks for the new flight's destination and date, if still missing."""
         if (
             not state.get("new_origin")
             or not state.get("new_destination")
@@ -64,9 +108,7 @@ class FlightChangeAgent(BaseAgent):
             return {
                 "agent_response": "Perfecto. ¿A qué destino y en qué fecha te gustaría viajar? (ej. a Miami el 2025-09-20)"
             }
-
-        # Check availability
-        return self._check_new_flight_availability(state)
+        return None
 
     def _extract_initial_details(self, state: dict):
         """Tries to extract flight number and name from the initial message."""
@@ -82,49 +124,84 @@ class FlightChangeAgent(BaseAgent):
     def _verify_flight_details(self, state: dict) -> dict:
         """Uses the get_flight_details tool to verify the user's info."""
         try:
-            details = get_flight_details.invoke(
-                {
-                    "flight_number": state["flight_number"],
-                    "passenger_name": state["passenger_name"],
-                }
-            )
-            if details.get("status") == "no_encontrado":
-                return {
-                    "agent_response": "No pude encontrar una reserva con esos datos. ¿Podrías verificar el número de vuelo y el nombre?"
-                }
+            details = get_flight_details.invoke(self._details_query(state))
+        except Exception as e:
+            return self._details_error(e)
+        return self._details_reply(state, details)
 
-            state["flight_details_verified"] = True
-            state["original_flight"] = details
-            return {
-                "agent_response": f"Encontré tu reserva, {details['passenger']}. Vuelo {details['flight_number']} de {details['origin']} a {details['destination']}. ¿A dónde y cuándo quieres cambiarlo?"
-            }
+    async def _averify_flight_details(self, state: dict) -> dict:
+        """Async variant of `_verify_flight_details`."""
+        try:
+            details = await get_flight_details.ainvoke(self._details_query(state))
         except Exception as e:
-            print(f"Error calling get_flight_details tool: {e}")
+            return self._details_error(e)
+        return self._details_reply(state, details)
+
+    def _details_query(self, state: dict) -> dict:
+        return {
+            "flight_number": state["flight_number"],
+            "passenger_name": state["passenger_name"],
+        }
+
+    def _details_reply(self, state: dict, details: dict) -> dict:
+        """Answers with the reservation found, or asks to check the data."""
+        if details.get("status") == "no_encontrado":
             return {
-                "agent_response": "Tuve un problema al verificar tu reserva. Inténtalo de nuevo, por favor."
+                "agent_response": "No pude encontrar una reserva con esos datos. ¿Podrías verificar el número de vuelo y el nombre?"
             }
 
+        state["flight_details_verified"] = True
+        state["original_flight"] = details
+        return {
+            "agent_response": f"Encontré tu reserva, {details['passenger']}. Vuelo {details['flight_number']} de {details['origin']} a {details['destination']}. ¿A dónde y cuándo quieres cambiarlo?"
+        }
+
+    def _details_error(self, error: Exception) -> dict:
+        print(f"Error calling get_flight_details tool: {error}")
+        count(FALLBACK_RESPONSES, component="flight_change_agent")
+        return {
+            "agent_response": "Tuve un problema al verificar tu reserva. Inténtalo de nuevo, por favor."
+        }
+
     def _check_new_flight_availability(self, state: dict) -> dict:
         """Uses the check_flight_availability tool and generates a final response."""
         try:
             availability = check_flight_availability.invoke(
-                {
-                    "origin": state["new_origin"],
-                    "destination": state["new_destination"],
-                    "date": state["new_date"],
-                }
+                self._availability_query(state)
             )
             response = self._generate_final_response(availability)
             return {"agent_response": response}
         except Exception as e:
-            print(f"Error calling check_flight_availability tool: {e}")
-            return {
-                "agent_response": "Lo siento, no pude verificar la disponibilidad de vuelos en este momento."
-            }
+            return self._availability_error(e)
 
-    def _generate_final_response(self, availability: dict) -> str:
-        """Generates a response based on flight availability."""
-        prompt = ChatPromptTemplate.from_template(
+    async def _acheck_new_flight_availability(self, state: dict) -> dict:
+        """Async variant of `_check_new_flight_availability`."""
+        try:
+            availability = await check_flight_availability.ainvoke(
+                self._availability_query(state)
+            )
+            response = await self._agenerate_final_response(availability)
+            return {"agent_response": response}
+        except Exception as e:
+            return self._availability_error(e)
+
+    def _availability_query(self, state: dict) -> dict:
+        return {
+            "origin": state["new_origin"],
+            "destination": state["new_destination"],
+            "date": state["new_date"],
+        }
+
+    def _availability_error(self, error: Exception) -> dict:
+        print(f"Error calling check_flight_availability tool: {error}")
+        count(FALLBACK_RESPONSES, component="flight_change_agent")
+        return {
+            "agent_response": "Lo siento, no pude verificar la disponibilidad de vuelos en este momento."
+        }
+
+    def _build_response_prompt(self) -> ChatPromptTemplate:
+        """Builds the prompt used to present the availability results."""
+        return ChatPromptTemplate.from_template(
             """
             Eres un asistente de aerolínea. Tu tarea es informar al usuario sobre la disponibilidad de vuelos para un cambio.
 
@@ -135,6 +212,15 @@ class FlightChangeAgent(BaseAgent):
             Recuerda que esto es una simulación, no confirmes ningún cambio ni hables de tarifas.
             """
         )
-        chain = prompt | self.llm
-        response = chain.invoke({"context": str(availability)})
+
+    def _generate_final_response(self, availability: dict) -> str:
+        """Generates a response based on flight availability."""
+        with track(LLM_LATENCY, caller="flight_change_agent"):
+            response = self.response_chain.invoke({"context": str(availability)})
+        return response.content.strip()
+
+    async def _agenerate_final_response(self, availability: dict) -> str:
+        """Async variant of `_generate_final_response`."""
+        with track(LLM_LATENCY, caller="flight_change_agent"):
+            response = await self.response_chain.ainvoke({"context": str(availability)})
         return response.content.strip()
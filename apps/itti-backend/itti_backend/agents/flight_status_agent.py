@@ -1,9 +1,12 @@
 """Agent to handle flight status inquiries."""
 
+from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
 
-from ..core.config import settings
+from ..core.metrics import FALLBACK_RESPONSES, LLM_LATENCY, count, track
+from ..core.singleflight import SingleFlight
+from ..services.llm_service import get_llm_client, get_model_name
+from ..services.response_cache import build_namespace
 from .base_agent import BaseAgent
 from .tools import get_flight_status
 
@@ -13,16 +16,28 @@ class FlightStatusAgent(BaseAgent):
     Agent responsible for handling inquiries about flight status.
 
     This agent adheres to the Single Responsibility Principle by focusing
-    solely on flight status-related tasks.
+    solely on flight status-related tasks. Concurrent answers built from the
+    same tool result (and so the same prompt) share one LLM call; the tool's
+    own cache coalesces concurrent lookups of a flight.
     """
 
-    def __init__(self):
-        """Initializes the FlightStatusAgent."""
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.0-flash",
-            google_api_key=settings.GEMINI_API_KEY,
-            temperature=0.7,
+    def __init__(self, llm: BaseChatModel | None = None):
+        """
+        Initializes the FlightStatusAgent.
+
+        Args:
+            llm: An optional chat model for response generation. Defaults to
+                the client configured by LLM_PROVIDER.
+        """
+        self.llm = llm or get_llm_client(temperature=0.7)
+        # The prompt chain is built once and reused for every message
+        response_prompt = self._build_response_prompt()
+        self.response_chain = response_prompt | self.llm
+        # Coalescing key prefix: prompt version and model
+        self.namespace = build_namespace(
+            response_prompt.pretty_repr(), get_model_name(self.llm)
         )
+        self._response_flights = SingleFlight("flight_status_agent")
 
     def run(self, state: dict) -> dict:
         """
@@ -47,11 +62,41 @@ class FlightStatusAgent(BaseAgent):
                 tool_result = get_flight_status.invoke({"flight_number": flight_number})
                 response = self._generate_response(tool_result)
             except Exception as e:
-                print(f"Error calling get_flight_status tool: {e}")
-                response = "Lo siento, tuve un problema al consultar el estado del vuelo. Por favor, intenta de nuevo."
+                response = self._tool_error_response(e)
+
+        return {"agent_response": response}
+
+    async def arun(self, state: dict) -> dict:
+        """
+        Asynchronous variant of `run`: awaits the tool and the LLM.
+
+        Args:
+            state: The current conversation state.
+
+        Returns:
+            The updated state with the agent's response.
+        """
+        print("--- Running Flight Status Agent ---")
+        flight_number = self._extract_flight_number(state.get("current_message", ""))
+
+        if not flight_number:
+            response = "Por favor, indícame el número de vuelo que deseas consultar."
+        else:
+            try:
+                tool_result = await get_flight_status.ainvoke(
+                    {"flight_number": flight_number}
+                )
+                response = await self._agenerate_response(tool_result)
+            except Exception as e:
+                response = self._tool_error_response(e)
 
         return {"agent_response": response}
 
+    def _tool_error_response(self, error: Exception) -> str:
+        print(f"Error calling get_flight_status tool: {error}")
+        count(FALLBACK_RESPONSES, component="flight_status_agent")
+        return "Lo siento, tuve un problema al consultar el estado del vuelo. Por favor, intenta de nuevo."
+
     def _extract_flight_number(self, text: str) -> str | None:
         """Extracts a flight number from the text."""
         import re
@@ -59,9 +104,9 @@ class FlightStatusAgent(BaseAgent):
         match = re.search(r"[A-Z]{2}\d{3,4}", text.upper())
         return match.group(0) if match else None
 
-    def _generate_response(self, tool_result: dict) -> str:
-        """Generates a user-friendly response based on the tool's output."""
-        prompt = ChatPromptTemplate.from_template(
+    def _build_response_prompt(self) -> ChatPromptTemplate:
+        """Builds the prompt used to phrase the tool's output for the user."""
+        return ChatPromptTemplate.from_template(
             """
             Eres un asistente de aerolínea amable y servicial.
             Tu tarea es informar al usuario sobre el estado de su vuelo de manera clara y concisa.
@@ -74,6 +119,27 @@ class FlightStatusAgent(BaseAgent):
             Si el vuelo no fue encontrado, informa al usuario amablemente.
             """
         )
-        chain = prompt | self.llm
-        response = chain.invoke({"context": str(tool_result)})
+
+    def _generate_response(self, tool_result: dict) -> str:
+        """Generates a user-friendly response based on the tool's output."""
+        context = str(tool_result)
+        return self._response_flights.do(
+            (self.namespace, context), self._invoke_response_chain, context
+        )
+
+    def _invoke_response_chain(self, context: str) -> str:
+        with track(LLM_LATENCY, caller="flight_status_agent"):
+            response = self.response_chain.invoke({"context": context})
+        return response.content.strip()
+
+    async def _agenerate_response(self, tool_result: dict) -> str:
+        """Async variant of `_generate_response`."""
+        context = str(tool_result)
+        return await self._response_flights.ado(
+            (self.namespace, context), self._ainvoke_response_chain, context
+        )
+
+    async def _ainvoke_response_chain(self, context: str) -> str:
+        with track(LLM_LATENCY, caller="flight_status_agent"):
+            response = await self.response_chain.ainvoke({"context": context})
         return response.content.strip()
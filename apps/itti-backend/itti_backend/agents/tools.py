@@ -1,11 +1,204 @@
-"""Simulated tools for the VuelaConNosotros chatbot."""
+"""
+Flight tools for the VuelaConNosotros chatbot.
 
-from langchain.tools import tool
+The tools answer from the local flight inventory (`services/flight_inventory.py`),
+with the latency of a remote flight-ops service simulated on top. Every tool
+can be called with `invoke` (sync) or `ainvoke` (async), and both share a
+per-tool TTL cache in front of that backend: status changes fast, so its TTL
+is short; availability lives longer. "Not found" answers are cached too, for
+FLIGHT_TOOLS_NEGATIVE_TTL_SECONDS, so a mistyped flight number can't hammer
+the backend. Call `invalidate_flight` or `invalidate_availability` when flight
+ops reports a change.
 
+Flight numbers are matched exactly after normalization ("vw 123" finds VW123,
+"vuelo VW123" finds nothing), so callers pass the number the agents extract
+from the message.
+"""
 
-@tool
-def get_flight_status(flight_number: str) -> dict:
-    """Simulates getting the status of a flight.
+import asyncio
+import copy
+import os
+import time
+from collections.abc import Callable, Hashable
+from functools import lru_cache
+from typing import Optional
+
+from langchain_core.tools import StructuredTool
+
+from ..core.metrics import TOOL_CACHE_LOOKUPS, TOOL_LATENCY, count, timed
+from ..core.singleflight import SingleFlight
+from ..core.ttl_cache import TTLCache
+from ..services.flight_inventory import (
+    FlightInventory,
+    build_flight_inventory,
+    normalize_flight_number,
+    normalize_passenger_name,
+)
+
+# Simulated backend response time, to reproduce a slow flight-ops service
+FLIGHT_OPS_LATENCY_SECONDS = float(os.getenv("FLIGHT_OPS_LATENCY_SECONDS", 0))
+# Statuses the backend answers with when nothing matches the request
+NOT_FOUND_STATUSES = ("desconocido", "no_encontrado")
+
+
+class ToolCache:
+    """
+    TTL cache of one tool's results.
+
+    Results whose `status` is in NOT_FOUND_STATUSES are kept for
+    `negative_ttl_seconds` instead of `ttl_seconds`. Callers get a copy of the
+    cached result, so they can't alter what the next caller sees. Concurrent
+    misses for the same key share one backend call (see core/singleflight.py).
+    """
+
+    def __init__(
+        self,
+        tool: str,
+        ttl_seconds: float,
+        negative_ttl_seconds: float,
+        max_entries: int = 4096,
+    ):
+        """
+        Initializes the cache.
+
+        Args:
+            tool: The tool's name, used as a metrics label.
+            ttl_seconds: Lifetime of a found result. 0 disables the cache.
+            negative_ttl_seconds: Lifetime of a "not found" result.
+            max_entries: Maximum number of results kept.
+        """
+        self.tool = tool
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.entries = TTLCache(max_entries)
+        self._misses = SingleFlight(f"{tool}_backend")
+
+    def _lookup(self, key: Hashable) -> Optional[dict]:
+        result = self.entries.get(key)
+        if result is None:
+            outcome = "miss"
+        elif result.get("status") in NOT_FOUND_STATUSES:
+            outcome = "negative_hit"
+        else:
+            outcome = "hit"
+        count(TOOL_CACHE_LOOKUPS, tool=self.tool, result=outcome)
+        return result
+
+    def _store(self, key: Hashable, result: dict) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        negative = result.get("status") in NOT_FOUND_STATUSES
+        ttl = self.negative_ttl_seconds if negative else self.ttl_seconds
+        self.entries.put(key, copy.deepcopy(result), ttl)
+
+    def call(self, key: Hashable, backend: Callable[..., dict], *args: str) -> dict:
+        """Returns the cached result for `key`, or calls the backend and caches it."""
+        result = self._lookup(key)
+        if result is None:
+            # Concurrent misses for the same key share one backend call
+            result = self._misses.do(key, self._fetch, key, backend, *args)
+        return copy.deepcopy(result)
+
+    async def acall(
+        self, key: Hashable, backend: Callable[..., dict], *args: str
+    ) -> dict:
+        """Async variant of `call`: waits for the backend without blocking."""
+        result = self._lookup(key)
+        if result is None:
+            result = await self._misses.ado(key, self._afetch, key, backend, *args)
+        return copy.deepcopy(result)
+
+    def _fetch(self, key: Hashable, backend: Callable[..., dict], *args: str) -> dict:
+        if FLIGHT_OPS_LATENCY_SECONDS:
+            time.sleep(FLIGHT_OPS_LATENCY_SECONDS)
+        result = backend(*args)
+        self._store(key, result)
+        return result
+
+    async def _afetch(
+        self, key: Hashable, backend: Callable[..., dict], *args: str
+    ) -> dict:
+        if FLIGHT_OPS_LATENCY_SECONDS:
+            await asyncio.sleep(FLIGHT_OPS_LATENCY_SECONDS)
+        # The backend is a blocking inventory query; keep it off the event loop
+        result = await asyncio.to_thread(backend, *args)
+        self._store(key, result)
+        return result
+
+
+_NEGATIVE_TTL = float(os.getenv("FLIGHT_TOOLS_NEGATIVE_TTL_SECONDS", 15))
+_MAX_ENTRIES = int(os.getenv("FLIGHT_TOOLS_CACHE_MAX_ENTRIES", 4096))
+
+STATUS_CACHE = ToolCache(
+    "get_flight_status",
+    ttl_seconds=float(os.getenv("FLIGHT_STATUS_CACHE_TTL_SECONDS", 30)),
+    negative_ttl_seconds=_NEGATIVE_TTL,
+    max_entries=_MAX_ENTRIES,
+)
+DETAILS_CACHE = ToolCache(
+    "get_flight_details",
+    ttl_seconds=float(os.getenv("FLIGHT_DETAILS_CACHE_TTL_SECONDS", 300)),
+    negative_ttl_seconds=_NEGATIVE_TTL,
+    max_entries=_MAX_ENTRIES,
+)
+AVAILABILITY_CACHE = ToolCache(
+    "check_flight_availability",
+    ttl_seconds=float(os.getenv("FLIGHT_AVAILABILITY_CACHE_TTL_SECONDS", 600)),
+    negative_ttl_seconds=_NEGATIVE_TTL,
+    max_entries=_MAX_ENTRIES,
+)
+
+
+@lru_cache
+def get_flight_inventory() -> FlightInventory:
+    """Returns the flight inventory shared by every tool call."""
+    return build_flight_inventory()
+
+
+# --- Flight-ops backend ---
+def _fetch_flight_status(flight_number: str) -> dict:
+    print(f"--- Tool: Getting status for flight {flight_number} ---")
+    status = get_flight_inventory().flight_status(flight_number)
+    if status is None:
+        return {"status": "desconocido", "message": "No se encontró el vuelo."}
+    return status
+
+
+def _fetch_flight_details(flight_number: str, passenger_name: str) -> dict:
+    print(
+        f"--- Tool: Getting details for flight {flight_number} for {passenger_name} ---"
+    )
+    details = get_flight_inventory().reservation(flight_number, passenger_name)
+    if details is None:
+        return {
+            "status": "no_encontrado",
+            "message": "No se encontraron detalles para este vuelo y pasajero.",
+        }
+    return details
+
+
+def _fetch_flight_availability(origin: str, destination: str, date: str) -> dict:
+    print(
+        f"--- Tool: Checking availability for {origin} to {destination} on {date} ---"
+    )
+    flights = get_flight_inventory().available_flights(origin, destination, date)
+    if not flights:
+        return {
+            "available": False,
+            "message": "No hay vuelos disponibles para la ruta y fecha seleccionadas.",
+        }
+    return {"available": True, "flights": flights}
+
+
+def _details_key(flight_number: str, passenger_name: str) -> tuple[str, str]:
+    flight_number = normalize_flight_number(flight_number)
+    return flight_number, normalize_passenger_name(passenger_name)
+
+
+# --- Tools ---
+@timed(TOOL_LATENCY, tool="get_flight_status")
+def _get_flight_status(flight_number: str) -> dict:
+    """Gets the status of a flight.
 
     Args:
         flight_number: The flight number to check.
@@ -13,15 +206,20 @@ def get_flight_status(flight_number: str) -> dict:
     Returns:
         A dictionary with the flight status.
     """
-    print(f"--- Tool: Getting status for flight {flight_number} ---")
-    if "VW123" in flight_number:
-        return {"status": "a tiempo", "departure": "10:00", "arrival": "12:00"}
-    return {"status": "desconocido", "message": "No se encontró el vuelo."}
+    key = normalize_flight_number(flight_number)
+    return STATUS_CACHE.call(key, _fetch_flight_status, flight_number)
+
+
+@timed(TOOL_LATENCY, tool="get_flight_status")
+async def _aget_flight_status(flight_number: str) -> dict:
+    """Async variant of `_get_flight_status`."""
+    key = normalize_flight_number(flight_number)
+    return await STATUS_CACHE.acall(key, _fetch_flight_status, flight_number)
 
 
-@tool
-def get_flight_details(flight_number: str, passenger_name: str) -> dict:
-    """Simulates getting the details of a flight reservation.
+@timed(TOOL_LATENCY, tool="get_flight_details")
+def _get_flight_details(flight_number: str, passenger_name: str) -> dict:
+    """Gets the details of a flight reservation.
 
     Args:
         flight_number: The flight number.
@@ -30,26 +228,28 @@ def get_flight_details(flight_number: str, passenger_name: str) -> dict:
     Returns:
         A dictionary with the flight details.
     """
-    print(
-        f"--- Tool: Getting details for flight {flight_number} for {passenger_name} ---"
+    return DETAILS_CACHE.call(
+        _details_key(flight_number, passenger_name),
+        _fetch_flight_details,
+        flight_number,
+        passenger_name,
     )
-    if "VW123" in flight_number and "Juan Pérez" in passenger_name:
-        return {
-            "flight_number": "VW123",
-            "origin": "BUE",
-            "destination": "MAD",
-            "date": "2025-08-15",
-            "passenger": "Juan Pérez",
-        }
-    return {
-        "status": "no_encontrado",
-        "message": "No se encontraron detalles para este vuelo y pasajero.",
-    }
 
 
-@tool
-def check_flight_availability(origin: str, destination: str, date: str) -> dict:
-    """Simulates checking for available flights.
+@timed(TOOL_LATENCY, tool="get_flight_details")
+async def _aget_flight_details(flight_number: str, passenger_name: str) -> dict:
+    """Async variant of `_get_flight_details`."""
+    return await DETAILS_CACHE.acall(
+        _details_key(flight_number, passenger_name),
+        _fetch_flight_details,
+        flight_number,
+        passenger_name,
+    )
+
+
+@timed(TOOL_LATENCY, tool="check_flight_availability")
+def _check_flight_availability(origin: str, destination: str, date: str) -> dict:
+    """Checks for available flights.
 
     Args:
         origin: The origin airport code.
@@ -59,18 +259,84 @@ def check_flight_availability(origin: str, destination: str, date: str) -> dict:
     Returns:
         A dictionary with flight availability.
     """
-    print(
-        f"--- Tool: Checking availability for {origin} to {destination} on {date} ---"
+    return AVAILABILITY_CACHE.call(
+        (origin.upper(), destination.upper(), date),
+        _fetch_flight_availability,
+        origin,
+        destination,
+        date,
     )
-    if origin == "BUE" and destination == "MIA" and date == "2025-09-20":
-        return {
-            "available": True,
-            "flights": [
-                {"flight_number": "VW789", "time": "22:00"},
-                {"flight_number": "VW987", "time": "23:30"},
-            ],
-        }
-    return {
-        "available": False,
-        "message": "No hay vuelos disponibles para la ruta y fecha seleccionadas.",
-    }
+
+
+@timed(TOOL_LATENCY, tool="check_flight_availability")
+async def _acheck_flight_availability(origin: str, destination: str, date: str) -> dict:
+    """Async variant of `_check_flight_availability`."""
+    return await AVAILABILITY_CACHE.acall(
+        (origin.upper(), destination.upper(), date),
+        _fetch_flight_availability,
+        origin,
+        destination,
+        date,
+    )
+
+
+get_flight_status = StructuredTool.from_function(
+    func=_get_flight_status,
+    coroutine=_aget_flight_status,
+    name="get_flight_status",
+)
+get_flight_details = StructuredTool.from_function(
+    func=_get_flight_details,
+    coroutine=_aget_flight_details,
+    name="get_flight_details",
+)
+check_flight_availability = StructuredTool.from_function(
+    func=_check_flight_availability,
+    coroutine=_acheck_flight_availability,
+    name="check_flight_availability",
+)
+
+
+# --- Invalidation hooks ---
+def invalidate_flight(flight_number: str) -> int:
+    """
+    Drops a flight's cached status and reservation details.
+
+    Args:
+        flight_number: The flight whose data changed (e.g. a delay).
+
+    Returns:
+        The number of cached results dropped.
+    """
+    flight_number = normalize_flight_number(flight_number)
+    dropped = int(STATUS_CACHE.entries.invalidate(flight_number))
+    return dropped + DETAILS_CACHE.entries.invalidate_where(
+        lambda key: key[0] == flight_number
+    )
+
+
+def invalidate_availability(
+    origin: Optional[str] = None,
+    destination: Optional[str] = None,
+    date: Optional[str] = None,
+) -> int:
+    """
+    Drops cached availability results; every argument given must match.
+
+    Returns:
+        The number of cached results dropped.
+    """
+    wanted = (
+        origin and origin.upper(),
+        destination and destination.upper(),
+        date,
+    )
+    return AVAILABILITY_CACHE.entries.invalidate_where(
+        lambda key: all(w is None or w == k for w, k in zip(wanted, key))
+    )
+
+
+def clear_tool_caches() -> None:
+    """Drops every cached tool result."""
+    for cache in (STATUS_CACHE, DETAILS_CACHE, AVAILABILITY_CACHE):
+        cache.entries.clear()
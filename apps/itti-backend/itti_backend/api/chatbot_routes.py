@@ -1,8 +1,11 @@
 """API routes for the VuelaConNosotros chatbot."""
 
-from fastapi import APIRouter, Depends, HTTPException
+import threading
+
+from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import BaseModel
 
+from ..orchestrator.chatbot_graph import create_chatbot_graph
 from ..services.chatbot_service import ChatbotService
 
 # Create a router for the chatbot endpoints
@@ -17,11 +20,30 @@ class ChatRequest(BaseModel):
     session_id: str | None = None
 
 
+# Guards the first build of the shared ChatbotService
+_service_lock = threading.Lock()
+
+
 # Dependency injection for the ChatbotService
-def get_chatbot_service():
-    """Provides a ChatbotService instance."""
-    # This could be enhanced with a singleton pattern for production
-    return ChatbotService()
+def get_chatbot_service(request: Request) -> ChatbotService:
+    """
+    Provides the application-scoped ChatbotService, built on first use.
+
+    Building it creates the LLM clients, so the app starts without their
+    credentials; until they are configured, the chatbot routes answer 503.
+    """
+    state = request.app.state
+    with _service_lock:
+        if getattr(state, "chatbot_service", None) is None:
+            try:
+                state.chatbot_service = ChatbotService(
+                    create_chatbot_graph(checkpointer=state.checkpointer)
+                )
+            except ValueError as e:
+                raise HTTPException(
+                    status_code=503, detail=f"Chatbot unavailable: {e}"
+                ) from e
+    return state.chatbot_service
 
 
 @router.post("/chat", tags=["Chatbot"])
@@ -40,7 +62,7 @@ async def chat_with_bot(
         A JSON response with the chatbot's reply.
     """
     try:
-        response = chatbot_service.process_message(
+        response = await chatbot_service.aprocess_message(
             user_message=request.message, session_id=request.session_id
         )
         return {"response": response}
@@ -50,3 +72,17 @@ async def chat_with_bot(
         raise HTTPException(
             status_code=500, detail="An internal error occurred."
         ) from e
+
+
+@router.get("/sessions/stats", tags=["Chatbot"])
+def session_stats(request: Request):
+    """
+    Returns the number of stored sessions and the bytes their checkpoints hold.
+
+    Args:
+        request: The incoming request, used to reach the app's checkpointer.
+
+    Returns:
+        The checkpointer's session and storage counters.
+    """
+    return request.app.state.checkpointer.get_stats()
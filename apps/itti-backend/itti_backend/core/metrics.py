@@ -0,0 +1,210 @@
+"""Prometheus metrics for the request path (graph nodes, LLM calls, tools, parsing)."""
+
+import functools
+import inspect
+import os
+from contextlib import AbstractContextManager, nullcontext
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+
+# When disabled, the helpers below return shared no-ops and /metrics is not served
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# LLM calls and graph nodes take tens of ms to seconds; local work takes µs to ms
+_SLOW_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+_FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05, 0.1, 1)
+# Admission waits are usually ~0, and seconds when a provider budget runs out
+_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+NODE_LATENCY = Histogram(
+    "chatbot_node_duration_seconds",
+    "Time spent in each LangGraph node.",
+    ["node"],
+    buckets=_SLOW_BUCKETS,
+)
+LLM_LATENCY = Histogram(
+    "llm_call_duration_seconds",
+    "Time spent waiting for the LLM, by calling component.",
+    ["caller"],
+    buckets=_SLOW_BUCKETS,
+)
+STREAM_FIRST_TOKEN_LATENCY = Histogram(
+    "llm_stream_time_to_first_token_seconds",
+    "Time from a streamed request to the first token, by calling component.",
+    ["caller"],
+    buckets=_SLOW_BUCKETS,
+)
+STREAM_FIRST_FIELD_LATENCY = Histogram(
+    "llm_stream_time_to_first_answer_field_seconds",
+    "Time from a streamed request to the first answer field (response or "
+    "next_steps), by calling component.",
+    ["caller"],
+    buckets=_SLOW_BUCKETS,
+)
+TOOL_LATENCY = Histogram(
+    "tool_call_duration_seconds",
+    "Time spent in each chatbot tool.",
+    ["tool"],
+    buckets=_FAST_BUCKETS,
+)
+LLM_PROVIDER_LATENCY = Histogram(
+    "llm_provider_call_duration_seconds",
+    "Duration of the LLM router's completed calls, by provider.",
+    ["provider"],
+    buckets=_SLOW_BUCKETS,
+)
+LLM_QUEUE_WAIT = Histogram(
+    "llm_queue_wait_seconds",
+    "Time LLM calls waited for their provider's request and token budgets, "
+    "by provider and priority class (interactive, evaluation).",
+    ["provider", "priority"],
+    buckets=_WAIT_BUCKETS,
+)
+MICRO_BATCH_SIZE = Histogram(
+    "micro_batch_size",
+    "Items per upstream call made by a micro-batching layer, by operation.",
+    ["operation"],
+    buckets=(1, 2, 4, 8, 16, 32, 64),
+)
+PARSE_LATENCY = Histogram(
+    "prompt_parse_duration_seconds",
+    "Time spent turning an LLM completion into a BotResponse, by stage.",
+    ["stage"],
+    buckets=_FAST_BUCKETS,
+)
+EVALUATOR_METRIC_LATENCY = Histogram(
+    "evaluator_metric_duration_seconds",
+    "Time spent computing each evaluator metric.",
+    ["metric"],
+    buckets=_FAST_BUCKETS,
+)
+QUERY_CLASSIFIER_LATENCY = Histogram(
+    "query_classifier_duration_seconds",
+    "Time spent in the local Intent/Product classifier, by stage (embed, knn).",
+    ["stage"],
+    buckets=_FAST_BUCKETS,
+)
+INTENTS = Counter(
+    "chatbot_intents_total",
+    "Classified intents, by intent and by the tier that decided it.",
+    ["intent", "source"],
+)
+FALLBACK_RESPONSES = Counter(
+    "fallback_responses_total",
+    "Canned fallback answers returned instead of a generated one.",
+    ["component"],
+)
+PARSE_FAILURES = Counter(
+    "prompt_parse_failures_total",
+    "LLM completions that could not be turned into a BotResponse, by stage.",
+    ["stage"],
+)
+LLM_TOKENS = Counter(
+    "llm_tokens_total",
+    "Tokens reported by the LLM provider, by calling component and kind "
+    "(input, cached_input, output). Cached input tokens are part of the input.",
+    ["caller", "kind"],
+)
+TOOL_CACHE_LOOKUPS = Counter(
+    "tool_cache_lookups_total",
+    "Chatbot tool cache lookups, by tool and result (hit, negative_hit, miss).",
+    ["tool", "result"],
+)
+COALESCED_CALLS = Counter(
+    "coalesced_calls_total",
+    "Calls through the request-coalescing layer, by operation and role: "
+    "'leader' made the upstream call, 'coalesced' shared a leader's result.",
+    ["operation", "role"],
+)
+
+QUERY_ROUTES = Counter(
+    "query_routes_total",
+    "Queries routed by /chat/route, by source: 'local' (the embedding "
+    "classifier was confident) or 'llm' (a full generation).",
+    ["source"],
+)
+CLASSIFIER_DISAGREEMENTS = Counter(
+    "query_classifier_disagreements_total",
+    "LLM answers whose intent or product differs from the local classifier's, "
+    "by field.",
+    ["field"],
+)
+
+LLM_PROVIDER_CALLS = Counter(
+    "llm_provider_calls_total",
+    "Calls made by the LLM router, by provider and outcome (success, error, "
+    "cancelled: a hedged call that lost the race).",
+    ["provider", "outcome"],
+)
+LLM_HEDGED_CALLS = Counter(
+    "llm_hedged_calls_total",
+    "Hedge calls the LLM router sent because a call was slow, by hedge provider.",
+    ["provider"],
+)
+LLM_CIRCUIT_TRANSITIONS = Counter(
+    "llm_circuit_transitions_total",
+    "LLM router circuit breaker transitions, by provider and new state "
+    "(open, half_open, closed).",
+    ["provider", "state"],
+)
+
+_NOOP = nullcontext()
+
+
+def track(histogram: Histogram, **labels: str) -> AbstractContextManager:
+    """
+    Times the enclosed block into `histogram` with the given labels.
+
+    Returns a shared no-op context manager when metrics are disabled.
+    """
+    if not METRICS_ENABLED:
+        return _NOOP
+    return histogram.labels(**labels).time()
+
+
+def timed(histogram: Histogram, **labels: str):
+    """
+    Decorator that times every call of a sync or async function.
+
+    When metrics are disabled the function is returned unchanged.
+    """
+
+    def decorator(func):
+        if not METRICS_ENABLED:
+            return func
+        child = histogram.labels(**labels)
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with child.time():
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with child.time():
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def observe(histogram: Histogram, seconds: float, **labels: str) -> None:
+    """Records an already measured duration (no-op when disabled)."""
+    if METRICS_ENABLED:
+        histogram.labels(**labels).observe(seconds)
+
+
+def count(counter: Counter, amount: float = 1, **labels: str) -> None:
+    """Increments `counter` with the given labels (no-op when disabled)."""
+    if METRICS_ENABLED:
+        counter.labels(**labels).inc(amount)
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Returns the current metrics in Prometheus text format and its content type."""
+    return generate_latest(), CONTENT_TYPE_LATEST
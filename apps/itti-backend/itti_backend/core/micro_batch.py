@@ -0,0 +1,102 @@
+"""Micro-batching: calls arriving within a short window share one upstream call."""
+
+import threading
+from collections.abc import Callable, Sequence
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Generic, TypeVar
+
+from .metrics import MICRO_BATCH_SIZE, observe
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+@dataclass
+class _Batch(Generic[T, R]):
+    items: list[T] = field(default_factory=list)
+    futures: list[Future] = field(default_factory=list)
+    full: threading.Event = field(default_factory=threading.Event)
+
+
+class MicroBatcher(Generic[T, R]):
+    """
+    Groups calls made by concurrent threads into batches.
+
+    The first caller of a batch (the leader) waits up to `window_seconds` for
+    more items, or until `max_batch_size` have arrived, then calls
+    `func(items)` and hands each caller its result; `func` may return an
+    exception in place of an item's result, which is raised to that caller
+    only. If `func` raises, every caller of the batch gets the exception.
+    Like `SingleFlight.do`, it serves the sync graph nodes that LangGraph runs
+    in a thread pool, with no background thread of its own.
+    """
+
+    def __init__(
+        self,
+        operation: str,
+        func: Callable[[list[T]], Sequence[R]],
+        window_seconds: float,
+        max_batch_size: int,
+    ):
+        """
+        Initializes the batching layer of one operation.
+
+        Args:
+            operation: Label of the batched call in the metrics.
+            func: The upstream call; returns one result (or exception) per
+                item, in order.
+            window_seconds: How long a batch waits for more items.
+            max_batch_size: Items that close a batch before its window ends.
+        """
+        self.operation = operation
+        self.func = func
+        self.window_seconds = window_seconds
+        self.max_batch_size = max_batch_size
+        self._lock = threading.Lock()
+        self._open: _Batch[T, R] | None = None
+
+    def submit(self, item: T) -> R:
+        """
+        Adds `item` to the open batch and waits for its result.
+
+        Raises:
+            The exception the batch's upstream call raised, or returned for
+            this item.
+        """
+        future: Future = Future()
+        with self._lock:
+            batch = self._open
+            leader = batch is None
+            if batch is None:
+                batch = self._open = _Batch()
+            batch.items.append(item)
+            batch.futures.append(future)
+            if len(batch.items) >= self.max_batch_size:
+                self._open = None
+                batch.full.set()
+        if leader:
+            batch.full.wait(self.window_seconds)
+            with self._lock:
+                if self._open is batch:
+                    self._open = None
+            self._run(batch)
+        return future.result()
+
+    def _run(self, batch: _Batch[T, R]) -> None:
+        observe(MICRO_BATCH_SIZE, len(batch.items), operation=self.operation)
+        try:
+            results = self.func(batch.items)
+            if len(results) != len(batch.items):
+                raise ValueError(
+                    f"{len(results)} results for a batch of {len(batch.items)}"
+                )
+        except BaseException as e:
+            for future in batch.futures:
+                future.set_exception(e)
+            return
+        for future, result in zip(batch.futures, results):
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
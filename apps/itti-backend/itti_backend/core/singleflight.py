@@ -0,0 +1,141 @@
+"""Request coalescing: concurrent identical calls share one upstream call."""
+
+import asyncio
+import os
+import threading
+from collections.abc import Awaitable, Callable, Hashable
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, TypeVar
+
+from .metrics import COALESCED_CALLS, count
+
+# "false" makes every SingleFlight call straight through
+COALESCING_ENABLED = os.getenv("REQUEST_COALESCING_ENABLED", "true").lower() == "true"
+
+T = TypeVar("T")
+
+
+@dataclass
+class _AsyncFlight:
+    task: asyncio.Task
+    waiters: int = 0
+
+
+class SingleFlight:
+    """
+    Merges concurrent identical calls into one upstream call ("singleflight").
+
+    The first caller for a key (the leader) makes the call; callers that arrive
+    with the same key while it is in flight wait for it and get its result, or
+    its exception raised again. The key is forgotten as soon as the call ends,
+    so nothing is cached: a later call goes upstream again. The result object
+    is shared by every caller, so callers must not mutate it.
+
+    `do` serves threads (LangGraph runs the sync graph nodes in a thread pool).
+    Cancelling a request does not stop the thread it waits on, so a leader
+    always finishes and its followers are always answered.
+
+    `ado` serves coroutines; calls coalesce with those on the same event loop.
+    The call runs in its own task, so a cancelled caller (leader or not) only
+    stops waiting; the call itself is cancelled once no caller is left waiting
+    for it.
+    """
+
+    def __init__(self, operation: str, enabled: bool = COALESCING_ENABLED):
+        """
+        Initializes the coalescing layer of one operation.
+
+        Args:
+            operation: Label of the coalesced call in the metrics.
+            enabled: When False, every call goes straight upstream.
+        """
+        self.operation = operation
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, Future] = {}
+        self._flights: dict[Hashable, _AsyncFlight] = {}
+
+    def do(self, key: Hashable, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Calls `func(*args, **kwargs)`, or waits for the identical call in flight.
+
+        Args:
+            key: Identifies identical calls, e.g. normalized input plus model
+                and prompt version.
+            func: The upstream call.
+
+        Returns:
+            The upstream call's result.
+        """
+        if not self.enabled:
+            return func(*args, **kwargs)
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        count(COALESCED_CALLS, operation=self.operation, role=_role(leader))
+        if not leader:
+            return future.result()
+
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            self._forget(key)
+            future.set_exception(e)
+            raise
+        self._forget(key)
+        future.set_result(result)
+        return result
+
+    def _forget(self, key: Hashable) -> None:
+        with self._lock:
+            del self._calls[key]
+
+    async def ado(
+        self,
+        key: Hashable,
+        func: Callable[..., Awaitable[T]],
+        *args: Any,
+        **kwargs: Any,
+    ) -> T:
+        """
+        Awaits `func(*args, **kwargs)`, or the identical call in flight.
+
+        Args:
+            key: Identifies identical calls (see `do`).
+            func: The upstream coroutine function.
+
+        Returns:
+            The upstream call's result.
+        """
+        if not self.enabled:
+            return await func(*args, **kwargs)
+        # A task can only be awaited on its own loop (sync wrappers run their own)
+        key = (asyncio.get_running_loop(), key)
+        flight = self._flights.get(key)
+        count(COALESCED_CALLS, operation=self.operation, role=_role(flight is None))
+        if flight is None:
+            flight = _AsyncFlight(asyncio.ensure_future(func(*args, **kwargs)))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._end_flight(key, flight))
+
+        flight.waiters += 1
+        try:
+            # Shielded, so cancelling one caller leaves the call to the others
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Nobody is waiting anymore; later callers start a new call
+                self._end_flight(key, flight)
+                flight.task.cancel()
+
+    def _end_flight(self, key: Hashable, flight: _AsyncFlight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+
+def _role(leader: bool) -> str:
+    return "leader" if leader else "coalesced"
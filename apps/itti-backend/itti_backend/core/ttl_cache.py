@@ -0,0 +1,73 @@
+"""Thread-safe LRU cache whose entries expire after their own TTL."""
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from typing import Any, Optional
+
+
+class TTLCache:
+    """
+    LRU cache with a TTL per entry.
+
+    Expired entries are dropped when looked up; once `max_entries` is reached,
+    the least recently used entry is evicted. A lock makes it safe to share
+    between the event loop and the worker threads that run the sync graph nodes.
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        """
+        Initializes the cache.
+
+        Args:
+            max_entries: Maximum number of entries kept.
+        """
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # key -> (value, expires_at)
+        self._entries: OrderedDict[Hashable, tuple[Any, float]] = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Returns the live value stored under `key`, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: Any, ttl_seconds: float) -> None:
+        """Stores `value` under `key` for `ttl_seconds` (not stored if <= 0)."""
+        if ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> bool:
+        """Drops the entry stored under `key`; returns whether there was one."""
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Drops every entry whose key matches `predicate`; returns how many."""
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def clear(self) -> None:
+        """Drops every entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
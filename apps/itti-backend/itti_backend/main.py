@@ -1,29 +1,77 @@
 """FastAPI application for ITTI backend - Prompt Engineering Demo."""
 
+import asyncio
+import json
 import logging
+import os
 import sys
+from contextlib import asynccontextmanager
 from functools import lru_cache
-from typing import Annotated
+from typing import Annotated, Literal, Optional
 
 from dotenv import load_dotenv
-from fastapi import Depends, FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
 from langchain_core.language_models.chat_models import BaseChatModel
 
 from .api import chatbot_routes
 
 # Correct relative imports
+from .core.metrics import METRICS_ENABLED, render_metrics
 from .models.fintech_models import (
     BotResponse,
     CustomerQuery,
+    EvaluationJobStatus,
     FullEvaluationReport,
+    QueryRoute,
 )
+from .orchestrator.checkpointing import create_checkpointer, run_periodic_compaction
 from .services.comprehensive_evaluator import ComprehensiveEvaluator
+from .services.embedding_models import preload_embedding_models
+from .services.evaluation_jobs import (
+    EvaluationJob,
+    EvaluationJobManager,
+    create_job_manager,
+)
+from .services.evaluation_store import EvaluationResultStore, build_evaluation_store
+from .services.llm_scheduler import llm_priority
 from .services.llm_service import get_llm_client
+from .services.prompt_prefix_cache import PromptPrefixCache, build_prompt_prefix_cache
 from .services.prompt_service import PromptService
+from .services.query_classifier import KNNQueryClassifier, build_query_classifier
+from .services.response_cache import ResponseCache, build_response_cache
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Runs at import time so that, under `gunicorn --preload`, the weights are loaded
+# once in the master process and shared copy-on-write by the workers.
+preload_embedding_models()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Builds the application-scoped services once, at startup."""
+    # The checkpointer is shared by all requests, so conversation state survives
+    # between calls. The chatbot graph is compiled on its first request (see
+    # chatbot_routes.get_chatbot_service), so a missing LLM key only affects it.
+    checkpointer = create_checkpointer()
+    app.state.checkpointer = checkpointer
+    app.state.chatbot_service = None
+    compaction = asyncio.create_task(
+        run_periodic_compaction(
+            checkpointer, float(os.getenv("COMPACTION_INTERVAL_SECONDS", 300))
+        )
+    )
+    app.state.evaluation_jobs = create_job_manager()
+    yield
+    await app.state.evaluation_jobs.shutdown()
+    compaction.cancel()
+    if hasattr(checkpointer, "close"):
+        checkpointer.close()
+
+
 # --- App Configuration ---
 app = FastAPI(
     title="ITTI Prompt Engineering Demo",
@@ -33,6 +81,7 @@ app = FastAPI(
         "evaluation, and best practices."
     ),
     version="2.0.0",
+    lifespan=lifespan,
 )
 
 # --- VuelaConNosotros Chatbot Router ---
@@ -54,23 +103,111 @@ def get_llm() -> BaseChatModel:
     return get_llm_client()
 
 
+@lru_cache
+def get_response_cache() -> Optional[ResponseCache]:
+    """Provides the process-wide response cache for /chat (None if disabled)."""
+    return build_response_cache()
+
+
+@lru_cache
+def get_prompt_prefix_cache() -> Optional[PromptPrefixCache]:
+    """Provides the process-wide system-prompt prefix cache (None if disabled)."""
+    return build_prompt_prefix_cache()
+
+
+@lru_cache
+def get_query_classifier() -> Optional[KNNQueryClassifier]:
+    """Provides the process-wide local Intent/Product classifier (None if disabled)."""
+    return build_query_classifier()
+
+
 def get_prompt_service(
     llm: Annotated[BaseChatModel, Depends(get_llm)],
+    response_cache: Annotated[Optional[ResponseCache], Depends(get_response_cache)],
+    prefix_cache: Annotated[
+        Optional[PromptPrefixCache], Depends(get_prompt_prefix_cache)
+    ],
+    query_classifier: Annotated[
+        Optional[KNNQueryClassifier], Depends(get_query_classifier)
+    ],
+) -> PromptService:
+    """Provides an instance of the PromptService backed by the response cache."""
+    return PromptService(
+        llm_client=llm,
+        response_cache=response_cache,
+        prefix_cache=prefix_cache,
+        query_classifier=query_classifier,
+    )
+
+
+def get_evaluation_prompt_service(
+    llm: Annotated[BaseChatModel, Depends(get_llm)],
+    prefix_cache: Annotated[
+        Optional[PromptPrefixCache], Depends(get_prompt_prefix_cache)
+    ],
+    output_mode: Annotated[
+        Optional[Literal["text", "structured"]],
+        Query(description="PromptService output mode (default: PROMPT_OUTPUT_MODE)."),
+    ] = None,
 ) -> PromptService:
-    """Provides an instance of the PromptService."""
-    return PromptService(llm_client=llm)
+    """
+    Provides an uncached PromptService, so evaluations measure the LLM.
+
+    Only responses are uncached: the system-prompt prefix cache is kept, as in
+    production.
+    """
+    try:
+        return PromptService(
+            llm_client=llm, output_mode=output_mode, prefix_cache=prefix_cache
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+
+@lru_cache
+def get_evaluation_store() -> Optional[EvaluationResultStore]:
+    """Provides the process-wide evaluation result store (None if disabled)."""
+    return build_evaluation_store()
 
 
 def get_evaluator(
     llm: Annotated[BaseChatModel, Depends(get_llm)],
+    result_store: Annotated[
+        Optional[EvaluationResultStore], Depends(get_evaluation_store)
+    ],
+    query_classifier: Annotated[
+        Optional[KNNQueryClassifier], Depends(get_query_classifier)
+    ],
 ) -> ComprehensiveEvaluator:
     """Provides an instance of the ComprehensiveEvaluator."""
-    return ComprehensiveEvaluator(llm_client=llm)
+    return ComprehensiveEvaluator(
+        llm_client=llm, result_store=result_store, query_classifier=query_classifier
+    )
+
+
+def get_job_manager(request: Request) -> EvaluationJobManager:
+    """Provides the application-scoped evaluation job manager built at startup."""
+    return request.app.state.evaluation_jobs
+
+
+def get_job(
+    job_id: str, jobs: Annotated[EvaluationJobManager, Depends(get_job_manager)]
+) -> EvaluationJob:
+    """Resolves the `job_id` path parameter to a job, or responds 404."""
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Evaluation job not found")
+    return job
 
 
 # --- Type Hinting for Dependencies ---
 PromptServiceDep = Annotated[PromptService, Depends(get_prompt_service)]
+EvaluationPromptServiceDep = Annotated[
+    PromptService, Depends(get_evaluation_prompt_service)
+]
 ComprehensiveEvaluatorDep = Annotated[ComprehensiveEvaluator, Depends(get_evaluator)]
+JobManagerDep = Annotated[EvaluationJobManager, Depends(get_job_manager)]
+JobDep = Annotated[EvaluationJob, Depends(get_job)]
 
 
 # --- API Endpoints ---
@@ -86,10 +223,24 @@ def read_root():
             "chat": "/chat",
             "single_test": "/testing/run-single",
             "full_evaluation": "/evaluation/run-full-dataset",
+            "evaluation_jobs": "/evaluation/jobs",
         },
     }
 
 
+@app.get(
+    "/metrics",
+    tags=["General"],
+    summary="Prometheus metrics (latency histograms and counters)",
+)
+def metrics_endpoint():
+    """Returns the process metrics in Prometheus text format."""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
 @app.post(
     "/chat",
     tags=["Interaction"],
@@ -99,12 +250,71 @@ def read_root():
 async def chat_endpoint(query: CustomerQuery, prompt_service: PromptServiceDep):
     """Receives a customer query and returns the bot's response."""
     try:
-        return prompt_service.generate_response(query)
+        return await prompt_service.agenerate_response(query)
     except Exception as e:
         logging.error(f"Error in chat endpoint: {e}")
         raise HTTPException(status_code=500, detail="Internal Server Error") from e
 
 
+@app.post(
+    "/chat/route",
+    tags=["Interaction"],
+    response_model=QueryRoute,
+    summary="Get a query's intent and product, skipping the LLM when possible",
+)
+async def chat_route_endpoint(query: CustomerQuery, prompt_service: PromptServiceDep):
+    """Returns the query's labels: local when confident, else from the LLM."""
+    try:
+        return await prompt_service.aroute_query(query)
+    except Exception as e:
+        logging.error(f"Error in chat route endpoint: {e}")
+        raise HTTPException(status_code=500, detail="Internal Server Error") from e
+
+
+def _format_sse(event: str, data: dict) -> str:
+    """Formats a Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post(
+    "/chat/stream",
+    tags=["Interaction"],
+    summary="Stream the chatbot's answer as Server-Sent Events",
+)
+async def chat_stream_endpoint(query: CustomerQuery, prompt_service: PromptServiceDep):
+    """
+    Streams the answer to a customer query as Server-Sent Events.
+
+    Emits `reasoning` and `field` (response, next_steps) events as soon as they
+    are parsed from the LLM stream, then a `final` event with the validated
+    BotResponse and the time-to-first-token / time-to-first-answer-field metrics.
+    """
+
+    async def event_stream():
+        try:
+            async for event, data in prompt_service.astream_response(query):
+                yield _format_sse(event, data)
+        except Exception as e:
+            logging.error(f"Error in chat stream endpoint: {e}")
+            yield _format_sse("error", {"detail": "Internal Server Error"})
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+@app.get(
+    "/chat/cache-stats",
+    tags=["Interaction"],
+    summary="Response cache hit, miss and latency-saved counters",
+)
+def chat_cache_stats(
+    response_cache: Annotated[Optional[ResponseCache], Depends(get_response_cache)],
+):
+    """Returns the response cache counters, or a disabled status."""
+    if response_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **response_cache.get_stats()}
+
+
 @app.post(
     "/testing/run-single",
     tags=["Testing & Evaluation"],
@@ -112,15 +322,18 @@ async def chat_endpoint(query: CustomerQuery, prompt_service: PromptServiceDep):
     summary="Run a single evaluation",
 )
 async def run_single_evaluation(
-    query: CustomerQuery, evaluator: ComprehensiveEvaluatorDep
+    query: CustomerQuery,
+    evaluator: ComprehensiveEvaluatorDep,
+    prompt_service: EvaluationPromptServiceDep,
 ):
     """Runs a single evaluation and returns the report."""
     try:
-        # This endpoint requires a prompt_service instance to generate the response
-        # before evaluating it. We can get it from the dependency system.
-        prompt_service = get_prompt_service(llm=evaluator.llm_client)
-        bot_response = prompt_service.generate_response(query)
-        evaluation_result = evaluator.evaluate_single_response(query, bot_response)
+        with llm_priority("evaluation"):
+            bot_response = await prompt_service.agenerate_response(query)
+        # Scoring runs the embedding model, so keep it off the event loop
+        evaluation_result = await run_in_threadpool(
+            evaluator.evaluate_single_response, query, bot_response
+        )
         return evaluator.generate_report([evaluation_result])
     except Exception as e:
         logging.error(f"Error in single evaluation endpoint: {e}")
@@ -134,18 +347,125 @@ async def run_single_evaluation(
     summary="Run full evaluation on the dataset",
 )
 async def run_full_evaluation_endpoint(
-    evaluator: ComprehensiveEvaluatorDep, prompt_service: PromptServiceDep
+    evaluator: ComprehensiveEvaluatorDep,
+    prompt_service: EvaluationPromptServiceDep,
+    max_concurrency: Annotated[
+        Optional[int],
+        Query(ge=1, le=64, description="Max LLM generations in flight."),
+    ] = None,
+    force: Annotated[
+        bool, Query(description="Recompute every item, ignoring stored results.")
+    ] = False,
 ):
     """Runs a full evaluation on the dataset and returns the report."""
     try:
         # Ensure both services use the same LLM instance
-        report = await evaluator.run_full_evaluation(prompt_service=prompt_service)
+        report = await evaluator.run_full_evaluation(
+            prompt_service=prompt_service,
+            max_concurrency=max_concurrency,
+            force=force,
+        )
         return report
     except Exception as e:
         logging.error(f"Error in full evaluation endpoint: {e}")
         raise HTTPException(status_code=500, detail="Internal Server Error") from e
 
 
+@app.post(
+    "/evaluation/jobs",
+    tags=["Testing & Evaluation"],
+    response_model=EvaluationJobStatus,
+    status_code=202,
+    summary="Start a full evaluation in the background",
+)
+async def create_evaluation_job(
+    evaluator: ComprehensiveEvaluatorDep,
+    prompt_service: EvaluationPromptServiceDep,
+    jobs: JobManagerDep,
+    max_concurrency: Annotated[
+        Optional[int],
+        Query(ge=1, le=64, description="Max LLM generations in flight."),
+    ] = None,
+    force: Annotated[
+        bool, Query(description="Recompute every item, ignoring stored results.")
+    ] = False,
+):
+    """
+    Queues a full-dataset evaluation and returns its job id right away.
+
+    Jobs run in a bounded worker pool (EVALUATION_JOB_WORKERS); poll
+    `/evaluation/jobs/{job_id}` for progress or stream its results.
+    """
+    job = jobs.submit(evaluator, prompt_service, max_concurrency, force)
+    return job.get_status()
+
+
+@app.get(
+    "/evaluation/jobs/{job_id}",
+    tags=["Testing & Evaluation"],
+    response_model=EvaluationJobStatus,
+    summary="Get the progress of an evaluation job",
+)
+async def get_evaluation_job(job: JobDep):
+    """Returns the job's status, progress, ETA and metrics of the rows done so far."""
+    return job.get_status()
+
+
+@app.get(
+    "/evaluation/jobs/{job_id}/results",
+    tags=["Testing & Evaluation"],
+    summary="Stream an evaluation job's results as Server-Sent Events",
+)
+async def stream_evaluation_job(
+    job: JobDep,
+    start: Annotated[int, Query(ge=0, description="Results to skip.")] = 0,
+):
+    """
+    Streams the job's results as Server-Sent Events, in completion order.
+
+    Results done before the request are sent first. Each `result` event holds
+    the dataset index, whether it was reused from the store and the
+    EvaluationResult; an `end` event with the final job status closes the stream.
+    """
+
+    async def event_stream():
+        async for index, result, reused in job.stream_results(start):
+            yield _format_sse(
+                "result",
+                {"index": index, "reused": reused, "result": result.model_dump()},
+            )
+        yield _format_sse("end", job.get_status().model_dump())
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+@app.get(
+    "/evaluation/jobs/{job_id}/report",
+    tags=["Testing & Evaluation"],
+    response_model=FullEvaluationReport,
+    summary="Get the report of a finished evaluation job",
+)
+async def get_evaluation_job_report(job: JobDep):
+    """Returns the job's report; cancelled and failed jobs report the rows done."""
+    if not job.finished:
+        raise HTTPException(status_code=409, detail="Evaluation job still running")
+    if not job.results:
+        raise HTTPException(status_code=409, detail="Evaluation job has no results")
+    return job.get_report()
+
+
+@app.post(
+    "/evaluation/jobs/{job_id}/cancel",
+    tags=["Testing & Evaluation"],
+    response_model=EvaluationJobStatus,
+    summary="Cancel an evaluation job",
+)
+async def cancel_evaluation_job(job: JobDep, jobs: JobManagerDep):
+    """Cancels a queued or running job; the results done so far are kept."""
+    await jobs.cancel(job.id)
+    return job.get_status()
+
+
 # To run the app locally: uvicorn itti_backend.main:app --reload
 if __name__ == "__main__":
     import uvicorn
@@ -47,6 +47,27 @@ class CustomerQuery(BaseModel):
     )
 
 
+class QueryClassification(BaseModel):
+    """Intent and product predicted by the local embedding classifier."""
+
+    intent: Intent
+    product: Product
+    intent_confidence: float
+    product_confidence: float
+    # The lower of the two, compared with the threshold to skip the LLM
+    confidence: float
+
+
+class QueryRoute(BaseModel):
+    """Routing labels of a query, from the local classifier or the LLM."""
+
+    original_query: str
+    intent: Optional[Intent]
+    product: Optional[Product]
+    confidence: float
+    source: str  # "local" (embedding classifier) or "llm" (full generation)
+
+
 class BotResponse(BaseModel):
     """Bot response model, containing the generated text and extracted data."""
 
@@ -56,6 +77,18 @@ class BotResponse(BaseModel):
     detected_product: Optional[Product]
     confidence: float
     reasoning: Optional[str] = None
+    # Generation diagnostics, used by the evaluator to compare output modes.
+    # Token counts come from the provider's usage metadata; cached input
+    # tokens are the part of the input served from its prompt cache.
+    input_tokens: Optional[int] = None
+    cached_input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+    latency_seconds: Optional[float] = None
+    parse_failed: bool = False
+    # Validation by the local classifier: its labels, and whether they differ
+    # from the LLM's detected intent or product
+    local_classification: Optional[QueryClassification] = None
+    classification_disagreement: bool = False
 
 
 class ExtractedData(BaseModel):
@@ -70,6 +103,14 @@ class ExtractedData(BaseModel):
     next_steps: str = Field(description="Suggested next steps for the customer")
 
 
+class StructuredBotOutput(ExtractedData):
+    """Schema bound to the LLM in structured output mode, with the reasoning."""
+
+    reasoning: str = Field(
+        description="Brief reasoning behind the chosen intent and product"
+    )
+
+
 class EvaluationResult(BaseModel):
     """Comprehensive evaluation result for a single interaction."""
 
@@ -99,6 +140,20 @@ class EvaluationResult(BaseModel):
     professional_tone: float = 0.0
     readability: float = 0.0
 
+    # Generation diagnostics (see BotResponse)
+    input_tokens: Optional[int] = None
+    cached_input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+    latency_seconds: Optional[float] = None
+    parse_failed: bool = False
+
+    # Local classifier's labels for the query (see QueryClassification)
+    classifier_intent: Optional[Intent] = None
+    classifier_product: Optional[Product] = None
+    classifier_confidence: Optional[float] = None
+    classifier_intent_correct: Optional[bool] = None
+    classifier_product_correct: Optional[bool] = None
+
 
 class SummaryMetrics(BaseModel):
     total_evaluated: int
@@ -112,6 +167,15 @@ class SummaryMetrics(BaseModel):
     average_actionability: float = 0.0
     average_professional_tone: float = 0.0
     average_readability: float = 0.0
+    parse_failure_rate: float = 0.0
+    average_input_tokens: Optional[float] = None
+    # Share of the input tokens served from the provider's prompt cache
+    cached_input_token_rate: Optional[float] = None
+    average_output_tokens: Optional[float] = None
+    average_latency_seconds: Optional[float] = None
+    # Local classifier, next to the LLM's intent and product accuracy
+    classifier_intent_accuracy: Optional[float] = None
+    classifier_product_accuracy: Optional[float] = None
 
 
 class FullEvaluationReport(BaseModel):
@@ -120,3 +184,21 @@ class FullEvaluationReport(BaseModel):
     summary_metrics: SummaryMetrics
     detailed_results: list[EvaluationResult]
     logs: list[str] = []
+    output_mode: Optional[str] = None  # PromptService output mode of the run
+    # Incremental runs: items served from the result store vs. computed again
+    reused_items: int = 0
+    recomputed_items: int = 0
+
+
+class EvaluationJobStatus(BaseModel):
+    """Progress of a background evaluation job, with metrics of the rows done so far."""
+
+    job_id: str
+    status: str  # queued, running, completed, failed or cancelled
+    total_items: int
+    completed_items: int = 0
+    reused_items: int = 0
+    progress: float = 0.0
+    eta_seconds: Optional[float] = None
+    summary_metrics: Optional[SummaryMetrics] = None
+    error: Optional[str] = None
@@ -1,25 +1,105 @@
 """Intent classifier for the VuelaConNosotros chatbot."""
 
+import json
+import os
+
+from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
 
-from ..core.config import settings
+from ..core.metrics import (
+    FALLBACK_RESPONSES,
+    INTENTS,
+    LLM_LATENCY,
+    PARSE_FAILURES,
+    count,
+    track,
+)
+from ..core.micro_batch import MicroBatcher
+from ..core.singleflight import SingleFlight
+from ..services.llm_service import get_llm_client, get_model_name
+from ..services.response_cache import build_namespace, normalize_query
+from .intent_rules import IntentRuleMatcher
+
+# Few-shot examples shown to the LLM, also used to check the rule tier
+FEW_SHOT_EXAMPLES = [
+    ("Hola, ¿cómo estás?", "saludo"),
+    ("Quisiera saber cómo viene el vuelo VW123", "consultar_estado_vuelo"),
+    ("Necesito cambiar mi pasaje a Madrid", "cambiar_vuelo"),
+    ("Adiós, que tengas un buen día", "despedida"),
+    ("Muchas gracias por tu ayuda", "agradecimiento"),
+    ("¿Cuál es la capital de Mongolia?", "desconocida"),
+]
+
+INTENT_LABELS = {intent for _, intent in FEW_SHOT_EXAMPLES}
+
+# Messages sent to the LLM within the window (or until the batch is full) are
+# classified in one call; a window of 0 sends one call per message. Batching is
+# opt-in: every message that reaches the LLM waits up to the window for others,
+# which only pays off when several arrive within it (high QPS, or a tight
+# provider rate limit). Keep it at 0 with the record and replay providers:
+# which messages share a batch depends on timing, so a cassette recorded with
+# batching could not be replayed.
+INTENT_BATCH_WINDOW_MS = float(os.getenv("INTENT_BATCH_WINDOW_MS", "0"))
+INTENT_BATCH_MAX_SIZE = int(os.getenv("INTENT_BATCH_MAX_SIZE", "16"))
 
 
 class IntentClassifier:
-    """Classifies the user's intent based on their message."""
-
-    def __init__(self):
-        """Initializes the IntentClassifier."""
-        self.llm = ChatGoogleGenerativeAI(
-            model=settings.GEMINI_MODEL,
-            google_api_key=settings.GEMINI_API_KEY,
-            temperature=0,
-        )
+    """
+    Classifies the user's intent based on their message.
+
+    Unambiguous messages are answered by a deterministic rule tier; only the
+    rest are sent to the LLM. Identical messages classified at the same time
+    (e.g. many users asking about one delayed flight) share one LLM call, and
+    different messages arriving within a few milliseconds are classified
+    together in one call that returns a JSON list of intents.
+    """
+
+    def __init__(
+        self,
+        llm: BaseChatModel | None = None,
+        use_fast_path: bool = True,
+        batch_window_ms: float = INTENT_BATCH_WINDOW_MS,
+        max_batch_size: int = INTENT_BATCH_MAX_SIZE,
+    ):
+        """
+        Initializes the IntentClassifier.
+
+        Args:
+            llm: An optional chat model to classify with. Defaults to the client
+                configured by LLM_PROVIDER.
+            use_fast_path: Whether to try the rule tier before calling the LLM.
+            batch_window_ms: How long a message waits for others to share its
+                LLM call; 0 disables batching.
+            max_batch_size: Messages that start a batched call before the
+                window ends.
+        """
+        self.rule_matcher = IntentRuleMatcher() if use_fast_path else None
+        self.llm = llm or get_llm_client(temperature=0)
         self.prompt = self._build_prompt()
+        self.chain = self.prompt | self.llm
+        self.batch_chain = self._build_prompt(batched=True) | self.llm
+        self._batcher = None
+        if batch_window_ms > 0 and max_batch_size > 1:
+            self._batcher = MicroBatcher(
+                "intent_classifier",
+                self._classify_batch_with_llm,
+                window_seconds=batch_window_ms / 1000,
+                max_batch_size=max_batch_size,
+            )
+        # Coalescing key prefix: prompt version and model
+        self.namespace = build_namespace(
+            self.prompt.pretty_repr(), get_model_name(self.llm)
+        )
+        self._flights = SingleFlight("intent_classifier")
 
-    def _build_prompt(self) -> ChatPromptTemplate:
-        """Builds the prompt for intent classification with few-shot examples."""
+    def _build_prompt(self, batched: bool = False) -> ChatPromptTemplate:
+        """
+        Builds the prompt for intent classification with few-shot examples.
+
+        The batched prompt classifies a JSON list of messages and asks for a
+        JSON list of intents; it shares the single prompt's opening, so the
+        provider can reuse its cached prefix.
+        """
         system_message = """
             Eres un clasificador de intenciones. Tu única tarea es clasificar el texto del usuario en una de las siguientes categorías:
             - consultar_estado_vuelo
@@ -29,16 +109,29 @@ class IntentClassifier:
             - agradecimiento
             - desconocida
 
-            Responde únicamente con el nombre de la categoría. No agregues explicaciones ni texto adicional.
+            """
+        if batched:
+            system_message += """Recibirás una lista JSON de mensajes de distintos
+            usuarios. Responde únicamente con una lista JSON con el nombre de
+            la categoría de cada mensaje, en el mismo orden. No agregues
+            explicaciones ni texto adicional.
+
+            Ejemplos:
+            """
+            texts, intents = zip(*FEW_SHOT_EXAMPLES)
+            system_message += (
+                f"- Usuarios: {json.dumps(list(texts), ensure_ascii=False)}"
+                f" -> {json.dumps(list(intents))}\n            "
+            )
+        else:
+            system_message += """Responde únicamente con el nombre de la categoría. No agregues explicaciones ni texto adicional.
 
             Ejemplos:
-            - Usuario: "Hola, ¿cómo estás?" -> saludo
-            - Usuario: "Quisiera saber cómo viene el vuelo VW123" -> consultar_estado_vuelo
-            - Usuario: "Necesito cambiar mi pasaje a Madrid" -> cambiar_vuelo
-            - Usuario: "Adiós, que tengas un buen día" -> despedida
-            - Usuario: "Muchas gracias por tu ayuda" -> agradecimiento
-            - Usuario: "¿Cuál es la capital de Mongolia?" -> desconocida
             """
+            system_message += "".join(
+                f'- Usuario: "{text}" -> {intent}\n            '
+                for text, intent in FEW_SHOT_EXAMPLES
+            )
         return ChatPromptTemplate.from_messages(
             [
                 ("system", system_message),
@@ -55,10 +148,89 @@ class IntentClassifier:
         Returns:
             The classified intent as a string.
         """
-        chain = self.prompt | self.llm
+        if self.rule_matcher is not None:
+            intent = self.rule_matcher.match(text)
+            if intent is not None:
+                count(INTENTS, intent=intent, source="rules")
+                return intent
+
         try:
-            result = chain.invoke({"text": text})
-            return result.content.strip()
+            intent = self._flights.do(
+                (self.namespace, normalize_query(text)), self._classify_upstream, text
+            )
+            # Free-form LLM output is bucketed so the label set stays bounded
+            label = intent if intent in INTENT_LABELS else "otro"
+            count(INTENTS, intent=label, source="llm")
+            return intent
         except Exception as e:
             print(f"Error during intent classification: {e}")
+            count(FALLBACK_RESPONSES, component="intent_classifier")
             return "desconocida"
+
+    def _classify_upstream(self, text: str) -> str:
+        """Classifies the text with the LLM, in a batch when batching is enabled."""
+        if self._batcher is None:
+            return self._classify_with_llm(text)
+        return self._batcher.submit(text)
+
+    def _classify_with_llm(self, text: str) -> str:
+        """Asks the LLM for the intent label of the text."""
+        with track(LLM_LATENCY, caller="intent_classifier"):
+            result = self.chain.invoke({"text": text})
+        return result.content.strip()
+
+    def _classify_batch_with_llm(self, texts: list[str]) -> list[str | Exception]:
+        """
+        Asks the LLM for the intent labels of several texts in one call.
+
+        Texts the batched call gives no known intent for (the call failed, its
+        answer is not a JSON list with one intent per text, or it names an
+        intent outside INTENT_LABELS) are classified on their own, concurrently.
+        A text whose own call fails gets that error; the others are answered.
+        """
+        if len(texts) == 1:
+            return [self._classify_with_llm(texts[0])]
+        intents: list[str | Exception | None] = [None] * len(texts)
+        try:
+            with track(LLM_LATENCY, caller="intent_classifier"):
+                result = self.batch_chain.invoke(
+                    {"text": json.dumps(texts, ensure_ascii=False)}
+                )
+        except Exception as e:
+            print(f"Error during batched intent classification: {e}")
+        else:
+            parsed = _parse_intent_list(result.content, len(texts)) or intents
+            intents = [intent if intent in INTENT_LABELS else None for intent in parsed]
+            if None in intents:
+                count(PARSE_FAILURES, stage="intent_batch")
+
+        retry = [i for i, intent in enumerate(intents) if intent is None]
+        if retry:
+            with track(LLM_LATENCY, caller="intent_classifier"):
+                results = self.chain.batch(
+                    [{"text": texts[i]} for i in retry], return_exceptions=True
+                )
+            for i, result in zip(retry, results):
+                failed = isinstance(result, Exception)
+                intents[i] = result if failed else result.content.strip()
+        return intents
+
+    def get_fast_path_stats(self) -> dict:
+        """Returns the rule tier's hit-rate counters (empty when disabled)."""
+        return self.rule_matcher.get_stats() if self.rule_matcher else {}
+
+
+def _parse_intent_list(content: str, size: int) -> list[str] | None:
+    """Returns the intents in a JSON list answer, or None if it has not `size`."""
+    start, end = content.find("["), content.rfind("]")
+    try:
+        intents = json.loads(content[start : end + 1]) if start >= 0 else None
+    except json.JSONDecodeError:
+        return None
+    if (
+        not isinstance(intents, list)
+        or len(intents) != size
+        or not all(isinstance(intent, str) for intent in intents)
+    ):
+        return None
+    return [intent.strip() for intent in intents]
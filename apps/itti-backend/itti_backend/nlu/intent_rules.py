@@ -0,0 +1,114 @@
+"""Deterministic rule tier that classifies unambiguous messages without the LLM."""
+
+import re
+import threading
+from collections import Counter
+
+from ..services.response_cache import normalize_query
+
+# Same pattern the flight agents use to extract a flight number
+FLIGHT_NUMBER_PATTERN = re.compile(r"[A-Z]{2}\d{3,4}")
+
+# --- Courtesy intents: the whole (normalized) message must match ---
+_GREETING = re.compile(
+    r"(hola|holi|buenas|buen dia|buenos dias|buenas tardes|buenas noches|saludos|hey)"
+    r"( (como estas|como esta|que tal))?"
+)
+_FAREWELL = re.compile(
+    r"(adios|chao|chau|hasta luego|hasta pronto|hasta manana|nos vemos|bye)"
+    r"( que (tengas|tenga) (un )?(buen|lindo|excelente|feliz) dia)?"
+)
+_THANKS = re.compile(
+    r"((muchas|mil|muchisimas) )?gracias"
+    r"( (por (tu|su|la) (ayuda|atencion|tiempo|informacion)|muy amable))?"
+    r"|te lo agradezco|muy amable"
+)
+
+# --- Task intents: an action word must appear together with its object ---
+_CHANGE = re.compile(
+    r"\b(cambiar|cambio|cambiame|modificar|reprogramar|mover)\b"
+    r".*\b(vuelo|pasaje|reserva|boleto|billete|fecha|tiquete)s?\b"
+)
+_STATUS = re.compile(
+    r"\b(estado|como viene|como va|a tiempo|retrasado|demorado|cancelado|"
+    r"horario|a que hora)\b.*\bvuelo\b"
+    r"|\bvuelo\b.*\b(estado|viene|a tiempo|retrasado|demorado|cancelado|horario)\b"
+)
+_STATUS_WITH_FLIGHT = re.compile(
+    r"\b(estado|como viene|como va|a tiempo|retrasado|demorado|cancelado|"
+    r"horario|sale|llega|consultar)\b"
+)
+
+_FULL_MATCH_RULES = (
+    ("saludo", _GREETING),
+    ("despedida", _FAREWELL),
+    ("agradecimiento", _THANKS),
+)
+
+
+class IntentRuleMatcher:
+    """
+    Answers high-confidence intents locally, in microseconds.
+
+    `match` returns an intent only when exactly one rule fires; anything
+    ambiguous or unknown returns None so the caller can fall back to the LLM.
+    Hit and fallback counters are kept per instance and are thread-safe.
+    """
+
+    def __init__(self):
+        """Initializes the matcher and its counters."""
+        self._lock = threading.Lock()
+        self._hits: Counter[str] = Counter()
+        self._fallbacks = 0
+
+    def _match(self, text: str) -> str | None:
+        normalized = normalize_query(text)
+        if not normalized:
+            return None
+
+        has_flight_number = FLIGHT_NUMBER_PATTERN.search(text.upper()) is not None
+        candidates = set()
+        if _CHANGE.search(normalized):
+            candidates.add("cambiar_vuelo")
+        if _STATUS.search(normalized) or (
+            has_flight_number and _STATUS_WITH_FLIGHT.search(normalized)
+        ):
+            candidates.add("consultar_estado_vuelo")
+        if not candidates and not has_flight_number:
+            for intent, pattern in _FULL_MATCH_RULES:
+                if pattern.fullmatch(normalized):
+                    candidates.add(intent)
+
+        return candidates.pop() if len(candidates) == 1 else None
+
+    def match(self, text: str) -> str | None:
+        """
+        Classifies the message if a single rule matches it with high confidence.
+
+        Args:
+            text: The user's message.
+
+        Returns:
+            The intent name, or None when the LLM should decide.
+        """
+        intent = self._match(text)
+        with self._lock:
+            if intent is None:
+                self._fallbacks += 1
+            else:
+                self._hits[intent] += 1
+        return intent
+
+    def get_stats(self) -> dict:
+        """Returns rule hits per intent, LLM fallbacks and the overall hit rate."""
+        with self._lock:
+            hits = dict(self._hits)
+            fallbacks = self._fallbacks
+        total_hits = sum(hits.values())
+        total = total_hits + fallbacks
+        return {
+            "rule_hits": hits,
+            "total_rule_hits": total_hits,
+            "llm_fallbacks": fallbacks,
+            "hit_rate": total_hits / total if total else 0.0,
+        }
@@ -1,13 +1,21 @@
 """Orchestrator for the VuelaConNosotros chatbot using LangGraph."""
 
+from functools import partial
 from typing import TypedDict
 
-from langgraph.checkpoint.memory import MemorySaver
+from langchain_core.runnables import RunnableLambda
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.graph import END, StateGraph
 
 from ..agents.flight_change_agent import FlightChangeAgent
 from ..agents.flight_status_agent import FlightStatusAgent
+from ..core.metrics import FALLBACK_RESPONSES, NODE_LATENCY, count, track
 from ..nlu.intent_classifier import IntentClassifier
+from .checkpointing import create_checkpointer
+from .node_registry import NodeRegistry
+
+# Turns of a session kept in its state (and so in its checkpoint)
+MAX_HISTORY_TURNS = 20
 
 
 # 1. Define the state of the graph
@@ -21,10 +29,9 @@ class ChatbotState(TypedDict):
 
 
 # 2. Define the nodes of the graph
-def classify_node(state: ChatbotState) -> ChatbotState:
+def classify_node(state: ChatbotState, classifier: IntentClassifier) -> ChatbotState:
     """Classifies the user's intent."""
     print("--- Node: Classifying Intent ---")
-    classifier = IntentClassifier()
     intent = classifier.classify(state["current_message"])
     return {
         "current_message": state["current_message"],
@@ -34,10 +41,9 @@ def classify_node(state: ChatbotState) -> ChatbotState:
     }
 
 
-def flight_status_node(state: ChatbotState) -> ChatbotState:
+def flight_status_node(state: ChatbotState, agent: FlightStatusAgent) -> ChatbotState:
     """Handles flight status inquiries."""
     print("--- Node: Handling Flight Status ---")
-    agent = FlightStatusAgent()
     response = agent.run(dict(state))
     return {
         "current_message": state["current_message"],
@@ -47,12 +53,25 @@ def flight_status_node(state: ChatbotState) -> ChatbotState:
     }
 
 
-def flight_change_node(state: ChatbotState) -> ChatbotState:
+async def aflight_status_node(
+    state: ChatbotState, agent: FlightStatusAgent
+) -> ChatbotState:
+    """Async variant of `flight_status_node`: the tool call doesn't block the loop."""
+    print("--- Node: Handling Flight Status ---")
+    response = await agent.arun(dict(state))
+    return {
+        "current_message": state["current_message"],
+        "intent": state["intent"],
+        "agent_response": response["agent_response"],
+        "history": state.get("history", []),
+    }
+
+
+def flight_change_node(state: ChatbotState, agent: FlightChangeAgent) -> ChatbotState:
     """Handles flight change requests."""
     print("--- Node: Handling Flight Change ---")
     # This is a simplified implementation for the PoC.
     # A real-world scenario would require more sophisticated state management.
-    agent = FlightChangeAgent()
     response = agent.run(dict(state))
     return {
         "current_message": state["current_message"],
@@ -62,10 +81,26 @@ def flight_change_node(state: ChatbotState) -> ChatbotState:
     }
 
 
+async def aflight_change_node(
+    state: ChatbotState, agent: FlightChangeAgent
+) -> ChatbotState:
+    """Async variant of `flight_change_node`: the tool calls don't block the loop."""
+    print("--- Node: Handling Flight Change ---")
+    response = await agent.arun(dict(state))
+    return {
+        "current_message": state["current_message"],
+        "intent": state["intent"],
+        "agent_response": response["agent_response"],
+        "history": state.get("history", []),
+    }
+
+
 def default_response_node(state: ChatbotState) -> ChatbotState:
     """Provides a default response for unhandled intents."""
     print("--- Node: Handling Default Response ---")
     intent = state.get("intent", "desconocida")
+    if intent not in ("saludo", "despedida", "agradecimiento"):
+        count(FALLBACK_RESPONSES, component="default_responder")
     responses = {
         "saludo": (
             "¡Hola! Soy el asistente de VuelaConNosotros. ¿En qué puedo ayudarte?"
@@ -86,6 +121,17 @@ def default_response_node(state: ChatbotState) -> ChatbotState:
     }
 
 
+def record_turn_node(state: ChatbotState) -> ChatbotState:
+    """Appends the finished turn to the session's history."""
+    turn = {"user": state["current_message"], "assistant": state["agent_response"]}
+    return {
+        "current_message": state["current_message"],
+        "intent": state["intent"],
+        "agent_response": state["agent_response"],
+        "history": [*state.get("history", []), turn][-MAX_HISTORY_TURNS:],
+    }
+
+
 # 3. Define the conditional edges
 def route_by_intent(state: ChatbotState) -> str:
     """Routes the conversation to the appropriate agent based on intent."""
@@ -99,23 +145,68 @@ def route_by_intent(state: ChatbotState) -> str:
 
 
 # 4. Create the graph
-def create_chatbot_graph():
+def _timed_node(name: str, node, anode=None):
+    """
+    Wraps a node so its latency is recorded under its graph name.
+
+    When an async variant `anode` is given, the graph's `ainvoke`/`astream`
+    await it on the event loop instead of running `node` in a worker thread.
+    """
+
+    def run(state: ChatbotState) -> ChatbotState:
+        with track(NODE_LATENCY, node=name):
+            return node(state)
+
+    if anode is None:
+        return run
+
+    async def arun(state: ChatbotState) -> ChatbotState:
+        with track(NODE_LATENCY, node=name):
+            return await anode(state)
+
+    return RunnableLambda(run, afunc=arun, name=name)
+
+
+def create_chatbot_graph(
+    registry: NodeRegistry | None = None,
+    checkpointer: BaseCheckpointSaver | None = None,
+):
     """
     Builds and compiles the LangGraph StateGraph for the chatbot.
 
     This function encapsulates the graph creation logic, adhering to the
     Single Responsibility Principle.
 
+    Args:
+        registry: The prebuilt classifier and agents to inject into the nodes.
+            Defaults to NodeRegistry.from_llm() with the default clients.
+        checkpointer: Where conversation state is saved between turns.
+            Defaults to create_checkpointer(), configured from the environment.
+
     Returns:
         A compiled LangGraph runnable.
     """
+    registry = registry or NodeRegistry.from_llm()
     workflow = StateGraph(ChatbotState)
 
-    # Add nodes
-    workflow.add_node("classifier", classify_node)
-    workflow.add_node("flight_status_agent", flight_status_node)
-    workflow.add_node("flight_change_agent", flight_change_node)
-    workflow.add_node("default_responder", default_response_node)
+    # Add nodes, binding each one to its prebuilt component
+    status_agent = registry.flight_status_agent
+    change_agent = registry.flight_change_agent
+    nodes = {
+        "classifier": (partial(classify_node, classifier=registry.classifier),),
+        "flight_status_agent": (
+            partial(flight_status_node, agent=status_agent),
+            partial(aflight_status_node, agent=status_agent),
+        ),
+        "flight_change_agent": (
+            partial(flight_change_node, agent=change_agent),
+            partial(aflight_change_node, agent=change_agent),
+        ),
+        "default_responder": (default_response_node,),
+        "record_turn": (record_turn_node,),
+    }
+    for name, variants in nodes.items():
+        workflow.add_node(name, _timed_node(name, *variants))
 
     # Define entry and conditional routing
     workflow.set_entry_point("classifier")
@@ -129,11 +220,11 @@ def create_chatbot_graph():
         },
     )
 
-    # Connect agent nodes to the end
-    workflow.add_edge("flight_status_agent", END)
-    workflow.add_edge("flight_change_agent", END)
-    workflow.add_edge("default_responder", END)
+    # Every agent node records its turn before the end
+    workflow.add_edge("flight_status_agent", "record_turn")
+    workflow.add_edge("flight_change_agent", "record_turn")
+    workflow.add_edge("default_responder", "record_turn")
+    workflow.add_edge("record_turn", END)
 
-    # Compile the graph with memory
-    memory = MemorySaver()
-    return workflow.compile(checkpointer=memory)
+    # Compile the graph with the session checkpointer
+    return workflow.compile(checkpointer=checkpointer or create_checkpointer())
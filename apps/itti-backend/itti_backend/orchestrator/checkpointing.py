@@ -0,0 +1,461 @@
+"""Bounded checkpointer backends for chatbot conversation sessions."""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Sequence
+from typing import Any
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+)
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+logger = logging.getLogger(__name__)
+
+
+def _payload_size(value: Any) -> int:
+    """Sums the serialized bytes held in a nested tuple/dict structure."""
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(_payload_size(v) for v in value.values())
+    if isinstance(value, (tuple, list)):
+        return sum(_payload_size(v) for v in value)
+    return 0
+
+
+class BoundedMemorySaver(MemorySaver):
+    """
+    In-process checkpointer with a session cap, idle expiry and bounded history.
+
+    Sessions are tracked in LRU order. Saving a checkpoint for a new session
+    beyond `max_sessions` evicts the least recently used one, and `compact`
+    removes sessions idle for longer than `session_ttl_seconds`. Each save also
+    drops the session's checkpoints older than the newest
+    `checkpoints_per_session`, with their writes and channel values, so a
+    long-lived session holds a bounded amount of memory. State is still per
+    process and lost on restart; use `SqliteSessionSaver` to share it.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 10_000,
+        session_ttl_seconds: float = 86_400,
+        checkpoints_per_session: int = 2,
+    ):
+        """
+        Initializes the saver.
+
+        Args:
+            max_sessions: Maximum number of sessions kept in memory.
+            session_ttl_seconds: Idle time after which a session is expired.
+            checkpoints_per_session: Checkpoints kept per session.
+        """
+        super().__init__()
+        self.max_sessions = max_sessions
+        self.session_ttl_seconds = session_ttl_seconds
+        self.checkpoints_per_session = max(1, checkpoints_per_session)
+        self._last_seen: OrderedDict[str, float] = OrderedDict()
+        self._sessions_lock = threading.Lock()
+        self._history_lock = threading.Lock()
+
+    def _touch(self, config: RunnableConfig) -> None:
+        thread_id = str(config["configurable"]["thread_id"])
+        with self._sessions_lock:
+            self._last_seen[thread_id] = time.monotonic()
+            self._last_seen.move_to_end(thread_id)
+            evicted = []
+            while len(self._last_seen) > self.max_sessions:
+                evicted.append(self._last_seen.popitem(last=False)[0])
+        for old_thread_id in evicted:
+            super().delete_thread(old_thread_id)
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Saves a checkpoint, marks its session as recently used, prunes history."""
+        self._touch(config)
+        with self._history_lock:
+            next_config = super().put(config, checkpoint, metadata, new_versions)
+            self._prune(
+                next_config["configurable"]["thread_id"],
+                next_config["configurable"]["checkpoint_ns"],
+            )
+        return next_config
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """Saves a task's writes, unless their checkpoint was already pruned."""
+        configurable = config["configurable"]
+        thread_id = configurable["thread_id"]
+        checkpoint_ns = configurable.get("checkpoint_ns", "")
+        checkpoint_id = configurable["checkpoint_id"]
+        with self._history_lock:
+            checkpoints = self.storage.get(thread_id, {}).get(checkpoint_ns, {})
+            # Saves run in the background, so writes can arrive after a later
+            # save pruned their checkpoint or evicted their session
+            if checkpoint_id not in checkpoints and (
+                str(thread_id) not in self._last_seen
+                or (checkpoints and checkpoint_id < min(checkpoints))
+            ):
+                return
+            super().put_writes(config, writes, task_id, task_path)
+
+    def _prune(self, thread_id: str, checkpoint_ns: str) -> None:
+        """Drops a session's checkpoints beyond the newest `checkpoints_per_session`."""
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        if len(checkpoints) <= self.checkpoints_per_session:
+            return
+        # Checkpoint ids are time-ordered, so the newest sort last
+        ids = sorted(checkpoints)
+        dropped = ids[: -self.checkpoints_per_session]
+        kept_versions = {
+            item
+            for checkpoint_id in ids[-self.checkpoints_per_session :]
+            for item in self._channel_versions(checkpoints[checkpoint_id])
+        }
+        for checkpoint_id in dropped:
+            # A channel value is shared by every checkpoint at its version
+            for channel, version in self._channel_versions(checkpoints[checkpoint_id]):
+                if (channel, version) not in kept_versions:
+                    self.blobs.pop((thread_id, checkpoint_ns, channel, version), None)
+            self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+            del checkpoints[checkpoint_id]
+
+    def _channel_versions(self, saved: tuple) -> set[tuple[str, Any]]:
+        checkpoint = self.serde.loads_typed(saved[0])
+        return set(checkpoint["channel_versions"].items())
+
+    def delete_thread(self, thread_id: str) -> None:
+        """Deletes every checkpoint of a session and stops tracking it."""
+        with self._sessions_lock:
+            self._last_seen.pop(str(thread_id), None)
+        super().delete_thread(thread_id)
+
+    def compact(self) -> dict:
+        """
+        Deletes the sessions that have been idle longer than the TTL.
+
+        Returns:
+            The number of expired sessions.
+        """
+        cutoff = time.monotonic() - self.session_ttl_seconds
+        with self._sessions_lock:
+            expired = [t for t, seen in self._last_seen.items() if seen < cutoff]
+        for thread_id in expired:
+            self.delete_thread(thread_id)
+        return {"expired_sessions": len(expired)}
+
+    def get_stats(self) -> dict:
+        """Returns the number of sessions and the bytes their checkpoints hold."""
+        with self._sessions_lock:
+            sessions = len(self._last_seen)
+        total_bytes = (
+            _payload_size(dict(self.storage))
+            + _payload_size(dict(self.writes))
+            + _payload_size(dict(self.blobs))
+        )
+        return {
+            "backend": "memory",
+            "sessions": sessions,
+            "max_sessions": self.max_sessions,
+            "total_bytes": total_bytes,
+            "bytes_per_session": total_bytes / sessions if sessions else 0.0,
+        }
+
+
+class SqliteSessionSaver(SqliteSaver):
+    """
+    SQLite checkpointer with session expiry, a session cap and compaction.
+
+    The database runs in WAL mode, so several uvicorn workers on one host can
+    open the same file and see the same conversations. A `sessions` table,
+    indexed by last activity, records when each thread_id last saved a
+    checkpoint. `compact` expires idle sessions, enforces `max_sessions` and
+    keeps only the newest `checkpoints_per_session` checkpoints of each one,
+    which bounds the storage an idle session can hold.
+
+    The async methods run the sync ones in a worker thread, so the saver can
+    be used from `graph.ainvoke`.
+    """
+
+    def __init__(
+        self,
+        conn: sqlite3.Connection,
+        max_sessions: int = 10_000,
+        session_ttl_seconds: float = 86_400,
+        checkpoints_per_session: int = 2,
+    ):
+        """
+        Initializes the saver.
+
+        Args:
+            conn: An open SQLite connection (created with check_same_thread=False).
+            max_sessions: Maximum number of sessions kept in the database.
+            session_ttl_seconds: Idle time after which a session is expired.
+            checkpoints_per_session: Checkpoints kept per session on compaction.
+        """
+        super().__init__(conn)
+        self.max_sessions = max_sessions
+        self.session_ttl_seconds = session_ttl_seconds
+        self.checkpoints_per_session = max(1, checkpoints_per_session)
+
+    @classmethod
+    def from_path(cls, path: str, **kwargs: Any) -> "SqliteSessionSaver":
+        """
+        Opens (or creates) a checkpoint database file.
+
+        Args:
+            path: Path to the SQLite file.
+            **kwargs: Limits forwarded to the constructor.
+
+        Returns:
+            A saver that owns the connection; call `close` when done.
+        """
+        conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        return cls(conn, **kwargs)
+
+    def setup(self) -> None:
+        """Creates the checkpoint tables plus the session activity table."""
+        if self.is_setup:
+            return
+        super().setup()
+        self.conn.executescript(
+            """
+            PRAGMA synchronous=NORMAL;
+            CREATE TABLE IF NOT EXISTS sessions (
+                thread_id TEXT PRIMARY KEY,
+                last_seen REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_sessions_last_seen
+                ON sessions (last_seen);
+            """
+        )
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Saves a checkpoint and records the session's last activity."""
+        next_config = super().put(config, checkpoint, metadata, new_versions)
+        with self.cursor() as cur:
+            cur.execute(
+                "INSERT INTO sessions (thread_id, last_seen) VALUES (?, ?) "
+                "ON CONFLICT(thread_id) DO UPDATE SET last_seen = excluded.last_seen",
+                (str(config["configurable"]["thread_id"]), time.time()),
+            )
+        return next_config
+
+    def delete_thread(self, thread_id: str) -> None:
+        """Deletes every checkpoint, write and activity record of a session."""
+        super().delete_thread(thread_id)
+        with self.cursor() as cur:
+            cur.execute("DELETE FROM sessions WHERE thread_id = ?", (str(thread_id),))
+
+    def _delete_threads(self, cur: sqlite3.Cursor, thread_ids: Sequence[str]) -> None:
+        rows = [(t,) for t in thread_ids]
+        for table in ("checkpoints", "writes", "sessions"):
+            cur.executemany(f"DELETE FROM {table} WHERE thread_id = ?", rows)
+
+    def compact(self) -> dict:
+        """
+        Expires idle sessions, enforces the session cap and prunes history.
+
+        Returns:
+            Counts of expired and evicted sessions and of pruned checkpoints.
+        """
+        cutoff = time.time() - self.session_ttl_seconds
+        with self.cursor() as cur:
+            expired = [
+                row[0]
+                for row in cur.execute(
+                    "SELECT thread_id FROM sessions WHERE last_seen < ?", (cutoff,)
+                )
+            ]
+            self._delete_threads(cur, expired)
+
+            evicted = [
+                row[0]
+                for row in cur.execute(
+                    "SELECT thread_id FROM sessions ORDER BY last_seen DESC "
+                    "LIMIT -1 OFFSET ?",
+                    (self.max_sessions,),
+                )
+            ]
+            self._delete_threads(cur, evicted)
+
+            # Checkpoint ids are time-ordered, so the newest sort last
+            cur.execute(
+                """
+                DELETE FROM checkpoints WHERE rowid IN (
+                    SELECT rowid FROM (
+                        SELECT rowid, ROW_NUMBER() OVER (
+                            PARTITION BY thread_id, checkpoint_ns
+                            ORDER BY checkpoint_id DESC
+                        ) AS position
+                        FROM checkpoints
+                    ) WHERE position > ?
+                )
+                """,
+                (self.checkpoints_per_session,),
+            )
+            pruned = cur.rowcount
+            cur.execute(
+                """
+                DELETE FROM writes WHERE NOT EXISTS (
+                    SELECT 1 FROM checkpoints c
+                    WHERE c.thread_id = writes.thread_id
+                    AND c.checkpoint_ns = writes.checkpoint_ns
+                    AND c.checkpoint_id = writes.checkpoint_id
+                )
+                """
+            )
+        with self.cursor() as cur:
+            cur.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+        return {
+            "expired_sessions": len(expired),
+            "evicted_sessions": len(evicted),
+            "pruned_checkpoints": pruned,
+        }
+
+    def get_stats(self) -> dict:
+        """Returns the number of sessions and the bytes their checkpoints hold."""
+        with self.cursor(transaction=False) as cur:
+            sessions = cur.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+            checkpoint_bytes = cur.execute(
+                "SELECT COALESCE(SUM(LENGTH(checkpoint) + LENGTH(metadata)), 0) "
+                "FROM checkpoints"
+            ).fetchone()[0]
+            write_bytes = cur.execute(
+                "SELECT COALESCE(SUM(LENGTH(value)), 0) FROM writes"
+            ).fetchone()[0]
+        total_bytes = checkpoint_bytes + write_bytes
+        return {
+            "backend": "sqlite",
+            "sessions": sessions,
+            "max_sessions": self.max_sessions,
+            "total_bytes": total_bytes,
+            "bytes_per_session": total_bytes / sessions if sessions else 0.0,
+        }
+
+    def close(self) -> None:
+        """Closes the underlying connection."""
+        with self.lock:
+            self.conn.close()
+
+    # --- Async API, backed by the sync methods in a worker thread ---
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        checkpoints = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for checkpoint in checkpoints:
+            yield checkpoint
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(
+            self.put, config, checkpoint, metadata, new_versions
+        )
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+
+def create_checkpointer() -> BaseCheckpointSaver:
+    """
+    Builds the conversation checkpointer from environment variables.
+
+    - CHECKPOINTER_BACKEND: "memory" (default) or "sqlite".
+    - CHECKPOINT_DB_PATH: SQLite file shared by all workers (sqlite only).
+    - MAX_SESSIONS / SESSION_TTL_SECONDS: session cap and idle expiry.
+    - CHECKPOINTS_PER_SESSION: checkpoints kept per session (memory: on every
+      save; sqlite: on compaction).
+
+    Returns:
+        A BoundedMemorySaver or a SqliteSessionSaver.
+    """
+    backend = os.getenv("CHECKPOINTER_BACKEND", "memory").lower()
+    max_sessions = int(os.getenv("MAX_SESSIONS", 10_000))
+    session_ttl_seconds = float(os.getenv("SESSION_TTL_SECONDS", 86_400))
+    checkpoints_per_session = int(os.getenv("CHECKPOINTS_PER_SESSION", 2))
+
+    if backend == "memory":
+        return BoundedMemorySaver(
+            max_sessions, session_ttl_seconds, checkpoints_per_session
+        )
+    if backend == "sqlite":
+        return SqliteSessionSaver.from_path(
+            os.getenv("CHECKPOINT_DB_PATH", "checkpoints.sqlite"),
+            max_sessions=max_sessions,
+            session_ttl_seconds=session_ttl_seconds,
+            checkpoints_per_session=checkpoints_per_session,
+        )
+    raise ValueError(
+        f"Unsupported CHECKPOINTER_BACKEND: {backend}. Use 'memory' or 'sqlite'."
+    )
+
+
+async def run_periodic_compaction(
+    checkpointer: BaseCheckpointSaver, interval_seconds: float
+) -> None:
+    """
+    Calls `checkpointer.compact()` in a worker thread every `interval_seconds`.
+
+    Meant to run as a background task for the lifetime of the app; cancel the
+    task to stop it. Errors are logged and do not stop the loop.
+    """
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            result = await asyncio.to_thread(checkpointer.compact)
+            logger.info("Checkpoint compaction: %s", result)
+        except Exception:
+            logger.exception("Checkpoint compaction failed")
@@ -0,0 +1,42 @@
+"""Registry of the prebuilt components injected into the chatbot graph nodes."""
+
+from dataclasses import dataclass
+
+from langchain_core.language_models.chat_models import BaseChatModel
+
+from ..agents.flight_change_agent import FlightChangeAgent
+from ..agents.flight_status_agent import FlightStatusAgent
+from ..nlu.intent_classifier import IntentClassifier
+
+
+@dataclass
+class NodeRegistry:
+    """
+    Holds the classifier and agents used by the graph nodes.
+
+    Each component, with its LLM client and prompt chain, is built once and
+    shared by every graph invocation, so nothing is constructed per message.
+    Any component can be replaced by a fake for tests and benchmarks.
+    """
+
+    classifier: IntentClassifier
+    flight_status_agent: FlightStatusAgent
+    flight_change_agent: FlightChangeAgent
+
+    @classmethod
+    def from_llm(cls, llm: BaseChatModel | None = None) -> "NodeRegistry":
+        """
+        Builds every component, optionally sharing a single chat model.
+
+        Args:
+            llm: A chat model used by all components. When omitted, each
+                component builds its own default client.
+
+        Returns:
+            A fully populated NodeRegistry.
+        """
+        return cls(
+            classifier=IntentClassifier(llm=llm),
+            flight_status_agent=FlightStatusAgent(llm=llm),
+            flight_change_agent=FlightChangeAgent(llm=llm),
+        )
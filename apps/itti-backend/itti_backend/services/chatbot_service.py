@@ -1,9 +1,16 @@
 """High-level service for the VuelaConNosotros chatbot."""
 
+import asyncio
 import uuid
+from weakref import WeakValueDictionary
 
+from ..core.metrics import FALLBACK_RESPONSES, count
 from ..orchestrator.chatbot_graph import create_chatbot_graph
 
+ERROR_RESPONSE = (
+    "He encontrado un error inesperado. Por favor, intenta de nuevo más tarde."
+)
+
 
 class ChatbotService:
     """
@@ -13,11 +20,37 @@ class ChatbotService:
     adhering to the Single Responsibility Principle. It depends on the abstraction
     provided by the create_chatbot_graph factory function, following the
     Dependency Inversion Principle.
+
+    The compiled graph (and its checkpointer) is built once per instance, so a
+    single application-scoped instance keeps conversation state across requests.
     """
 
-    def __init__(self):
-        """Initializes the ChatbotService."""
-        self.chatbot_graph = create_chatbot_graph()
+    def __init__(self, chatbot_graph=None):
+        """
+        Initializes the ChatbotService.
+
+        Args:
+            chatbot_graph: An optional pre-compiled graph. Defaults to a new one
+                built by create_chatbot_graph.
+        """
+        self.chatbot_graph = chatbot_graph or create_chatbot_graph()
+        # One lock per active session, dropped once no request holds it
+        self._session_locks: WeakValueDictionary[str, asyncio.Lock] = (
+            WeakValueDictionary()
+        )
+
+    def _build_invocation(
+        self, user_message: str, session_id: str | None
+    ) -> tuple[dict, dict]:
+        """Builds the graph input and config for a message."""
+        if not session_id:
+            session_id = str(uuid.uuid4())
+
+        config = {"configurable": {"thread_id": session_id}}
+        # Only the message is new: the rest of the state (e.g. the history)
+        # comes from the session's checkpoint
+        initial_state = {"current_message": user_message}
+        return initial_state, config
 
     def process_message(self, user_message: str, session_id: str | None = None) -> str:
         """
@@ -30,16 +63,43 @@ class ChatbotService:
         Returns:
             The final agent response from the chatbot graph.
         """
-        if not session_id:
-            session_id = str(uuid.uuid4())
+        initial_state, config = self._build_invocation(user_message, session_id)
 
-        config = {"configurable": {"thread_id": session_id}}
+        try:
+            final_state = self.chatbot_graph.invoke(initial_state, config=config)
+            return final_state.get("agent_response", "Lo siento, algo salió mal.")
+        except Exception as e:
+            print(f"Error processing message in ChatbotService: {e}")
+            count(FALLBACK_RESPONSES, component="chatbot_service")
+            return ERROR_RESPONSE
 
-        initial_state = {"current_message": user_message, "history": []}
+    async def aprocess_message(
+        self, user_message: str, session_id: str | None = None
+    ) -> str:
+        """
+        Asynchronously processes a user message without blocking the event loop.
+
+        Concurrent requests for different sessions run in parallel, while turns
+        of the same session are serialized so they don't race on its checkpoint.
+
+        Args:
+            user_message: The message from the user.
+            session_id: An optional session ID to maintain conversation state.
+
+        Returns:
+            The final agent response from the chatbot graph.
+        """
+        initial_state, config = self._build_invocation(user_message, session_id)
+        thread_id = config["configurable"]["thread_id"]
+        lock = self._session_locks.setdefault(thread_id, asyncio.Lock())
 
         try:
-            final_state = self.chatbot_graph.invoke(initial_state, config=config)
+            async with lock:
+                final_state = await self.chatbot_graph.ainvoke(
+                    initial_state, config=config
+                )
             return final_state.get("agent_response", "Lo siento, algo salió mal.")
         except Exception as e:
             print(f"Error processing message in ChatbotService: {e}")
-            return "He encontrado un error inesperado. Por favor, intenta de nuevo más tarde."
+            count(FALLBACK_RESPONSES, component="chatbot_service")
+            return ERROR_RESPONSE
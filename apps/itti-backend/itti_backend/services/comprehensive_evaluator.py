@@ -5,14 +5,19 @@ This module unifies semantic, intent, and advanced quality metrics into a
 single, robust evaluation system.
 """
 
+import asyncio
 import logging
 import os
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from functools import lru_cache
 from typing import Optional
 
 import pandas as pd
-from sentence_transformers import SentenceTransformer, util
+from sentence_transformers import util
 from textstat import flesch_reading_ease
 
+from ..core.metrics import EVALUATOR_METRIC_LATENCY, FALLBACK_RESPONSES, count, timed
 from ..models.fintech_models import (
     BotResponse,
     CustomerQuery,
@@ -20,9 +25,16 @@ from ..models.fintech_models import (
     FullEvaluationReport,
     Intent,
     Product,
+    QueryClassification,
     SummaryMetrics,
 )
+from ..services.embedding_models import DEFAULT_EMBEDDING_MODEL, get_embedding_model
+from ..services.evaluation_store import EvaluationResultStore, evaluation_item_key
+from ..services.llm_scheduler import llm_priority
+from ..services.llm_service import get_llm_provider
 from ..services.prompt_service import PromptService
+from ..services.quality_lexicons import load_lexicon_engine
+from ..services.query_classifier import KNNQueryClassifier
 
 # --- Configuration ---
 logging.basicConfig(level=logging.DEBUG)  # Set logging level to DEBUG
@@ -30,64 +42,120 @@ logger = logging.getLogger(__name__)
 
 # --- Constants ---
 SIMILARITY_THRESHOLD = 0.7
+# Part of every cached result's key: bump it when the scoring code changes
+EVALUATOR_VERSION = "3"
 CONFIDENCE_THRESHOLD = 0.8
+# Maximum number of LLM generations in flight during a full evaluation run
+EVALUATION_MAX_CONCURRENCY = int(os.getenv("EVALUATION_MAX_CONCURRENCY", 8))
+# Number of texts per forward pass of the embedding model
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 64))
 DATASET_PATH = os.path.join(
     os.path.dirname(__file__), "..", "data", "evaluation_dataset.csv"
 )
 
 
+@lru_cache
+def load_evaluation_dataset() -> pd.DataFrame:
+    """
+    Loads the evaluation dataset once per process.
+
+    The returned DataFrame is shared by every evaluator and must not be modified.
+    """
+    try:
+        df = pd.read_csv(DATASET_PATH)
+        # Clean up column names before creating CustomerQuery objects
+        df.columns = df.columns.str.strip()
+        # Replace pandas' NaN with None for Pydantic compatibility
+        return df.where(pd.notnull(df), None)
+    except FileNotFoundError:
+        logger.error(f"Evaluation dataset not found at {DATASET_PATH}")
+        raise
+    except Exception as e:
+        logger.error(f"Error loading dataset: {e}")
+        raise
+
+
 class ComprehensiveEvaluator:
     """
     A unified evaluator that combines semantic, intent, and advanced quality metrics.
+
+    The embedding model and the dataset are loaded once per process and shared
+    by every instance, so constructing an evaluator per request is cheap.
     """
 
-    def __init__(self, llm_client, model_name: str = "all-MiniLM-L6-v2"):
-        """Initialize the evaluator with a SentenceTransformer model and LLM client."""
-        logger.info(f"Loading SentenceTransformer model: {model_name}")
-        self.model = SentenceTransformer(model_name)
+    def __init__(
+        self,
+        llm_client,
+        model_name: str = DEFAULT_EMBEDDING_MODEL,
+        result_store: Optional[EvaluationResultStore] = None,
+        query_classifier: Optional[KNNQueryClassifier] = None,
+    ):
+        """
+        Initialize the evaluator with the shared embedding model and LLM client.
+
+        Args:
+            llm_client: The chat model used to generate responses.
+            model_name: The SentenceTransformer used for semantic similarity.
+            result_store: Optional per-item store; full evaluations then only
+                recompute the rows whose inputs changed.
+            query_classifier: Optional local Intent/Product classifier, whose
+                accuracy is then reported next to the LLM's.
+        """
+        self.model = get_embedding_model(model_name)
         self.llm_client = llm_client  # Use the injected LLM client
-        self.dataset = self._load_dataset()
+        self.dataset = load_evaluation_dataset()
+        self.lexicons = load_lexicon_engine()
+        self.result_store = result_store
+        self.query_classifier = query_classifier
+        self.version = f"{EVALUATOR_VERSION}:{model_name}:{self.lexicons.version}"
+        if query_classifier is not None:
+            self.version += f":{query_classifier.version}"
         logger.info("ComprehensiveEvaluator initialized.")
 
-    def _load_dataset(self) -> pd.DataFrame:
-        """Loads the evaluation dataset from the specified path."""
-        try:
-            df = pd.read_csv(DATASET_PATH)
-            # Replace pandas' NaN with None for Pydantic compatibility
-            return df.where(pd.notnull(df), None)
-        except FileNotFoundError:
-            logger.error(f"Evaluation dataset not found at {DATASET_PATH}")
-            raise
-        except Exception as e:
-            logger.error(f"Error loading dataset: {e}")
-            raise
+    @timed(EVALUATOR_METRIC_LATENCY, metric="semantic_similarity")
+    def _calculate_semantic_similarities(
+        self, generated_texts: list[str], ideal_texts: list[Optional[str]]
+    ) -> list[float]:
+        """
+        Calculates row-wise semantic similarity for aligned lists of texts.
 
-    def _calculate_semantic_similarity(
-        self, generated_text: str, ideal_text: Optional[str]
-    ) -> float:
-        """Calculates semantic similarity between two texts."""
-        if not ideal_text:
-            return 0.0
+        Every text is encoded in one batched pass and the scores come from a
+        single pairwise cosine operation. Rows without an ideal text score 0.0.
+        """
+        scores = [0.0] * len(generated_texts)
+        indices = [i for i, ideal in enumerate(ideal_texts) if ideal]
+        if not indices:
+            return scores
         try:
-            embedding1 = self.model.encode(generated_text, convert_to_tensor=True)
-            embedding2 = self.model.encode(ideal_text, convert_to_tensor=True)
-            cosine_scores = util.cos_sim(embedding1, embedding2)
-            return cosine_scores.item()
+            texts = [generated_texts[i] for i in indices] + [
+                ideal_texts[i] for i in indices
+            ]
+            embeddings = self.model.encode(
+                texts, batch_size=EMBEDDING_BATCH_SIZE, convert_to_tensor=True
+            )
+            generated_embeddings = embeddings[: len(indices)]
+            ideal_embeddings = embeddings[len(indices) :]
+            similarities = util.pairwise_cos_sim(
+                generated_embeddings, ideal_embeddings
+            ).tolist()
         except Exception as e:
             logger.error(f"Error calculating semantic similarity: {e}")
-            return 0.0
+            return scores
+        for i, similarity in zip(indices, similarities):
+            scores[i] = similarity
+        return scores
+
+    @timed(EVALUATOR_METRIC_LATENCY, metric="lexicons")
+    def _calculate_lexicon_scores(self, texts: list[str]) -> list[dict[str, float]]:
+        """
+        Scores empathy, actionability and professional tone for many texts.
 
-    def _calculate_empathy_score(self, text: str) -> float:
-        """Calculates a nuanced empathy score."""
-        score = 0.0
-        if any(p in text.lower() for p in ["entiendo tu", "comprendo tu", "lamento"]):
-            score += 0.5
-        if any(p in text.lower() for p in ["me alegra", "qué bueno", "claro que sí"]):
-            score += 0.25
-        if "¡hola!" in text.lower():
-            score += 0.25
-        return min(1.0, score)
+        The phrase lists live in `data/quality_lexicons.json` and every metric
+        is scored in a single scan over the whole batch.
+        """
+        return self.lexicons.score_many(texts)
 
+    @timed(EVALUATOR_METRIC_LATENCY, metric="clarity")
     def _calculate_clarity_score(self, text: str) -> float:
         """Calculates a more granular clarity score."""
         word_count = len(text.split())
@@ -97,23 +165,7 @@ class ComprehensiveEvaluator:
             return 0.75
         return 0.5
 
-    def _calculate_actionability_score(self, text: str) -> float:
-        """Calculates actionability based on clear next steps."""
-        if "**próximos pasos:**" in text.lower():
-            return 1.0
-        if any(p in text.lower() for p in ["puedes", "te gustaría", "anímate a"]):
-            return 0.5
-        return 0.0
-
-    def _calculate_professional_tone_score(self, text: str) -> float:
-        """Calculates professional tone, penalizing hedging."""
-        score = 1.0
-        if any(p in text.lower() for p in ["creo que", "parece que", "podría ser"]):
-            score -= 0.25
-        if any(p in text.lower() for p in ["chao", "parce", "pues..."]):
-            score -= 0.5
-        return max(0.0, score)
-
+    @timed(EVALUATOR_METRIC_LATENCY, metric="readability")
     def _calculate_readability_score(self, text: str) -> float:
         """Calculates readability using Flesch Reading Ease score."""
         try:
@@ -122,6 +174,23 @@ class ComprehensiveEvaluator:
         except Exception:
             return 0.0
 
+    @timed(EVALUATOR_METRIC_LATENCY, metric="query_classifier")
+    def _classify_queries(
+        self, queries: list[CustomerQuery]
+    ) -> list[Optional[QueryClassification]]:
+        """
+        Labels the queries with the local classifier (None without one).
+
+        Labelled queries identical to a query are left out of its vote, so the
+        dataset's own rows are scored as if held out of the training data.
+        """
+        if self.query_classifier is None:
+            return [None] * len(queries)
+        return self.query_classifier.classify_many(
+            [query.text for query in queries], exclude_same=True
+        )
+
+    @timed(EVALUATOR_METRIC_LATENCY, metric="confidence_alignment")
     def _evaluate_confidence_alignment(
         self, response: BotResponse, query: CustomerQuery
     ) -> float:
@@ -145,19 +214,46 @@ class ComprehensiveEvaluator:
         """
         Performs a comprehensive evaluation of a single bot response.
         """
-        similarity = self._calculate_semantic_similarity(
-            response.response_text, query.ideal_response
+        return self.evaluate_batch([query], [response])[0]
+
+    def evaluate_batch(
+        self, queries: list[CustomerQuery], responses: list[BotResponse]
+    ) -> list[EvaluationResult]:
+        """
+        Evaluates aligned lists of queries and bot responses.
+
+        Semantic similarity for the whole batch is computed at once, which is
+        much cheaper than encoding each row separately.
+        """
+        texts = [response.response_text for response in responses]
+        similarities = self._calculate_semantic_similarities(
+            texts, [query.ideal_response for query in queries]
         )
+        lexicon_scores = self._calculate_lexicon_scores(texts)
+        classifications = self._classify_queries(queries)
+        return [
+            self._build_evaluation_result(
+                query, response, similarity, scores, classification
+            )
+            for query, response, similarity, scores, classification in zip(
+                queries, responses, similarities, lexicon_scores, classifications
+            )
+        ]
 
+    def _build_evaluation_result(
+        self,
+        query: CustomerQuery,
+        response: BotResponse,
+        similarity: float,
+        lexicon_scores: dict[str, float],
+        classification: Optional[QueryClassification] = None,
+    ) -> EvaluationResult:
+        """Computes the per-row quality metrics and assembles the result."""
         # --- Calculate all metrics individually for clarity ---
-        empathy_score = self._calculate_empathy_score(response.response_text)
+        empathy_score = lexicon_scores["empathy"]
         clarity_score = self._calculate_clarity_score(response.response_text)
-        actionability_score = self._calculate_actionability_score(
-            response.response_text
-        )
-        professional_tone_score = self._calculate_professional_tone_score(
-            response.response_text
-        )
+        actionability_score = lexicon_scores["actionability"]
+        professional_tone_score = lexicon_scores["professional_tone"]
         readability_score = self._calculate_readability_score(response.response_text)
         confidence_alignment = self._evaluate_confidence_alignment(response, query)
 
@@ -196,7 +292,22 @@ class ComprehensiveEvaluator:
             actionability=actionability_score,
             professional_tone=professional_tone_score,
             readability=readability_score,
+            input_tokens=response.input_tokens,
+            cached_input_tokens=response.cached_input_tokens,
+            output_tokens=response.output_tokens,
+            latency_seconds=response.latency_seconds,
+            parse_failed=response.parse_failed,
         )
+        if classification is not None:
+            result.classifier_intent = classification.intent
+            result.classifier_product = classification.product
+            result.classifier_confidence = classification.confidence
+            result.classifier_intent_correct = (
+                classification.intent == query.expected_intent
+            )
+            result.classifier_product_correct = (
+                classification.product == query.expected_product
+            )
         return result
 
     def generate_report(self, results: list[EvaluationResult]) -> FullEvaluationReport:
@@ -230,6 +341,18 @@ class ComprehensiveEvaluator:
             for key in quality_keys
         }
 
+        # Generation diagnostics, to compare PromptService output modes
+        token_counts = [r.output_tokens for r in results if r.output_tokens is not None]
+        input_counts = [
+            (r.input_tokens, r.cached_input_tokens or 0)
+            for r in results
+            if r.input_tokens is not None
+        ]
+        total_input = sum(tokens for tokens, _ in input_counts)
+        latencies = [
+            r.latency_seconds for r in results if r.latency_seconds is not None
+        ]
+
         summary_metrics = {
             "total_evaluated": total,
             "intent_accuracy": intent_accuracy,
@@ -238,6 +361,22 @@ class ComprehensiveEvaluator:
             "average_confidence": avg_confidence,
             "average_confidence_alignment": avg_confidence_alignment,
             **avg_quality_scores,
+            "parse_failure_rate": sum(r.parse_failed for r in results) / total,
+            "average_input_tokens": (
+                total_input / len(input_counts) if input_counts else None
+            ),
+            "cached_input_token_rate": (
+                sum(cached for _, cached in input_counts) / total_input
+                if total_input
+                else None
+            ),
+            "average_output_tokens": (
+                sum(token_counts) / len(token_counts) if token_counts else None
+            ),
+            "average_latency_seconds": (
+                sum(latencies) / len(latencies) if latencies else None
+            ),
+            **self._classifier_accuracies(results),
         }
 
         summary_metrics_model = SummaryMetrics(**summary_metrics)
@@ -248,18 +387,23 @@ class ComprehensiveEvaluator:
             logs=[f"Report generated for {total} items."],
         )
 
-    async def run_full_evaluation(
-        self, prompt_service: PromptService
-    ) -> FullEvaluationReport:
-        """
-        Runs a full evaluation on the dataset.
-        """
-        logger.info("Generating responses for the full evaluation dataset...")
-
-        # Clean up column names before creating CustomerQuery objects
-        self.dataset.columns = self.dataset.columns.str.strip()
+    @staticmethod
+    def _classifier_accuracies(results: list[EvaluationResult]) -> dict:
+        """Local classifier's accuracy over the rows it labelled (None if none)."""
+        classified = [r for r in results if r.classifier_intent_correct is not None]
+        if not classified:
+            return {}
+        return {
+            "classifier_intent_accuracy": (
+                sum(r.classifier_intent_correct for r in classified) / len(classified)
+            ),
+            "classifier_product_accuracy": (
+                sum(r.classifier_product_correct for r in classified) / len(classified)
+            ),
+        }
 
-        # Map the CSV columns to the CustomerQuery model fields
+    def _load_queries(self) -> list[CustomerQuery]:
+        """Maps the dataset rows to CustomerQuery objects, in dataset order."""
         queries = []
         for row in self.dataset.to_dict(orient="records"):
             query = CustomerQuery(
@@ -277,14 +421,169 @@ class ComprehensiveEvaluator:
                 ideal_response=row.get("ideal_response"),
             )
             queries.append(query)
+        return queries
 
-        bot_responses = [prompt_service.generate_response(q) for q in queries]
+    def _make_generator(
+        self, prompt_service: PromptService, max_concurrency: Optional[int] = None
+    ) -> Callable[[CustomerQuery], Awaitable[BotResponse]]:
+        """
+        Returns a coroutine function that generates one response within limits.
 
-        logger.info("Evaluating responses...")
-        evaluation_results = [
-            self.evaluate_single_response(query, response)
-            for query, response in zip(queries, bot_responses)
+        At most `max_concurrency` generations started from it are in flight at
+        once. Their LLM calls run with the "evaluation" priority, so the
+        provider's rate limiter (if configured) admits live chat calls first. A
+        failed item yields a fallback response instead of raising.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency or EVALUATION_MAX_CONCURRENCY)
+
+        async def _generate(query: CustomerQuery) -> BotResponse:
+            try:
+                async with semaphore:
+                    with llm_priority("evaluation"):
+                        return await prompt_service.agenerate_response(query)
+            except Exception as e:
+                logger.error(f"Generation failed for '{query.text[:40]}...': {e}")
+                count(FALLBACK_RESPONSES, component="evaluator")
+                return BotResponse(
+                    original_query=query.text,
+                    response_text="No pude generar una respuesta para esta consulta.",
+                    reasoning=f"Excepción: {e}",
+                    detected_intent=None,
+                    detected_product=None,
+                    confidence=0.0,
+                )
+
+        return _generate
+
+    async def generate_responses(
+        self,
+        prompt_service: PromptService,
+        queries: list[CustomerQuery],
+        max_concurrency: Optional[int] = None,
+    ) -> list[BotResponse]:
+        """
+        Generates bot responses concurrently, preserving the order of `queries`.
+
+        Concurrency, rate limiting and fallbacks are as in `_make_generator`.
+        """
+        generate = self._make_generator(prompt_service, max_concurrency)
+        return list(await asyncio.gather(*(generate(q) for q in queries)))
+
+    async def iter_full_evaluation(
+        self,
+        prompt_service: PromptService,
+        max_concurrency: Optional[int] = None,
+        force: bool = False,
+    ) -> AsyncIterator[tuple[int, EvaluationResult, bool]]:
+        """
+        Evaluates the dataset, yielding each item as soon as it is scored.
+
+        With a result store, the rows whose key (query, expected labels, ideal
+        response, system prompt, model, provider and evaluator version) has a
+        stored result are yielded first; `force` recomputes every row. The
+        others are generated concurrently and scored in micro-batches: whatever
+        has finished while the previous batch was being scored.
+
+        Yields:
+            (dataset index, result, whether it was reused from the store).
+        """
+        queries = self._load_queries()
+        keys = [
+            evaluation_item_key(
+                query, prompt_service.cache_namespace, get_llm_provider(), self.version
+            )
+            for query in queries
         ]
+        stored = {}
+        if self.result_store is not None and not force:
+            stored = await asyncio.to_thread(self.result_store.get_many, keys)
+        pending = []
+        for i, key in enumerate(keys):
+            if key in stored:
+                yield i, stored[key], True
+            else:
+                pending.append(i)
+
+        generate = self._make_generator(prompt_service, max_concurrency)
+        finished: asyncio.Queue[tuple[int, BotResponse]] = asyncio.Queue()
+
+        async def _generate(i: int) -> None:
+            await finished.put((i, await generate(queries[i])))
+
+        tasks = [asyncio.create_task(_generate(i)) for i in pending]
+        try:
+            remaining = len(pending)
+            while remaining:
+                batch = [await finished.get()]
+                while not finished.empty():
+                    batch.append(finished.get_nowait())
+                remaining -= len(batch)
+                indices = [i for i, _ in batch]
+                responses = [response for _, response in batch]
+                # Scoring is CPU-bound (embeddings), so run it off the event loop
+                results = await asyncio.to_thread(
+                    self.evaluate_batch, [queries[i] for i in indices], responses
+                )
+                if self.result_store is not None:
+                    # Failed generations are not stored, so the next run retries
+                    await asyncio.to_thread(
+                        self.result_store.put_many,
+                        [
+                            (keys[i], result)
+                            for i, response, result in zip(indices, responses, results)
+                            if response.detected_intent is not None
+                        ],
+                    )
+                for i, result in zip(indices, results):
+                    yield i, result, False
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def run_full_evaluation(
+        self,
+        prompt_service: PromptService,
+        max_concurrency: Optional[int] = None,
+        force: bool = False,
+    ) -> FullEvaluationReport:
+        """
+        Runs a full evaluation on the dataset (see `iter_full_evaluation`).
+        """
+        logger.info("Evaluating the full dataset...")
+        start = time.perf_counter()
+        results: dict[int, EvaluationResult] = {}
+        reused = 0
+        async for index, result, was_reused in self.iter_full_evaluation(
+            prompt_service, max_concurrency, force
+        ):
+            results[index] = result
+            reused += was_reused
+        elapsed = time.perf_counter() - start
 
         logger.info("Generating final report...")
-        return self.generate_report(evaluation_results)
+        return self.build_report(
+            [results[i] for i in sorted(results)],
+            reused,
+            prompt_service.output_mode,
+            f"Evaluated {len(results) - reused} items in {elapsed:.2f}s "
+            f"(max concurrency: {max_concurrency or EVALUATION_MAX_CONCURRENCY}).",
+        )
+
+    def build_report(
+        self,
+        results: list[EvaluationResult],
+        reused: int,
+        output_mode: Optional[str] = None,
+        *logs: str,
+    ) -> FullEvaluationReport:
+        """Builds the report of a full run, with its reuse counts and extra logs."""
+        report = self.generate_report(results)
+        report.output_mode = output_mode
+        report.reused_items = reused
+        report.recomputed_items = len(results) - reused
+        report.logs.extend(logs)
+        report.logs.append(
+            f"Reused {report.reused_items} stored results, "
+            f"recomputed {report.recomputed_items}."
+        )
+        return report
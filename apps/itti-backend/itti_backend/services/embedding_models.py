@@ -0,0 +1,101 @@
+"""Process-wide registry of SentenceTransformer embedding models."""
+
+import gc
+import logging
+import os
+import threading
+from typing import Any, Optional
+
+from sentence_transformers import SentenceTransformer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+
+class SharedEmbeddingModel:
+    """
+    A SentenceTransformer instance shared by every caller in the process.
+
+    `encode` calls are serialized with a lock. Concurrent forward passes on one
+    model would compete for the same torch thread pool anyway, so callers with
+    many texts should pass them in a single `encode` call to get them batched.
+    Every other attribute is read from the wrapped model.
+    """
+
+    def __init__(self, name: str, model: SentenceTransformer):
+        """
+        Wraps a loaded model.
+
+        Args:
+            name: The model name it was loaded with.
+            model: The loaded SentenceTransformer.
+        """
+        self.name = name
+        self.model = model
+        self._lock = threading.Lock()
+
+    def encode(self, *args: Any, **kwargs: Any) -> Any:
+        """Same as SentenceTransformer.encode, one call at a time."""
+        with self._lock:
+            return self.model.encode(*args, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for attributes not found on the wrapper itself
+        if name == "model":
+            raise AttributeError(name)
+        return getattr(self.model, name)
+
+
+_models: dict[str, SharedEmbeddingModel] = {}
+_registry_lock = threading.Lock()
+
+
+def get_embedding_model(name: str = DEFAULT_EMBEDDING_MODEL) -> SharedEmbeddingModel:
+    """
+    Returns the shared instance of an embedding model, loading it on first use.
+
+    Args:
+        name: A SentenceTransformer model name or path.
+
+    Returns:
+        The process-wide SharedEmbeddingModel for `name`.
+    """
+    model = _models.get(name)
+    if model is not None:
+        return model
+    with _registry_lock:
+        if name not in _models:
+            logger.info(f"Loading SentenceTransformer model: {name}")
+            _models[name] = SharedEmbeddingModel(name, SentenceTransformer(name))
+        return _models[name]
+
+
+def preload_embedding_models(names: Optional[list[str]] = None) -> list[str]:
+    """
+    Loads embedding models up front, before the server forks its workers.
+
+    Call it at import time of the app module and run gunicorn with `--preload`:
+    the weights are then loaded once in the master process and shared
+    copy-on-write by every worker. `gc.freeze()` moves the loaded objects out of
+    the garbage collector's reach, so collections in the workers don't write to
+    (and copy) their pages.
+
+    Args:
+        names: The models to load. Defaults to the comma-separated
+            PRELOAD_EMBEDDING_MODELS environment variable (empty: load nothing).
+
+    Returns:
+        The names of the models that were loaded.
+    """
+    if names is None:
+        names = [
+            name.strip()
+            for name in os.getenv("PRELOAD_EMBEDDING_MODELS", "").split(",")
+            if name.strip()
+        ]
+    for name in names:
+        get_embedding_model(name)
+    if names:
+        gc.freeze()
+    return names
@@ -0,0 +1,244 @@
+"""Background full-dataset evaluations, run by a bounded pool of job workers."""
+
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+from typing import Optional
+
+from ..models.fintech_models import (
+    EvaluationJobStatus,
+    EvaluationResult,
+    FullEvaluationReport,
+)
+from .comprehensive_evaluator import ComprehensiveEvaluator
+from .prompt_service import PromptService
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = ("completed", "failed", "cancelled")
+
+
+class EvaluationJob:
+    """State of one evaluation job: its status and the results done so far."""
+
+    def __init__(self, evaluator: ComprehensiveEvaluator, output_mode: str):
+        """
+        Creates a queued job.
+
+        Args:
+            evaluator: The evaluator that runs the job and builds its report.
+            output_mode: The PromptService output mode the job generates with.
+        """
+        self.id = uuid.uuid4().hex
+        self.evaluator = evaluator
+        self.output_mode = output_mode
+        self.status = "queued"
+        self.total = len(evaluator.dataset)
+        # (dataset index, result, reused), in completion order
+        self.results: list[tuple[int, EvaluationResult, bool]] = []
+        self.reused = 0
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+        # Set and replaced on every change; streams wait on the current one
+        self._changed = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def add_result(self, index: int, result: EvaluationResult, reused: bool) -> None:
+        """Records a finished item and wakes up the result streams."""
+        self.results.append((index, result, reused))
+        self.reused += reused
+        self._notify()
+
+    def finish(self, status: str, error: Optional[str] = None) -> None:
+        """Marks the job as finished (once) and wakes up the result streams."""
+        if self.finished:
+            return
+        self.status = status
+        self.error = error
+        self.finished_at = time.time()
+        self._notify()
+
+    def _eta_seconds(self) -> Optional[float]:
+        """Remaining time at the rate items have been computed (not reused) so far."""
+        computed = len(self.results) - self.reused
+        if self.started_at is None or self.finished or computed == 0:
+            return None
+        elapsed = time.time() - self.started_at
+        return elapsed / computed * (self.total - len(self.results))
+
+    def get_status(self) -> EvaluationJobStatus:
+        """Returns the job's progress and the summary metrics of the rows done."""
+        done = [result for _, result, _ in self.results]
+        return EvaluationJobStatus(
+            job_id=self.id,
+            status=self.status,
+            total_items=self.total,
+            completed_items=len(done),
+            reused_items=self.reused,
+            progress=len(done) / self.total if self.total else 1.0,
+            eta_seconds=self._eta_seconds(),
+            summary_metrics=(
+                self.evaluator.generate_report(done).summary_metrics if done else None
+            ),
+            error=self.error,
+        )
+
+    def get_report(self) -> FullEvaluationReport:
+        """Returns the report of the rows done so far, in dataset order."""
+        ordered = sorted(self.results, key=lambda item: item[0])
+        return self.evaluator.build_report(
+            [result for _, result, _ in ordered], self.reused, self.output_mode
+        )
+
+    async def stream_results(
+        self, start: int = 0
+    ) -> AsyncIterator[tuple[int, EvaluationResult, bool]]:
+        """
+        Yields the job's results in completion order until it finishes.
+
+        Args:
+            start: Number of results to skip, e.g. the ones a client already has.
+        """
+        position = start
+        while True:
+            # Taken before draining, so changes made while we yield are not missed
+            changed = self._changed
+            while position < len(self.results):
+                yield self.results[position]
+                position += 1
+            if self.finished:
+                return
+            await changed.wait()
+
+
+class EvaluationJobManager:
+    """
+    Runs evaluation jobs in the background, at most `max_workers` at a time.
+
+    Jobs beyond the pool wait in FIFO order. Each running job keeps at most
+    `max_concurrency` LLM generations and one scoring batch in flight, so
+    evaluations can't take over the event loop or the thread pool that serve
+    live chat traffic. Finished jobs are kept (oldest dropped first) up to
+    `max_finished_jobs` so their status and report can still be fetched.
+    """
+
+    def __init__(self, max_workers: int = 1, max_finished_jobs: int = 50):
+        """
+        Initializes the manager.
+
+        Args:
+            max_workers: Jobs allowed to run at the same time.
+            max_finished_jobs: Finished jobs kept in memory.
+        """
+        self.max_workers = max_workers
+        self.max_finished_jobs = max_finished_jobs
+        self._workers = asyncio.Semaphore(max_workers)
+        self._jobs: OrderedDict[str, EvaluationJob] = OrderedDict()
+
+    def submit(
+        self,
+        evaluator: ComprehensiveEvaluator,
+        prompt_service: PromptService,
+        max_concurrency: Optional[int] = None,
+        force: bool = False,
+    ) -> EvaluationJob:
+        """
+        Queues a full-dataset evaluation.
+
+        Args:
+            evaluator: The evaluator to run.
+            prompt_service: The service that generates the responses.
+            max_concurrency: Max LLM generations in flight for this job.
+            force: Recompute every item, ignoring stored results.
+
+        Returns:
+            The queued job.
+        """
+        job = EvaluationJob(evaluator, prompt_service.output_mode)
+        self._jobs[job.id] = job
+        job.task = asyncio.create_task(
+            self._run(job, prompt_service, max_concurrency, force)
+        )
+        # Also covers jobs cancelled before their task started running
+        job.task.add_done_callback(lambda _: job.finish("cancelled"))
+        logger.info(f"Evaluation job {job.id} queued ({job.total} items)")
+        return job
+
+    async def _run(
+        self,
+        job: EvaluationJob,
+        prompt_service: PromptService,
+        max_concurrency: Optional[int],
+        force: bool,
+    ) -> None:
+        try:
+            async with self._workers:
+                job.status = "running"
+                job.started_at = time.time()
+                async for index, result, reused in job.evaluator.iter_full_evaluation(
+                    prompt_service, max_concurrency, force
+                ):
+                    job.add_result(index, result, reused)
+            job.finish("completed")
+            logger.info(f"Evaluation job {job.id} completed")
+        except asyncio.CancelledError:
+            job.finish("cancelled")
+            logger.info(f"Evaluation job {job.id} cancelled")
+            raise
+        except Exception as e:
+            logger.error(f"Evaluation job {job.id} failed: {e}")
+            job.finish("failed", error=str(e))
+        finally:
+            self._prune()
+
+    def _prune(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[: max(0, len(finished) - self.max_finished_jobs)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[EvaluationJob]:
+        """Returns the job with the given id, or None if unknown or pruned."""
+        return self._jobs.get(job_id)
+
+    async def cancel(self, job_id: str) -> Optional[EvaluationJob]:
+        """
+        Cancels a queued or running job and waits until it has stopped.
+
+        Results done so far are kept.
+
+        Returns:
+            The job, or None if it does not exist.
+        """
+        job = self._jobs.get(job_id)
+        if job is not None and not job.finished and job.task is not None:
+            job.task.cancel()
+            await asyncio.wait({job.task})
+        return job
+
+    async def shutdown(self) -> None:
+        """Cancels every unfinished job and waits for them to stop."""
+        tasks = [job.task for job in self._jobs.values() if job.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def create_job_manager() -> EvaluationJobManager:
+    """Builds the job manager from environment variables."""
+    return EvaluationJobManager(
+        max_workers=int(os.getenv("EVALUATION_JOB_WORKERS", 1)),
+        max_finished_jobs=int(os.getenv("EVALUATION_JOBS_RETAINED", 50)),
+    )
@@ -0,0 +1,122 @@
+"""Per-item store of evaluation results, so unchanged rows are not recomputed."""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from ..models.fintech_models import CustomerQuery, EvaluationResult
+
+logger = logging.getLogger(__name__)
+
+
+def evaluation_item_key(
+    query: CustomerQuery, namespace: str, provider: str, evaluator_version: str
+) -> str:
+    """
+    Returns the cache key of one evaluation item.
+
+    Args:
+        query: The dataset row (text, expected labels and ideal response).
+        namespace: The PromptService namespace (system-prompt hash and model).
+        provider: The LLM provider name.
+        evaluator_version: Identifies the scoring code and its inputs.
+
+    Returns:
+        A hex digest that changes whenever any of the inputs changes.
+    """
+    payload = [
+        query.text,
+        query.expected_intent.value if query.expected_intent else None,
+        query.expected_product.value if query.expected_product else None,
+        query.ideal_response,
+        namespace,
+        provider,
+        evaluator_version,
+    ]
+    serialized = json.dumps(payload, ensure_ascii=False)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+class EvaluationResultStore:
+    """
+    SQLite table of EvaluationResults keyed by `evaluation_item_key`.
+
+    The connection is shared by every request and guarded by a lock; the
+    database runs in WAL mode so several workers can use the same file.
+    """
+
+    def __init__(self, path: str):
+        """
+        Opens (or creates) the store.
+
+        Args:
+            path: Path to the SQLite database file.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._lock, self._conn:
+            self._conn.executescript(
+                """
+                PRAGMA journal_mode=WAL;
+                PRAGMA synchronous=NORMAL;
+                CREATE TABLE IF NOT EXISTS evaluation_results (
+                    item_key TEXT PRIMARY KEY,
+                    result TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                );
+                """
+            )
+
+    def get_many(self, keys: list[str]) -> dict[str, EvaluationResult]:
+        """
+        Looks up stored results.
+
+        Args:
+            keys: Item keys to look up.
+
+        Returns:
+            The stored results by key; missing keys are left out.
+        """
+        found = {}
+        with self._lock:
+            # Chunked to stay below SQLite's limit on bound parameters
+            for i in range(0, len(keys), 500):
+                chunk = keys[i : i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    "SELECT item_key, result FROM evaluation_results "
+                    f"WHERE item_key IN ({placeholders})",
+                    chunk,
+                ).fetchall()
+                for key, result in rows:
+                    found[key] = EvaluationResult.model_validate_json(result)
+        return found
+
+    def put_many(self, items: list[tuple[str, EvaluationResult]]) -> None:
+        """Stores (key, result) pairs, replacing any previous result for a key."""
+        now = time.time()
+        rows = [(key, result.model_dump_json(), now) for key, result in items]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO evaluation_results VALUES (?, ?, ?)", rows
+            )
+
+    def close(self) -> None:
+        """Closes the database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+def build_evaluation_store() -> Optional[EvaluationResultStore]:
+    """Builds the evaluation result store from environment variables."""
+    if os.getenv("EVALUATION_CACHE_ENABLED", "true").lower() != "true":
+        return None
+    path = os.getenv("EVALUATION_CACHE_PATH", "evaluation_cache.sqlite")
+    logger.info(f"Evaluation results are cached per item in {path}")
+    return EvaluationResultStore(path)
@@ -0,0 +1,166 @@
+"""Deterministic offline chat model for benchmarks and local testing."""
+
+import asyncio
+import json
+import re
+import time
+from collections.abc import AsyncIterator, Sequence
+from typing import Any, Optional
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import (
+    AIMessage,
+    AIMessageChunk,
+    BaseMessage,
+    SystemMessage,
+)
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import PrivateAttr
+
+# A completion that follows the output format of prompts/system_prompt.xml,
+# so PromptService can parse it end to end.
+DEFAULT_FAKE_RESPONSE = """**RAZONAMIENTO:**
+El cliente pregunta por los beneficios de la Tarjeta de Débito.
+
+```json
+{
+  "intent": "BENEFITS",
+  "product": "DEBIT_CARD",
+  "confidence": 0.95,
+  "response": "¡Hola! Nuestra Tarjeta de Débito no tiene cuota de manejo.",
+  "next_steps": "Descarga la app de ITTI y completa tu registro."
+}
+```"""
+
+_JSON_BLOCK = re.compile(r"```json\s*({.*?})\s*```", re.DOTALL)
+
+
+def _estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token)."""
+    return max(1, len(text) // 4)
+
+
+class FakeLatencyChatModel(BaseChatModel):
+    """
+    A chat model that returns a fixed completion after a fixed delay.
+
+    The sync path blocks with `time.sleep` and the async path awaits
+    `asyncio.sleep`, mirroring how a real provider client behaves on each path.
+    Async streaming splits the completion into `stream_chunk_size`-character
+    chunks and spreads the latency evenly across them.
+
+    With tools bound (e.g. through `with_structured_output`), the answer is a
+    call to the first tool whose arguments are the completion's ```json block
+    plus the text before it as `reasoning`; a completion without a JSON block
+    yields empty arguments.
+
+    Usage metadata counts about four characters per token. Like a provider's
+    automatic prompt caching, a leading system message the model has already
+    seen is reported as cached input (`input_token_details.cache_read`).
+    """
+
+    response_text: str = DEFAULT_FAKE_RESPONSE
+    latency: float = 0.0  # Seconds to wait before answering
+    stream_chunk_size: int = 16
+
+    _seen_prefixes: set[str] = PrivateAttr(default_factory=set)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-latency"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any):
+        formatted = [convert_to_openai_tool(tool) for tool in tools]
+        return self.bind(tools=formatted, **kwargs)
+
+    def _build_result(
+        self, messages: list[BaseMessage], tools: Optional[list[dict]] = None
+    ) -> ChatResult:
+        if not tools:
+            message = AIMessage(
+                content=self.response_text,
+                usage_metadata=self._usage(messages, self.response_text),
+            )
+            return ChatResult(generations=[ChatGeneration(message=message)])
+
+        args = {}
+        match = _JSON_BLOCK.search(self.response_text)
+        if match:
+            args = json.loads(match.group(1))
+            reasoning = self.response_text[: match.start()]
+            args["reasoning"] = reasoning.replace("**RAZONAMIENTO:**", "").strip()
+        message = AIMessage(
+            content="",
+            tool_calls=[
+                {"name": tools[0]["function"]["name"], "args": args, "id": "fake"}
+            ],
+            usage_metadata=self._usage(messages, json.dumps(args, ensure_ascii=False)),
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _usage(self, messages: list[BaseMessage], text: str) -> dict:
+        input_tokens = sum(_estimate_tokens(str(m.content)) for m in messages)
+        cached_tokens = 0
+        if messages and isinstance(messages[0], SystemMessage):
+            prefix = str(messages[0].content)
+            if prefix in self._seen_prefixes:
+                cached_tokens = _estimate_tokens(prefix)
+            self._seen_prefixes.add(prefix)
+        output_tokens = _estimate_tokens(text)
+        return {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+            "input_token_details": {"cache_read": cached_tokens},
+        }
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._build_result(messages, kwargs.get("tools"))
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._build_result(messages, kwargs.get("tools"))
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        size = self.stream_chunk_size
+        pieces = [
+            self.response_text[i : i + size]
+            for i in range(0, len(self.response_text), size)
+        ]
+        delay = self.latency / len(pieces) if pieces else 0.0
+        usage = self._usage(messages, self.response_text)
+        for index, piece in enumerate(pieces):
+            if delay:
+                await asyncio.sleep(delay)
+            # Usage is reported once, with the last chunk
+            last = index == len(pieces) - 1
+            chunk = AIMessageChunk(
+                content=piece, usage_metadata=usage if last else None
+            )
+            yield ChatGenerationChunk(message=chunk)
@@ -0,0 +1,369 @@
+"""
+Local flight inventory behind the flight tools: flights and reservations in SQLite.
+
+A flight is one departure of a flight number: the flights' primary key is
+(flight number, date), and a reservation belongs to one of those departures.
+Status and reservation lookups take a date; without one they find the next
+departure from today (or the latest one, once every date has passed).
+
+Every tool query is a search on an index: (flight number, date) (the flights'
+primary key), (flight number, passenger, date) (the reservations' primary key)
+and (origin, destination, date). Both tables are WITHOUT ROWID, so a lookup
+reads the row straight from its index, and stays well under a millisecond with
+tens of millions of reservations.
+
+Import CSV or Parquet files into a database file with:
+    python -m itti_backend.services.flight_inventory --db inventory.sqlite \\
+        --flights flights.csv --reservations reservations.csv
+"""
+
+import argparse
+import logging
+import os
+import sqlite3
+import threading
+import uuid
+from collections.abc import Iterator
+from datetime import date as Date
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+
+from .response_cache import normalize_query
+
+logger = logging.getLogger(__name__)
+
+DEMO_DATA_DIR = os.path.join(
+    os.path.dirname(__file__), "..", "data", "flight_inventory"
+)
+FLIGHT_COLUMNS = [
+    "flight_number",
+    "origin",
+    "destination",
+    "date",
+    "departure",
+    "arrival",
+    "status",
+    "seats_available",
+]
+RESERVATION_COLUMNS = ["flight_number", "date", "passenger_name"]
+# Rows read from a file and inserted per transaction
+IMPORT_CHUNK_ROWS = 500_000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS flights (
+    flight_number TEXT NOT NULL,
+    origin TEXT NOT NULL,
+    destination TEXT NOT NULL,
+    date TEXT NOT NULL,
+    departure TEXT NOT NULL,
+    arrival TEXT NOT NULL,
+    status TEXT NOT NULL,
+    seats_available INTEGER NOT NULL,
+    PRIMARY KEY (flight_number, date)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS flights_by_route
+    ON flights (origin, destination, date, departure);
+CREATE TABLE IF NOT EXISTS reservations (
+    flight_number TEXT NOT NULL,
+    date TEXT NOT NULL,
+    passenger_key TEXT NOT NULL,
+    passenger_name TEXT NOT NULL,
+    PRIMARY KEY (flight_number, passenger_key, date)
+) WITHOUT ROWID;
+"""
+
+
+def _by_date(query: str, date_column: str) -> tuple[str, str, str]:
+    """Returns `query` for the departure on a date, the next one and the last one."""
+    return (
+        f"{query} AND {date_column} = ?",
+        f"{query} AND {date_column} >= ? ORDER BY {date_column} LIMIT 1",
+        f"{query} AND {date_column} < ? ORDER BY {date_column} DESC LIMIT 1",
+    )
+
+
+# Queries of the tools; each one is a search on an index, never a table scan
+STATUS_QUERIES = _by_date(
+    "SELECT status, departure, arrival, date FROM flights WHERE flight_number = ?",
+    "date",
+)
+RESERVATION_QUERIES = _by_date(
+    "SELECT f.flight_number, f.origin, f.destination, f.date, r.passenger_name "
+    "FROM reservations r "
+    "JOIN flights f ON f.flight_number = r.flight_number AND f.date = r.date "
+    "WHERE r.flight_number = ? AND r.passenger_key = ?",
+    "r.date",
+)
+AVAILABILITY_QUERY = (
+    "SELECT flight_number, departure FROM flights "
+    "WHERE origin = ? AND destination = ? AND date = ? "
+    "AND seats_available > 0 AND status != 'cancelado' ORDER BY departure"
+)
+
+
+def normalize_flight_number(flight_number: str) -> str:
+    """Uppercases a flight number and drops its spaces ("vw 123" -> "VW123")."""
+    return flight_number.strip().replace(" ", "").upper()
+
+
+def normalize_passenger_name(passenger_name: str) -> str:
+    """Returns the lookup key of a passenger name (case and accent insensitive)."""
+    return normalize_query(passenger_name)
+
+
+class FlightInventory:
+    """
+    SQLite store of flights and reservations, queried by the flight tools.
+
+    Loading goes through one connection guarded by a lock. Lookups use a
+    read-only connection per thread, so concurrent tool calls don't wait on
+    each other; a database file runs in WAL mode, so they don't wait on a load
+    either, and several workers can read the same file. An in-memory inventory
+    is a shared-cache database, which every connection of the instance sees.
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        """
+        Opens (or creates) the inventory.
+
+        Args:
+            path: Path to the SQLite database file; ":memory:" keeps it in the
+                process.
+        """
+        self.path = path
+        if path == ":memory:":
+            uri = f"file:flight_inventory_{uuid.uuid4().hex}?mode=memory&cache=shared"
+            self._read_uri = uri
+        else:
+            uri = Path(path).absolute().as_uri()
+            self._read_uri = f"{uri}?mode=ro"
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False, timeout=30)
+        self._local = threading.local()
+        self._readers_lock = threading.Lock()
+        self._readers: list[sqlite3.Connection] = []
+        with self._lock, self._conn:
+            if path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            columns = {
+                row[1] for row in self._conn.execute("PRAGMA table_info(reservations)")
+            }
+        if "date" not in columns:
+            raise ValueError(
+                f"{path} has the old flight inventory schema (one row per flight "
+                "number); import its files into a new database"
+            )
+
+    def _reader(self) -> sqlite3.Connection:
+        """Returns this thread's read-only connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self._read_uri, uri=True, check_same_thread=False, timeout=30
+            )
+            conn.execute("PRAGMA query_only=ON")
+            self._local.conn = conn
+            with self._readers_lock:
+                self._readers.append(conn)
+        return conn
+
+    def _departure(
+        self, queries: tuple[str, str, str], key: tuple, date: Optional[str]
+    ) -> Optional[tuple]:
+        """Runs one of `_by_date`'s queries: on `date`, or the next departure."""
+        on_date, next_from, last_before = queries
+        conn = self._reader()
+        if date:
+            return conn.execute(on_date, (*key, date)).fetchone()
+        today = Date.today().isoformat()
+        return (
+            conn.execute(next_from, (*key, today)).fetchone()
+            or conn.execute(last_before, (*key, today)).fetchone()
+        )
+
+    # --- Loading ---
+    def insert_flights(self, flights: pd.DataFrame) -> None:
+        """Inserts (or replaces) flights; `flights` has the FLIGHT_COLUMNS."""
+        frame = flights[FLIGHT_COLUMNS].copy()
+        frame["flight_number"] = _normalize_flight_numbers(frame["flight_number"])
+        frame["origin"] = frame["origin"].str.upper()
+        frame["destination"] = frame["destination"].str.upper()
+        frame["seats_available"] = frame["seats_available"].astype(int)
+        # Plain lists: iterating pandas' string arrays item by item is slow
+        rows = zip(*(frame[column].tolist() for column in FLIGHT_COLUMNS))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO flights VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def insert_reservations(self, reservations: pd.DataFrame) -> None:
+        """Inserts (or replaces) reservations with the RESERVATION_COLUMNS."""
+        names = reservations["passenger_name"]
+        # Names repeat a lot, so each distinct one is normalized once
+        keys = {name: normalize_passenger_name(name) for name in names.unique()}
+        rows = zip(
+            _normalize_flight_numbers(reservations["flight_number"]).tolist(),
+            reservations["date"].tolist(),
+            names.map(keys).tolist(),
+            names.tolist(),
+        )
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO reservations VALUES (?, ?, ?, ?)", rows
+            )
+
+    def import_files(
+        self,
+        flights_path: str,
+        reservations_path: Optional[str] = None,
+        chunk_rows: int = IMPORT_CHUNK_ROWS,
+    ) -> tuple[int, int]:
+        """
+        Imports flights and reservations from CSV or Parquet files.
+
+        Files are read `chunk_rows` rows at a time, so they don't have to fit
+        in memory. Parquet files need pyarrow.
+
+        Args:
+            flights_path: File with the FLIGHT_COLUMNS.
+            reservations_path: File with the RESERVATION_COLUMNS, if any.
+            chunk_rows: Rows read and inserted per transaction.
+
+        Returns:
+            The number of flight and reservation rows read.
+        """
+        flights = reservations = 0
+        for chunk in _read_chunks(flights_path, chunk_rows):
+            self.insert_flights(chunk)
+            flights += len(chunk)
+        if reservations_path:
+            for chunk in _read_chunks(reservations_path, chunk_rows):
+                self.insert_reservations(chunk)
+                reservations += len(chunk)
+        self.analyze()
+        logger.info(f"Imported {flights} flights and {reservations} reservations")
+        return flights, reservations
+
+    def analyze(self) -> None:
+        """Refreshes the query planner's statistics; run it after a bulk load."""
+        with self._lock:
+            self._conn.execute("ANALYZE")
+
+    # --- Lookups ---
+    def flight_status(
+        self, flight_number: str, date: Optional[str] = None
+    ) -> Optional[dict]:
+        """
+        Returns a flight's status, departure, arrival and date, or None if unknown.
+
+        Args:
+            flight_number: The flight number.
+            date: The departure's date (YYYY-MM-DD). Defaults to the next one.
+        """
+        row = self._departure(
+            STATUS_QUERIES, (normalize_flight_number(flight_number),), date
+        )
+        if row is None:
+            return None
+        return dict(zip(("status", "departure", "arrival", "date"), row))
+
+    def reservation(
+        self, flight_number: str, passenger_name: str, date: Optional[str] = None
+    ) -> Optional[dict]:
+        """
+        Returns a passenger's reservation on a flight, or None if there is none.
+
+        Args:
+            flight_number: The flight number.
+            passenger_name: The passenger's name, in any case and accents.
+            date: The departure's date (YYYY-MM-DD). Defaults to the passenger's
+                next one on that flight number.
+        """
+        key = (
+            normalize_flight_number(flight_number),
+            normalize_passenger_name(passenger_name),
+        )
+        row = self._departure(RESERVATION_QUERIES, key, date)
+        if row is None:
+            return None
+        keys = ("flight_number", "origin", "destination", "date", "passenger")
+        return dict(zip(keys, row))
+
+    def available_flights(self, origin: str, destination: str, date: str) -> list[dict]:
+        """Returns the route's flights on `date` with seats left, by departure time."""
+        rows = (
+            self._reader()
+            .execute(AVAILABILITY_QUERY, (origin.upper(), destination.upper(), date))
+            .fetchall()
+        )
+        return [{"flight_number": number, "time": time} for number, time in rows]
+
+    def counts(self) -> tuple[int, int]:
+        """Returns the number of flights and reservations stored."""
+        conn = self._reader()
+        flights = conn.execute("SELECT COUNT(*) FROM flights").fetchone()
+        reservations = conn.execute("SELECT COUNT(*) FROM reservations").fetchone()
+        return flights[0], reservations[0]
+
+    def close(self) -> None:
+        """Closes the database connections."""
+        with self._readers_lock:
+            for conn in self._readers:
+                conn.close()
+            self._readers.clear()
+        with self._lock:
+            self._conn.close()
+
+
+def _normalize_flight_numbers(flight_numbers: pd.Series) -> pd.Series:
+    """Vectorized `normalize_flight_number`."""
+    return flight_numbers.str.strip().str.replace(" ", "", regex=False).str.upper()
+
+
+def _read_chunks(path: str, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq  # Optional: only needed for Parquet files
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_rows, dtype=str)
+
+
+def build_flight_inventory() -> FlightInventory:
+    """
+    Builds the flight inventory from environment variables.
+
+    FLIGHT_INVENTORY_PATH points to a database built with this module's
+    command line; without it, the bundled demo flights are loaded in memory.
+    """
+    path = os.getenv("FLIGHT_INVENTORY_PATH")
+    if path:
+        logger.info(f"Flight inventory: {path}")
+        return FlightInventory(path)
+    inventory = FlightInventory()
+    inventory.import_files(
+        os.path.join(DEMO_DATA_DIR, "flights.csv"),
+        os.path.join(DEMO_DATA_DIR, "reservations.csv"),
+    )
+    return inventory
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Imports flights and reservations into a flight inventory."
+    )
+    parser.add_argument("--db", required=True, help="SQLite database to write")
+    parser.add_argument("--flights", required=True, help="Flights CSV or Parquet")
+    parser.add_argument("--reservations", help="Reservations CSV or Parquet")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    inventory = FlightInventory(args.db)
+    inventory.import_files(args.flights, args.reservations)
+    inventory.close()
@@ -0,0 +1,272 @@
+"""Record/replay chat models backed by a JSONL cassette of LLM completions."""
+
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections.abc import AsyncIterator, Sequence
+from functools import lru_cache
+from typing import Any, Optional
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    message_chunk_to_message,
+)
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import PrivateAttr
+
+# Appends from every RecordingChatModel in the process go through one lock
+_write_lock = threading.Lock()
+
+
+def prompt_hash(messages: list[BaseMessage], params: Optional[dict] = None) -> str:
+    """
+    Returns a stable hash of a prompt and its call parameters.
+
+    Each message contributes its type and content, plus its tool calls or tool
+    call id when it has them. `params` (bound tools, tool choice, stop words)
+    are part of the hash, so a prompt sent with tools is a different entry.
+    """
+    payload: list[Any] = []
+    for message in messages:
+        key = [message.type, message.content]
+        if getattr(message, "tool_calls", None):
+            key.append([[c["name"], c["args"]] for c in message.tool_calls])
+        if getattr(message, "tool_call_id", None):
+            key.append(message.tool_call_id)
+        payload.append(key)
+    if params:
+        payload.append(params)
+    serialized = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+def _call_params(stop: Optional[list[str]], kwargs: dict) -> dict:
+    """Returns the parameters of a call that change its completion."""
+    params = {key: value for key, value in kwargs.items() if value is not None}
+    if stop:
+        params["stop"] = stop
+    return params
+
+
+@lru_cache
+def load_cassette(path: str) -> dict[str, dict]:
+    """
+    Loads a cassette into a prompt-hash -> entry map.
+
+    When a prompt was recorded more than once, the latest entry wins.
+
+    Args:
+        path: Path to the JSONL cassette.
+
+    Returns:
+        A dict of entries with `message` (or, in older cassettes, only
+        `completion`) and `latency` keys.
+    """
+    entries = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                entries[entry["prompt_hash"]] = entry
+    return entries
+
+
+def _build_result(entry: dict) -> ChatResult:
+    """Rebuilds the recorded AIMessage, with its tool calls and token usage."""
+    if "message" in entry:
+        message = AIMessage.model_validate(entry["message"])
+    else:  # Cassettes recorded before whole messages were kept
+        message = AIMessage(content=entry["completion"])
+    return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def _bind_tools(model: BaseChatModel, tools: Sequence[Any], **kwargs: Any):
+    """Binds tools in the OpenAI format, so they serialize into the prompt hash."""
+    formatted = [convert_to_openai_tool(tool) for tool in tools]
+    return model.bind(tools=formatted, **kwargs)
+
+
+class RecordingChatModel(BaseChatModel):
+    """
+    Wraps a real chat model and appends each completion to a cassette.
+
+    Every call is forwarded to `client`; the prompt hash, the whole AIMessage
+    (content, tool calls and usage metadata) and the observed latency are then
+    appended as one JSON line to `cassette_path`. Tools bound with
+    `bind_tools` (and so `with_structured_output`) are forwarded to the
+    client's own `bind_tools`.
+    """
+
+    client: BaseChatModel
+    cassette_path: str
+
+    @property
+    def _llm_type(self) -> str:
+        return "record"
+
+    @property
+    def model_name(self) -> str:
+        """The wrapped client's model, so cache namespaces match the real one."""
+        return (
+            getattr(self.client, "model_name", None)
+            or getattr(self.client, "model", None)
+            or self.client._llm_type
+        )
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any):
+        return _bind_tools(self, tools, **kwargs)
+
+    def _client_for(self, kwargs: dict) -> tuple[Any, dict]:
+        """Returns the client with the call's tools bound, and the other kwargs."""
+        kwargs = dict(kwargs)
+        tools = kwargs.pop("tools", None)
+        tool_choice = kwargs.pop("tool_choice", None)
+        if not tools:
+            return self.client, kwargs
+        choice = {} if tool_choice is None else {"tool_choice": tool_choice}
+        return self.client.bind_tools(tools, **choice), kwargs
+
+    def _record(
+        self,
+        messages: list[BaseMessage],
+        params: dict,
+        message: AIMessage,
+        latency: float,
+    ) -> None:
+        entry = {
+            "prompt_hash": prompt_hash(messages, params),
+            "completion": message.content,
+            "message": message.model_dump(),
+            "latency": latency,
+            "model": self.model_name,
+        }
+        line = json.dumps(entry, ensure_ascii=False, default=str)
+        with _write_lock, open(self.cassette_path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        client, rest = self._client_for(kwargs)
+        start = time.perf_counter()
+        message = client.invoke(messages, stop=stop, **rest)
+        latency = time.perf_counter() - start
+        self._record(messages, _call_params(stop, kwargs), message, latency)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        client, rest = self._client_for(kwargs)
+        start = time.perf_counter()
+        message = await client.ainvoke(messages, stop=stop, **rest)
+        latency = time.perf_counter() - start
+        await asyncio.to_thread(
+            self._record, messages, _call_params(stop, kwargs), message, latency
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        client, rest = self._client_for(kwargs)
+        start = time.perf_counter()
+        full = None
+        async for chunk in client.astream(messages, stop=stop, **rest):
+            full = chunk if full is None else full + chunk
+            yield ChatGenerationChunk(message=chunk)
+        latency = time.perf_counter() - start
+        if full is not None:
+            await asyncio.to_thread(
+                self._record,
+                messages,
+                _call_params(stop, kwargs),
+                message_chunk_to_message(full),
+                latency,
+            )
+
+
+class ReplayChatModel(BaseChatModel):
+    """
+    Serves completions from a cassette written by RecordingChatModel.
+
+    With `use_recorded_latency`, each answer is delayed by the latency observed
+    when it was recorded; otherwise it is returned immediately. Answers keep
+    their recorded tool calls and usage metadata, and tools can be bound, so
+    structured output and token accounting work offline too. A prompt (or
+    set of bound tools) that is not in the cassette raises ValueError, so drift
+    between the recorded and current prompts is never hidden.
+    """
+
+    cassette_path: str
+    use_recorded_latency: bool = False
+    model_name: str = "replay"
+    _entries: dict[str, dict] = PrivateAttr(default_factory=dict)
+
+    def model_post_init(self, __context: Any) -> None:
+        self._entries = load_cassette(self.cassette_path)
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any):
+        return _bind_tools(self, tools, **kwargs)
+
+    def _lookup(self, messages: list[BaseMessage], params: dict) -> dict:
+        key = prompt_hash(messages, params)
+        entry = self._entries.get(key)
+        if entry is None:
+            raise ValueError(
+                f"Prompt {key[:12]} is not in the cassette {self.cassette_path}. "
+                "Record it again with LLM_PROVIDER=record."
+            )
+        return entry
+
+    def _delay(self, entry: dict) -> float:
+        return entry["latency"] if self.use_recorded_latency else 0.0
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        entry = self._lookup(messages, _call_params(stop, kwargs))
+        if delay := self._delay(entry):
+            time.sleep(delay)
+        return _build_result(entry)
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        entry = self._lookup(messages, _call_params(stop, kwargs))
+        if delay := self._delay(entry):
+            await asyncio.sleep(delay)
+        return _build_result(entry)
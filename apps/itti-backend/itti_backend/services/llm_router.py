@@ -0,0 +1,428 @@
+"""LLM router: hedged calls across several providers, with circuit breakers."""
+
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Sequence
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Optional
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import PrivateAttr
+
+from ..core.metrics import (
+    LLM_CIRCUIT_TRANSITIONS,
+    LLM_HEDGED_CALLS,
+    LLM_PROVIDER_CALLS,
+    LLM_PROVIDER_LATENCY,
+    count,
+    observe,
+)
+
+# Latency samples a provider needs before its percentile replaces the max delay
+MIN_LATENCY_SAMPLES = 20
+
+# Sync calls run in this pool, so a hedge can start while the first call waits
+_POOL = ThreadPoolExecutor(
+    max_workers=int(os.getenv("LLM_ROUTER_THREADS", 32)),
+    thread_name_prefix="llm-router",
+)
+
+
+class AllProvidersUnavailableError(RuntimeError):
+    """Raised when every provider's circuit breaker is open."""
+
+
+class ProviderHealth:
+    """
+    Rolling latency and error rate of one provider, and its circuit breaker.
+
+    The breaker opens when at least `min_calls` of the last `window` calls
+    were made and `error_rate` of them failed; no call is routed to the
+    provider for `cooldown_seconds`. It then lets a single probe through
+    ("half_open"): a success closes it, a failure opens it again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: int = 100,
+        error_rate: float = 0.5,
+        min_calls: int = 5,
+        cooldown_seconds: float = 30.0,
+    ):
+        """
+        Initializes a closed breaker with no history.
+
+        Args:
+            name: The provider's name, used as a metrics label.
+            window: Number of recent calls the latency and error rate cover.
+            error_rate: Failure ratio that opens the breaker.
+            min_calls: Calls in the window before the error rate counts.
+            cooldown_seconds: Time the breaker stays open before a probe.
+        """
+        self.name = name
+        self.error_rate_threshold = error_rate
+        self.min_calls = min_calls
+        self.cooldown_seconds = cooldown_seconds
+        self.state = "closed"
+        self._lock = threading.Lock()
+        self._latencies: deque[float] = deque(maxlen=window)
+        self._failures: deque[bool] = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probing = False
+
+    def acquire(self) -> bool:
+        """Returns whether a call may be routed to the provider now."""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open":
+                if time.monotonic() - self._opened_at < self.cooldown_seconds:
+                    return False
+                self._transition("half_open")
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def release(self) -> None:
+        """Gives back a probe whose call was cancelled before it finished."""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self, latency: float) -> None:
+        with self._lock:
+            self._latencies.append(latency)
+            self._failures.append(False)
+            self._probing = False
+            if self.state != "closed":
+                # Failures from before the outage must not reopen it at once
+                self._failures.clear()
+                self._transition("closed")
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures.append(True)
+            self._probing = False
+            if self.state == "half_open" or (
+                self.state == "closed"
+                and len(self._failures) >= self.min_calls
+                and self.error_rate() >= self.error_rate_threshold
+            ):
+                self._opened_at = time.monotonic()
+                self._transition("open")
+
+    def record_latency(self, latency: float) -> None:
+        """Records how long a call ran without counting it as a success or failure."""
+        with self._lock:
+            self._latencies.append(latency)
+
+    def error_rate(self) -> float:
+        """Returns the share of failed calls in the window."""
+        if not self._failures:
+            return 0.0
+        return sum(self._failures) / len(self._failures)
+
+    def latency_quantile(self, quantile: float) -> Optional[float]:
+        """Returns the window's latency `quantile`, or None with too few samples."""
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < MIN_LATENCY_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(quantile * len(samples)))]
+
+    def _transition(self, state: str) -> None:
+        self.state = state
+        count(LLM_CIRCUIT_TRANSITIONS, provider=self.name, state=state)
+
+
+def _result(message: BaseMessage) -> ChatResult:
+    return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+class RouterChatModel(BaseChatModel):
+    """
+    Routes each call to the first healthy client, hedging slow calls.
+
+    `clients` are in order of preference. When the call in flight hasn't
+    answered within its provider's `hedge_quantile` latency (clamped to
+    [`hedge_min_delay`, `hedge_max_delay`]; the max until there are enough
+    samples), the same call is sent to the next healthy client and the first
+    answer wins; the other call is cancelled (async) or left to finish in
+    the background (sync). A failed call fails over to the next client right
+    away. Each provider's circuit breaker (ProviderHealth) keeps calls away
+    from a provider that keeps failing.
+
+    Streaming calls fail over while no chunk has been sent, but are not
+    hedged.
+    """
+
+    clients: list[BaseChatModel]
+    providers: list[str]
+    hedge_quantile: float = 0.95
+    hedge_min_delay: float = 0.05
+    hedge_max_delay: float = 10.0
+    health_window: int = 100
+    breaker_error_rate: float = 0.5
+    breaker_min_calls: int = 5
+    breaker_cooldown_seconds: float = 30.0
+
+    _health: list[ProviderHealth] = PrivateAttr(default_factory=list)
+
+    def model_post_init(self, __context: Any) -> None:
+        if not self.clients or len(self.clients) != len(self.providers):
+            raise ValueError("RouterChatModel needs one provider name per client")
+        self._health = [
+            ProviderHealth(
+                name,
+                window=self.health_window,
+                error_rate=self.breaker_error_rate,
+                min_calls=self.breaker_min_calls,
+                cooldown_seconds=self.breaker_cooldown_seconds,
+            )
+            for name in self.providers
+        ]
+
+    @property
+    def _llm_type(self) -> str:
+        return "router"
+
+    @property
+    def model_name(self) -> str:
+        """The preferred client's model, so cache namespaces match it."""
+        client = self.clients[0]
+        return (
+            getattr(client, "model_name", None)
+            or getattr(client, "model", None)
+            or client._llm_type
+        )
+
+    @property
+    def health(self) -> list[ProviderHealth]:
+        """Each provider's latency, error rate and breaker, in client order."""
+        return self._health
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any):
+        # Tools in OpenAI format are accepted by every supported provider
+        formatted = [convert_to_openai_tool(tool) for tool in tools]
+        return self.bind(tools=formatted, **kwargs)
+
+    def _next_provider(self, tried: set[int]) -> Optional[int]:
+        for index, health in enumerate(self._health):
+            if index not in tried and health.acquire():
+                return index
+        return None
+
+    def _hedge_delay(self, index: int) -> float:
+        delay = self._health[index].latency_quantile(self.hedge_quantile)
+        if delay is None:
+            return self.hedge_max_delay
+        return min(max(delay, self.hedge_min_delay), self.hedge_max_delay)
+
+    def _count_hedge(self, index: Optional[int]) -> None:
+        if index is not None:
+            count(LLM_HEDGED_CALLS, provider=self.providers[index])
+
+    def _unavailable(self) -> AllProvidersUnavailableError:
+        return AllProvidersUnavailableError(
+            f"Every LLM provider's circuit is open: {', '.join(self.providers)}"
+        )
+
+    def _finish(self, index: int, start: float, error: Optional[Exception]) -> None:
+        """Records the outcome of a call that ran to completion."""
+        health = self._health[index]
+        latency = time.perf_counter() - start
+        if error is None:
+            health.record_success(latency)
+            observe(LLM_PROVIDER_LATENCY, latency, provider=health.name)
+            count(LLM_PROVIDER_CALLS, provider=health.name, outcome="success")
+        else:
+            health.record_failure()
+            count(LLM_PROVIDER_CALLS, provider=health.name, outcome="error")
+
+    def _cancelled(self, index: int, start: float) -> None:
+        health = self._health[index]
+        # A lower bound of its latency: dropping it would hide the slow tail
+        # from the percentile that decides when to hedge
+        health.record_latency(time.perf_counter() - start)
+        health.release()
+        count(LLM_PROVIDER_CALLS, provider=health.name, outcome="cancelled")
+
+    def _call(self, index: int, messages: list[BaseMessage], **kwargs: Any):
+        start = time.perf_counter()
+        try:
+            message = self.clients[index].invoke(messages, **kwargs)
+        except Exception as e:
+            self._finish(index, start, e)
+            raise
+        self._finish(index, start, None)
+        return message
+
+    async def _acall(self, index: int, messages: list[BaseMessage], **kwargs: Any):
+        start = time.perf_counter()
+        try:
+            message = await self.clients[index].ainvoke(messages, **kwargs)
+        except asyncio.CancelledError:
+            self._cancelled(index, start)
+            raise
+        except Exception as e:
+            self._finish(index, start, e)
+            raise
+        self._finish(index, start, None)
+        return message
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        tried: set[int] = set()
+        calls: dict[Future, int] = {}
+        hedged = False
+
+        def launch() -> Optional[int]:
+            index = self._next_provider(tried)
+            if index is not None:
+                tried.add(index)
+                # The pool's threads don't inherit the caller's context
+                # (LLM priority, tracing callbacks); each call runs in a copy
+                context = contextvars.copy_context()
+                future = _POOL.submit(
+                    context.run, self._call, index, messages, stop=stop, **kwargs
+                )
+                calls[future] = index
+            return index
+
+        if launch() is None:
+            raise self._unavailable()
+        error: Optional[BaseException] = None
+        while calls:
+            timeout = None
+            if not hedged and len(calls) == 1:
+                timeout = self._hedge_delay(next(iter(calls.values())))
+            done, _ = wait(calls, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                hedged = True
+                self._count_hedge(launch())
+                continue
+            for future in done:
+                calls.pop(future)
+                error = future.exception()
+                if error is None:
+                    # A slower call still running just finishes in its thread
+                    return _result(future.result())
+            if not calls and launch() is None:
+                raise error
+        raise error
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        tried: set[int] = set()
+        calls: dict[asyncio.Task, int] = {}
+        hedged = False
+
+        def launch() -> Optional[int]:
+            index = self._next_provider(tried)
+            if index is not None:
+                tried.add(index)
+                task = asyncio.ensure_future(
+                    self._acall(index, messages, stop=stop, **kwargs)
+                )
+                calls[task] = index
+            return index
+
+        if launch() is None:
+            raise self._unavailable()
+        error: Optional[BaseException] = None
+        try:
+            while calls:
+                timeout = None
+                if not hedged and len(calls) == 1:
+                    timeout = self._hedge_delay(next(iter(calls.values())))
+                done, _ = await asyncio.wait(
+                    calls, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    hedged = True
+                    self._count_hedge(launch())
+                    continue
+                for task in done:
+                    calls.pop(task)
+                    error = task.exception()
+                    if error is None:
+                        return _result(task.result())
+                if not calls and launch() is None:
+                    raise error
+            raise error
+        finally:
+            # The losing call (or every call, if the caller was cancelled)
+            for task in calls:
+                task.cancel()
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        tried: set[int] = set()
+        error: Optional[Exception] = None
+        while (index := self._next_provider(tried)) is not None:
+            tried.add(index)
+            start = time.perf_counter()
+            streamed = False
+            try:
+                async for chunk in self.clients[index].astream(
+                    messages, stop=stop, **kwargs
+                ):
+                    streamed = True
+                    yield ChatGenerationChunk(message=chunk)
+            except Exception as e:
+                self._finish(index, start, e)
+                if streamed:
+                    # The caller already has part of this answer
+                    raise
+                error = e
+                continue
+            except BaseException:
+                self._cancelled(index, start)
+                raise
+            self._finish(index, start, None)
+            return
+        raise error or self._unavailable()
+
+
+def build_llm_router(
+    providers: list[str], clients: list[BaseChatModel]
+) -> RouterChatModel:
+    """Builds the router over `clients` with its settings from the environment."""
+    return RouterChatModel(
+        clients=clients,
+        providers=providers,
+        hedge_quantile=float(os.getenv("LLM_HEDGE_QUANTILE", 0.95)),
+        hedge_min_delay=float(os.getenv("LLM_HEDGE_MIN_DELAY_SECONDS", 0.05)),
+        hedge_max_delay=float(os.getenv("LLM_HEDGE_MAX_DELAY_SECONDS", 10)),
+        health_window=int(os.getenv("LLM_HEALTH_WINDOW", 100)),
+        breaker_error_rate=float(os.getenv("LLM_BREAKER_ERROR_RATE", 0.5)),
+        breaker_min_calls=int(os.getenv("LLM_BREAKER_MIN_CALLS", 5)),
+        breaker_cooldown_seconds=float(os.getenv("LLM_BREAKER_COOLDOWN_SECONDS", 30)),
+    )
@@ -0,0 +1,194 @@
+"""
+Process-wide admission control for LLM calls, shared by chat and evaluation.
+
+Every client of a provider shares one `PriorityRateLimiter`, set as the chat
+model's `rate_limiter`, so each call from the PromptService, the intent
+classifier and the agents (and each hedge of the LLM router) is admitted by
+the same request and token budgets. Calls run with a priority class taken
+from the context (`llm_priority`): an evaluation call waits while an
+interactive one is queued, and leaves part of the token budget to chat.
+"""
+
+import asyncio
+import threading
+import time
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import ChatGeneration, LLMResult
+from langchain_core.rate_limiters import BaseRateLimiter
+
+from ..core.metrics import LLM_QUEUE_WAIT, observe
+
+# Priority classes, highest first
+PRIORITIES = ("interactive", "evaluation")
+
+_PRIORITY: ContextVar[str] = ContextVar("llm_priority", default=PRIORITIES[0])
+
+
+@contextmanager
+def llm_priority(priority: str) -> Iterator[None]:
+    """Runs the LLM calls made in the enclosed block with `priority`."""
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown LLM priority {priority!r}: use {PRIORITIES}")
+    token = _PRIORITY.set(priority)
+    try:
+        yield
+    finally:
+        _PRIORITY.reset(token)
+
+
+def current_llm_priority() -> str:
+    """Returns the priority class of the LLM calls made from this context."""
+    return _PRIORITY.get()
+
+
+class _Bucket:
+    """Token bucket: `rate` units per second, up to `capacity`; starts full."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+class PriorityRateLimiter(BaseRateLimiter):
+    """
+    Request and token budgets of one provider, with strict priority classes.
+
+    A call takes one request from the request bucket when it starts. Token
+    counts are only known when it ends, so the token bucket is charged then
+    (through `usage_callback`) and may go into debt; while it is in debt no
+    call is admitted. A class below the first one is also held back while a
+    higher class has a call queued, and while less than `reserve` of the token
+    budget is left, which keeps that share for interactive calls.
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        requests_per_second: float = 0,
+        tokens_per_minute: float = 0,
+        reserve: float = 0.2,
+        check_every_n_seconds: float = 0.01,
+    ):
+        """
+        Args:
+            provider: Provider name, used as the metrics label.
+            requests_per_second: Request rate; non-positive means unlimited.
+            tokens_per_minute: Token rate (input plus output); non-positive
+                means unlimited.
+            reserve: Share of the token budget that lower classes leave free.
+            check_every_n_seconds: Polling interval of a queued call.
+        """
+        self.provider = provider
+        self.reserve = reserve
+        self.check_every_n_seconds = check_every_n_seconds
+        self._requests = (
+            _Bucket(requests_per_second, max(1.0, requests_per_second))
+            if requests_per_second > 0
+            else None
+        )
+        self._tokens = (
+            _Bucket(tokens_per_minute / 60, tokens_per_minute)
+            if tokens_per_minute > 0
+            else None
+        )
+        self._queued: Counter[str] = Counter()
+        self._lock = threading.Lock()
+        self.usage_callback = TokenUsageCallback(self)
+
+    def _try_acquire(self, priority: str) -> bool:
+        rank = PRIORITIES.index(priority)
+        with self._lock:
+            if any(self._queued[p] for p in PRIORITIES[:rank]):
+                return False
+            now = time.monotonic()
+            if self._tokens is not None:
+                self._tokens.refill(now)
+                floor = self.reserve * self._tokens.capacity if rank else 0.0
+                if self._tokens.level <= floor:
+                    return False
+            if self._requests is not None:
+                self._requests.refill(now)
+                if self._requests.level < 1:
+                    return False
+                self._requests.level -= 1
+            return True
+
+    @contextmanager
+    def _queue(self, priority: str) -> Iterator[None]:
+        with self._lock:
+            self._queued[priority] += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._queued[priority] -= 1
+        wait = time.perf_counter() - start
+        observe(LLM_QUEUE_WAIT, wait, provider=self.provider, priority=priority)
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        """Waits (if `blocking`) until a call of the current priority is admitted."""
+        priority = current_llm_priority()
+        if not blocking:
+            return self._try_acquire(priority)
+        with self._queue(priority):
+            while not self._try_acquire(priority):
+                time.sleep(self.check_every_n_seconds)
+        return True
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        """Async `acquire`: waits without blocking the event loop."""
+        priority = current_llm_priority()
+        if not blocking:
+            return self._try_acquire(priority)
+        with self._queue(priority):
+            while not self._try_acquire(priority):
+                await asyncio.sleep(self.check_every_n_seconds)
+        return True
+
+    def charge(self, tokens: int) -> None:
+        """Takes the tokens a finished call used from the token budget."""
+        if self._tokens is None or tokens <= 0:
+            return
+        with self._lock:
+            self._tokens.refill(time.monotonic())
+            self._tokens.level -= tokens
+
+
+class TokenUsageCallback(BaseCallbackHandler):
+    """Charges each finished call's reported token usage to a rate limiter."""
+
+    # Charging is cheap, so skip the executor hop for async calls
+    run_inline = True
+
+    def __init__(self, limiter: PriorityRateLimiter):
+        self.limiter = limiter
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        self.limiter.charge(_total_tokens(response))
+
+
+def _total_tokens(response: LLMResult) -> int:
+    """Returns the tokens a call used, from usage metadata or the provider output."""
+    total = 0
+    for generations in response.generations:
+        for generation in generations:
+            if isinstance(generation, ChatGeneration):
+                usage = generation.message.usage_metadata
+                total += usage["total_tokens"] if usage else 0
+    if total:
+        return total
+    token_usage = (response.llm_output or {}).get("token_usage") or {}
+    return token_usage.get("total_tokens") or 0
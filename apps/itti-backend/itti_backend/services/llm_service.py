@@ -1,6 +1,8 @@
 """LLM Service for creating and managing language model clients."""
 
 import os
+from functools import lru_cache
+from typing import Optional
 
 from dotenv import load_dotenv
 from langchain_core.language_models.chat_models import BaseChatModel
@@ -8,31 +10,61 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_openai import ChatOpenAI
 from pydantic import SecretStr
 
+from .llm_cassette import RecordingChatModel, ReplayChatModel
+from .llm_router import build_llm_router
+from .llm_scheduler import PriorityRateLimiter
+
 # Load environment variables from .env file for local development
 load_dotenv()
 
 
-def get_llm_client() -> BaseChatModel:
-    """
-    Initializes and returns the appropriate LLM client based on environment variables.
+def get_llm_provider() -> str:
+    """Returns the configured LLM provider name, normalized to lowercase."""
+    return os.getenv("LLM_PROVIDER", "openai").lower()
 
-    Selects the provider based on the LLM_PROVIDER environment variable.
-    Defaults to 'gemini' if not set.
 
-    Supported providers:
-    - 'gemini': Uses Google's Gemini Pro model. Requires GEMINI_API_KEY.
-    - 'openai': Uses OpenAI's GPT-4 model. Requires OPENAI_API_KEY.
+def get_model_name(llm: BaseChatModel) -> str:
+    """Returns the model identifier of a chat model (its type for fakes)."""
+    return (
+        getattr(llm, "model_name", None) or getattr(llm, "model", None) or llm._llm_type
+    )
 
-    Raises:
-        ValueError: If the provider is unsupported or the required API key is missing.
 
-    Returns:
-        An instance of a LangChain chat model
-        (e.g., ChatGoogleGenerativeAI or ChatOpenAI).
+@lru_cache
+def get_provider_rate_limiter(provider: str) -> Optional[PriorityRateLimiter]:
     """
-    provider = os.getenv("LLM_PROVIDER", "openai").lower()
-    print(f"Using LLM provider: {provider}")
+    Returns the process-wide rate limiter shared by every client of a provider.
+
+    The budgets are read from `<PROVIDER>_REQUESTS_PER_SECOND` and
+    `<PROVIDER>_TOKENS_PER_MINUTE` (e.g. GEMINI_REQUESTS_PER_SECOND); a missing
+    or non-positive value leaves that budget unlimited, and with neither set
+    the provider is not rate limited. LLM_INTERACTIVE_RESERVE (default 0.2) is
+    the share of the token budget that evaluation calls leave to chat.
+    """
+    prefix = provider.upper()
+    rate = float(os.getenv(f"{prefix}_REQUESTS_PER_SECOND", "0") or 0)
+    tokens = float(os.getenv(f"{prefix}_TOKENS_PER_MINUTE", "0") or 0)
+    if rate <= 0 and tokens <= 0:
+        return None
+    return PriorityRateLimiter(
+        provider,
+        requests_per_second=rate,
+        tokens_per_minute=tokens,
+        reserve=float(os.getenv("LLM_INTERACTIVE_RESERVE", "0.2")),
+    )
+
+
+def _build_provider_client(
+    provider: str, temperature: Optional[float] = None
+) -> BaseChatModel:
+    """Builds the chat model of a real (networked) provider."""
     model_name = os.getenv(f"{provider.upper()}_MODEL")
+    # Only pass a temperature when the caller asks for one
+    extra = {} if temperature is None else {"temperature": temperature}
+    rate_limiter = get_provider_rate_limiter(provider)
+    if rate_limiter is not None:
+        extra["rate_limiter"] = rate_limiter
+        extra["callbacks"] = [rate_limiter.usage_callback]
 
     if provider == "gemini":
         api_key = os.getenv("GEMINI_API_KEY")
@@ -41,6 +73,7 @@ def get_llm_client() -> BaseChatModel:
         return ChatGoogleGenerativeAI(
             model=model_name or "gemini-2.0-flash",
             google_api_key=api_key,
+            **extra,
         )
 
     elif provider == "openai":
@@ -48,10 +81,68 @@ def get_llm_client() -> BaseChatModel:
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("OPENAI_API_KEY environment variable not set.")
-        return ChatOpenAI(model=model_name or "gpt-4-turbo", api_key=SecretStr(api_key))
+        return ChatOpenAI(
+            model=model_name or "gpt-4-turbo", api_key=SecretStr(api_key), **extra
+        )
 
     else:
         raise ValueError(
-            f"Unsupported LLM provider: {provider}. "
-            f"Supported providers are 'gemini' and 'openai'."
+            f"Unsupported LLM provider: {provider}. Supported providers are "
+            f"'gemini', 'openai', 'record', 'replay' and 'router'."
+        )
+
+
+def get_llm_client(temperature: Optional[float] = None) -> BaseChatModel:
+    """
+    Initializes and returns the appropriate LLM client based on environment variables.
+
+    Selects the provider based on the LLM_PROVIDER environment variable.
+    Defaults to 'openai' if not set.
+
+    Supported providers:
+    - 'gemini': Uses Google's Gemini Pro model. Requires GEMINI_API_KEY.
+    - 'openai': Uses OpenAI's GPT-4 model. Requires OPENAI_API_KEY.
+    - 'record': Wraps the LLM_RECORD_PROVIDER client (default 'gemini') and
+      appends every completion to the LLM_CASSETTE_PATH cassette.
+    - 'replay': Serves completions from the LLM_CASSETTE_PATH cassette, offline.
+      LLM_REPLAY_LATENCY is 'zero' (default) or 'recorded'.
+    - 'router': Routes every call across the LLM_ROUTER_PROVIDERS clients
+      (default 'gemini,openai', in order of preference), hedging slow calls
+      and skipping unhealthy providers (see services/llm_router.py).
+
+    Args:
+        temperature: Optional sampling temperature. When omitted, the
+            provider's default is used.
+
+    Raises:
+        ValueError: If the provider is unsupported or the required API key is missing.
+
+    Returns:
+        An instance of a LangChain chat model
+        (e.g., ChatGoogleGenerativeAI or ChatOpenAI).
+    """
+    provider = get_llm_provider()
+    print(f"Using LLM provider: {provider}")
+    cassette_path = os.getenv("LLM_CASSETTE_PATH", "llm_cassette.jsonl")
+
+    if provider == "record":
+        record_provider = os.getenv("LLM_RECORD_PROVIDER", "gemini").lower()
+        return RecordingChatModel(
+            client=_build_provider_client(record_provider, temperature),
+            cassette_path=cassette_path,
+        )
+
+    if provider == "replay":
+        latency_mode = os.getenv("LLM_REPLAY_LATENCY", "zero").lower()
+        return ReplayChatModel(
+            cassette_path=cassette_path,
+            use_recorded_latency=latency_mode == "recorded",
         )
+
+    if provider == "router":
+        providers = os.getenv("LLM_ROUTER_PROVIDERS", "gemini,openai").lower()
+        names = [name.strip() for name in providers.split(",") if name.strip()]
+        clients = [_build_provider_client(name, temperature) for name in names]
+        return build_llm_router(names, clients)
+
+    return _build_provider_client(provider, temperature)
@@ -0,0 +1,250 @@
+"""Provider-side caching of the system prompt that starts every PromptService call."""
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_openai import ChatOpenAI
+
+from ..core.singleflight import SingleFlight
+from .llm_cassette import RecordingChatModel
+from .llm_router import RouterChatModel
+
+logger = logging.getLogger(__name__)
+
+# Seconds before retrying a failed Gemini cache creation; doubles up to the TTL
+GEMINI_RETRY_SECONDS = 60
+
+
+@dataclass
+class _PrefixEntry:
+    source: BaseChatModel  # The shared client the entry was prepared from
+    client: BaseChatModel
+    prompt_cached: bool  # The provider holds the system prompt
+    refresh_at: float = float("inf")  # When to prepare it again
+    expires_at: float = float("inf")  # When the provider drops the prompt
+    failures: int = 0  # Consecutive failed Gemini cache creations
+
+
+class PromptPrefixCache:
+    """
+    Prepares chat clients so the provider can reuse the system prompt's tokens.
+
+    Every request starts with the same system prompt and only the query after
+    it changes. How that prefix is reused depends on the provider:
+
+    - Gemini: the prompt is stored once as cached content and requests send
+      only the user turn. An entry is recreated once less than a quarter of its
+      TTL remains, so services built just before (requests, evaluation jobs)
+      keep a live one. If creating it fails (e.g. the prompt is below the
+      model's minimum cacheable size, or the provider is briefly down), the
+      prompt is sent inline as before, and creation is retried after
+      GEMINI_RETRY_SECONDS, doubling on each failure up to the TTL.
+    - OpenAI: prefixes of 1024+ tokens are cached automatically; requests are
+      tagged with a `prompt_cache_key` so the ones sharing a prompt are routed
+      to the same cache.
+
+    The router and the recorder are prepared through the clients they wrap,
+    with the prompt kept in the messages: every router provider gets the same
+    messages, and a cassette must record the prompt to be replayed. So OpenAI
+    clients behind them are tagged, but Gemini ones send the prompt inline.
+    Other clients (fake, replay) are used unchanged, with a warning. Prepared
+    clients are kept per PromptService cache namespace. The provider call runs outside
+    the cache's lock and once per namespace: concurrent callers wait for it
+    only when there is no usable entry yet, and keep using the current one
+    while it is being refreshed.
+    """
+
+    def __init__(self, gemini_ttl_seconds: int = 3600):
+        """
+        Initializes the cache.
+
+        Args:
+            gemini_ttl_seconds: Lifetime of Gemini cached content. 0 disables it.
+        """
+        self.gemini_ttl_seconds = gemini_ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: dict[str, _PrefixEntry] = {}
+        self._refreshing: set[str] = set()
+        self._builds = SingleFlight("prompt_prefix_cache", enabled=True)
+
+    def prepare(
+        self, llm_client: BaseChatModel, system_prompt: str, namespace: str
+    ) -> tuple[BaseChatModel, bool]:
+        """
+        Returns the client to send a system prompt's requests with.
+
+        May call the provider (to create Gemini cached content), so it should
+        not run on the event loop.
+
+        Args:
+            llm_client: The shared chat model.
+            system_prompt: The system prompt that starts every request.
+            namespace: The PromptService cache namespace (prompt hash and model).
+
+        Returns:
+            The client, and whether the provider already holds the system prompt
+            (then it must be left out of the messages).
+        """
+        with self._lock:
+            entry = self._entries.get(namespace)
+            if entry is not None and entry.source is not llm_client:
+                entry = None
+            now = time.time()
+            if entry is not None and (
+                now < entry.refresh_at
+                # Another caller is refreshing it; this one is still live
+                or (namespace in self._refreshing and now < entry.expires_at)
+            ):
+                return entry.client, entry.prompt_cached
+        key = (namespace, id(llm_client))
+        entry = self._builds.do(
+            key, self._refresh, llm_client, system_prompt, namespace, entry
+        )
+        return entry.client, entry.prompt_cached
+
+    def _refresh(
+        self,
+        llm_client: BaseChatModel,
+        system_prompt: str,
+        namespace: str,
+        previous: Optional[_PrefixEntry],
+    ) -> _PrefixEntry:
+        """Builds and stores a namespace's entry, without holding the lock."""
+        with self._lock:
+            self._refreshing.add(namespace)
+        try:
+            entry = self._build_entry(llm_client, system_prompt, namespace, previous)
+            with self._lock:
+                self._entries[namespace] = entry
+            return entry
+        finally:
+            with self._lock:
+                self._refreshing.discard(namespace)
+
+    def _build_entry(
+        self,
+        llm_client: BaseChatModel,
+        system_prompt: str,
+        namespace: str,
+        previous: Optional[_PrefixEntry],
+        inline: bool = False,
+    ) -> _PrefixEntry:
+        """Prepares a client; with `inline`, the prompt stays in the messages."""
+        if isinstance(llm_client, RouterChatModel):
+            clients = [
+                self._build_entry(client, system_prompt, namespace, None, True).client
+                for client in llm_client.clients
+            ]
+            return _PrefixEntry(
+                source=llm_client,
+                client=llm_client.model_copy(update={"clients": clients}),
+                prompt_cached=False,
+            )
+        if isinstance(llm_client, RecordingChatModel):
+            inner = self._build_entry(
+                llm_client.client, system_prompt, namespace, None, True
+            )
+            return _PrefixEntry(
+                source=llm_client,
+                client=llm_client.model_copy(update={"client": inner.client}),
+                prompt_cached=False,
+            )
+        gemini = isinstance(llm_client, ChatGoogleGenerativeAI)
+        if gemini and self.gemini_ttl_seconds and not inline:
+            try:
+                name = self._create_gemini_cache(llm_client, system_prompt, namespace)
+            except Exception as e:
+                failures = previous.failures + 1 if previous else 1
+                retry = min(
+                    GEMINI_RETRY_SECONDS * 2 ** (failures - 1), self.gemini_ttl_seconds
+                )
+                logger.warning(
+                    f"Gemini context cache unavailable, sending the system prompt "
+                    f"inline and retrying in {retry:.0f}s: {e}"
+                )
+                return _PrefixEntry(
+                    source=llm_client,
+                    client=llm_client,
+                    prompt_cached=False,
+                    refresh_at=time.time() + retry,
+                    failures=failures,
+                )
+            logger.info(f"Created Gemini context cache {name} for {namespace}")
+            now = time.time()
+            return _PrefixEntry(
+                source=llm_client,
+                client=llm_client.model_copy(update={"cached_content": name}),
+                prompt_cached=True,
+                refresh_at=now + self.gemini_ttl_seconds * 3 / 4,
+                expires_at=now + self.gemini_ttl_seconds,
+            )
+        if isinstance(llm_client, ChatOpenAI):
+            model_kwargs = {**llm_client.model_kwargs, "prompt_cache_key": namespace}
+            return _PrefixEntry(
+                source=llm_client,
+                client=llm_client.model_copy(update={"model_kwargs": model_kwargs}),
+                prompt_cached=False,
+            )
+        if gemini and self.gemini_ttl_seconds:
+            logger.warning(
+                f"Gemini context caching is not used behind a router or recorder; "
+                f"sending the system prompt inline for {namespace}"
+            )
+        elif not gemini:
+            logger.warning(
+                f"No prompt prefix caching for {type(llm_client).__name__}; "
+                f"sending the system prompt inline for {namespace}"
+            )
+        return _PrefixEntry(source=llm_client, client=llm_client, prompt_cached=False)
+
+    def _create_gemini_cache(
+        self, llm_client: ChatGoogleGenerativeAI, system_prompt: str, namespace: str
+    ) -> str:
+        """Stores the system prompt as Gemini cached content; returns its name."""
+        display_name = f"system-prompt:{namespace}"
+        if hasattr(llm_client.client, "caches"):
+            # langchain-google-genai 3+: a google-genai SDK client
+            from google.genai import types
+
+            return llm_client.client.caches.create(
+                model=llm_client.model,
+                config=types.CreateCachedContentConfig(
+                    display_name=display_name,
+                    system_instruction=system_prompt,
+                    ttl=f"{self.gemini_ttl_seconds}s",
+                ),
+            ).name
+
+        # langchain-google-genai 2.x: the Generative Language v1beta client
+        from google.ai import generativelanguage_v1beta as glm
+
+        api_key = llm_client.google_api_key
+        model = llm_client.model
+        cache_client = glm.CacheServiceClient(
+            credentials=llm_client.credentials,
+            client_options={"api_key": api_key.get_secret_value()} if api_key else None,
+        )
+        return cache_client.create_cached_content(
+            cached_content=glm.CachedContent(
+                model=model if model.startswith("models/") else f"models/{model}",
+                display_name=display_name,
+                system_instruction=glm.Content(parts=[glm.Part(text=system_prompt)]),
+                ttl=timedelta(seconds=self.gemini_ttl_seconds),
+            )
+        ).name
+
+
+def build_prompt_prefix_cache() -> Optional[PromptPrefixCache]:
+    """Builds the prompt prefix cache from environment variables."""
+    if os.getenv("PROMPT_PREFIX_CACHE_ENABLED", "true").lower() != "true":
+        return None
+    return PromptPrefixCache(
+        gemini_ttl_seconds=int(os.getenv("GEMINI_CONTEXT_CACHE_TTL_SECONDS", 3600))
+    )
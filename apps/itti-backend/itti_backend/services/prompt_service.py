@@ -1,16 +1,50 @@
 """Prompt engineering service using LangChain."""
 
+import asyncio
+import contextvars
 import json
 import logging
+import os
 import re
+import time
+from collections.abc import AsyncIterator, Coroutine
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional
+from typing import Any, Optional, TypeVar
 
 from dotenv import load_dotenv
 from langchain_core.language_models.chat_models import BaseChatModel
-from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
 
-from ..models.fintech_models import BotResponse, CustomerQuery, ExtractedData
+from ..core.metrics import (
+    CLASSIFIER_DISAGREEMENTS,
+    FALLBACK_RESPONSES,
+    LLM_LATENCY,
+    LLM_TOKENS,
+    PARSE_FAILURES,
+    PARSE_LATENCY,
+    QUERY_ROUTES,
+    STREAM_FIRST_FIELD_LATENCY,
+    STREAM_FIRST_TOKEN_LATENCY,
+    count,
+    observe,
+    track,
+)
+from ..core.singleflight import SingleFlight
+from ..models.fintech_models import (
+    BotResponse,
+    CustomerQuery,
+    ExtractedData,
+    QueryRoute,
+    StructuredBotOutput,
+)
+from .llm_scheduler import current_llm_priority
+from .llm_service import get_model_name
+from .prompt_prefix_cache import PromptPrefixCache
+from .query_classifier import KNNQueryClassifier
+from .response_cache import ResponseCache, build_namespace, normalize_query
+from .stream_parser import StreamingResponseParser
 
 # Load environment variables
 load_dotenv()
@@ -19,32 +53,180 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+SYSTEM_PROMPT_PATH = Path(__file__).parent.parent / "prompts" / "system_prompt.xml"
+
+# "text": parse the completion's reasoning and ```json block (the system prompt's
+# format). "structured": the provider's native JSON-schema / tool-calling output.
+OUTPUT_MODES = ("text", "structured")
+# Structured mode: attempts before falling back to an error response
+STRUCTURED_OUTPUT_ATTEMPTS = 2
+STRUCTURED_OUTPUT_INSTRUCTION = """
+
+<structured_output>
+Entrega tu respuesta directamente en la salida estructurada, sin el bloque de
+texto descrito en output_format: escribe tu análisis en el campo "reasoning" y
+completa los demás campos según sus definiciones.
+</structured_output>"""
+STRUCTURED_RETRY_INSTRUCTION = (
+    "Tu respuesta anterior no cumplió el esquema requerido ({error}). "
+    "Vuelve a responder respetando exactamente el esquema."
+)
+
+
+# Concurrent identical queries (same prompt and model) share one LLM call
+_GENERATIONS = SingleFlight("prompt_service")
+
+T = TypeVar("T")
+
+# BotResponse fields filled from the provider's usage metadata
+TOKEN_FIELDS = ("input_tokens", "cached_input_tokens", "output_tokens")
+
+
+@lru_cache
+def load_system_prompt(output_mode: str = "text") -> str:
+    """Reads the system prompt once per process, as used by an output mode."""
+    try:
+        with open(SYSTEM_PROMPT_PATH, encoding="utf-8") as f:
+            system_prompt = f.read()
+    except FileNotFoundError:
+        logger.error(f"System prompt file not found at {SYSTEM_PROMPT_PATH}")
+        raise
+    except Exception as e:
+        logger.error(f"Error loading system prompt: {e}")
+        raise
+    if output_mode == "structured":
+        system_prompt += STRUCTURED_OUTPUT_INSTRUCTION
+    return system_prompt
+
+
+@lru_cache
+def _system_prefix(system_prompt: str, model_name: str) -> tuple[SystemMessage, str]:
+    """
+    Returns the shared SystemMessage and cache namespace of a prompt and model.
+
+    Every request starts with the very same message, so the prefix the provider
+    sees is byte-identical from call to call and its prompt caching can apply.
+    """
+    return SystemMessage(content=system_prompt), build_namespace(
+        system_prompt, model_name
+    )
+
+
+def _add_usage(
+    totals: Optional[dict[str, int]], message: Any
+) -> Optional[dict[str, int]]:
+    """
+    Adds a message's token usage (if the provider reported it) to `totals`.
+
+    Cached input tokens (`input_token_details.cache_read`) are the part of the
+    input the provider served from its prompt cache.
+    """
+    usage = getattr(message, "usage_metadata", None)
+    if not usage:
+        return totals
+    totals = totals or dict.fromkeys(TOKEN_FIELDS, 0)
+    details = usage.get("input_token_details") or {}
+    totals["input_tokens"] += usage.get("input_tokens", 0)
+    totals["cached_input_tokens"] += details.get("cache_read", 0) or 0
+    totals["output_tokens"] += usage.get("output_tokens", 0)
+    return totals
+
+
+def _run_blocking(coro: Coroutine[Any, Any, T]) -> T:
+    """Runs a coroutine to completion from sync code, on its own event loop."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    # A loop already runs in this thread: block it while a worker thread runs
+    # the coroutine, keeping the caller's context (e.g. its LLM priority)
+    with ThreadPoolExecutor(1) as pool:
+        return pool.submit(contextvars.copy_context().run, asyncio.run, coro).result()
+
 
 class PromptService:
     """Service for prompt engineering with real LLM integration."""
 
-    def __init__(self, llm_client: BaseChatModel):
-        """Initialize the prompt service with a LangChain LLM client."""
+    def __init__(
+        self,
+        llm_client: BaseChatModel,
+        response_cache: Optional[ResponseCache] = None,
+        output_mode: Optional[str] = None,
+        prefix_cache: Optional[PromptPrefixCache] = None,
+        query_classifier: Optional[KNNQueryClassifier] = None,
+    ):
+        """
+        Initialize the prompt service with a LangChain LLM client.
+
+        Args:
+            llm_client: The chat model used to generate responses.
+            response_cache: An optional shared cache consulted before the LLM.
+            output_mode: "text" or "structured" (see OUTPUT_MODES). Defaults to
+                the PROMPT_OUTPUT_MODE environment variable, or "text".
+            prefix_cache: An optional shared PromptPrefixCache, so the provider
+                can reuse the system prompt across calls.
+            query_classifier: An optional local Intent/Product classifier that
+                checks the LLM's labels and lets `aroute_query` skip the LLM.
+        """
         try:
             self.llm_client = llm_client
-            self.system_prompt = self._load_system_prompt()
+            self.output_mode = output_mode or os.getenv("PROMPT_OUTPUT_MODE", "text")
+            if self.output_mode not in OUTPUT_MODES:
+                raise ValueError(f"Unknown output mode '{self.output_mode}'")
+            # Structured mode's prompt also gives it its own cache namespace
+            self.system_prompt = load_system_prompt(self.output_mode)
+            self.system_message, self.cache_namespace = _system_prefix(
+                self.system_prompt, self._get_model_name()
+            )
+            # Whether the provider holds the system prompt (Gemini cached content)
+            self.prompt_cached = False
+            if prefix_cache is not None:
+                self.llm_client, self.prompt_cached = prefix_cache.prepare(
+                    llm_client, self.system_prompt, self.cache_namespace
+                )
+            self.structured_llm = None
+            if self.output_mode == "structured":
+                self.structured_llm = self._build_structured_llm()
+            self.response_cache = response_cache
+            self.query_classifier = query_classifier
             logger.info("PromptService initialized successfully.")
         except (ValueError, FileNotFoundError) as e:
             logger.error(f"Failed to initialize PromptService: {e}")
             raise
 
-    def _load_system_prompt(self) -> str:
-        """Loads the system prompt from the XML file."""
+    def _build_structured_llm(self):
+        """Binds the client to the StructuredBotOutput schema."""
         try:
-            prompt_path = Path(__file__).parent.parent / "prompts" / "system_prompt.xml"
-            with open(prompt_path, encoding="utf-8") as f:
-                return f.read()
-        except FileNotFoundError:
-            logger.error(f"System prompt file not found at {prompt_path}")
-            raise
-        except Exception as e:
-            logger.error(f"Error loading system prompt: {e}")
-            raise
+            return self.llm_client.with_structured_output(
+                StructuredBotOutput, include_raw=True
+            )
+        except NotImplementedError as e:
+            raise ValueError(
+                f"{type(self.llm_client).__name__} does not support structured output"
+            ) from e
+
+    def _get_model_name(self) -> str:
+        """Returns the model identifier of the LLM client."""
+        return get_model_name(self.llm_client)
+
+    def _get_cached(self, query: CustomerQuery) -> Optional[BotResponse]:
+        if self.response_cache is None:
+            return None
+        return self.response_cache.get(query.text, self.cache_namespace)
+
+    def _store_cached(
+        self, query: CustomerQuery, response: BotResponse, latency: float
+    ) -> None:
+        # Only successful, fully parsed responses are worth serving again
+        if self.response_cache is None or response.detected_intent is None:
+            return
+        self.response_cache.put(query.text, self.cache_namespace, response, latency)
+
+    async def _run_cache_op(self, func, *args):
+        """Runs a cache operation, off the event loop if it needs embeddings."""
+        if self.response_cache is not None and self.response_cache.semantic_enabled:
+            return await asyncio.to_thread(func, *args)
+        return func(*args)
 
     def _extract_json_from_response(self, text: str) -> Optional[dict]:
         """Extracts the first valid JSON block from the LLM's text response."""
@@ -76,78 +258,345 @@ class PromptService:
         logger.warning("Reasoning section not found in the response.")
         return None
 
-    def generate_response(self, query: CustomerQuery) -> BotResponse:
-        """Generate a response to a customer query using the LLM."""
-        messages = [
-            SystemMessage(content=self.system_prompt),
-            HumanMessage(content=query.text),
-        ]
-
-        try:
-            logger.info(f"Sending query to LLM: {query.text}")
-            response = self.llm_client.invoke(messages)
-            content = response.content
+    def _build_messages(self, query: CustomerQuery) -> list[BaseMessage]:
+        """Builds the message list sent to the LLM for a customer query."""
+        human_message = HumanMessage(content=query.text)
+        if self.prompt_cached:
+            return [human_message]
+        return [self.system_message, human_message]
 
-            if not isinstance(content, str):
-                err_msg = f"Expected string response from LLM, but got {type(content)}"
-                raise TypeError(err_msg)
+    def _build_bot_response(self, query: CustomerQuery, content: Any) -> BotResponse:
+        """Parses the raw LLM completion into a validated BotResponse."""
+        if not isinstance(content, str):
+            err_msg = f"Expected string response from LLM, but got {type(content)}"
+            raise TypeError(err_msg)
 
-            logger.info(f"Received response from LLM: {content}")
+        logger.info(f"Received response from LLM: {content}")
 
-            # Extract structured data and reasoning
+        # Extract structured data and reasoning
+        with track(PARSE_LATENCY, stage="json_extraction"):
             json_data = self._extract_json_from_response(content)
             reasoning = self._extract_reasoning(content)
-            if not json_data:
-                # Fallback if JSON extraction fails
-                return BotResponse(
-                    original_query=query.text,
-                    response_text="No pude procesar la estructura de la respuesta.",
-                    reasoning="Fallo en la extracción de JSON.",
-                    detected_intent=None,
-                    detected_product=None,
-                    confidence=0.0,
-                )
-
-            # Use Pydantic to parse and validate the extracted data
-            try:
-                extracted_data = ExtractedData.parse_obj(json_data)
-            except Exception as e:
-                logger.error(f"Pydantic validation failed: {e}")
-                return BotResponse(
-                    original_query=query.text,
-                    response_text=(
-                        "La respuesta del modelo no tiene el formato esperado."
-                    ),
-                    reasoning=f"Error de validación de Pydantic: {e}",
-                    detected_intent=None,
-                    detected_product=None,
-                    confidence=0.0,
-                )
-
-            # The user-facing response is now composed of the response and next steps
-            final_response_text = (
-                f"{extracted_data.response}\n\n"
-                f"**Próximos Pasos:**\n{extracted_data.next_steps}"
-            )
-
+        if not json_data:
+            # Fallback if JSON extraction fails
+            count(PARSE_FAILURES, stage="json_extraction")
             return BotResponse(
                 original_query=query.text,
-                response_text=final_response_text,
-                detected_intent=extracted_data.intent,
-                detected_product=extracted_data.product,
-                confidence=extracted_data.confidence,
-                reasoning=reasoning or "No reasoning provided.",
+                response_text="No pude procesar la estructura de la respuesta.",
+                reasoning="Fallo en la extracción de JSON.",
+                detected_intent=None,
+                detected_product=None,
+                confidence=0.0,
+                parse_failed=True,
             )
 
+        # Use Pydantic to parse and validate the extracted data
+        try:
+            with track(PARSE_LATENCY, stage="validation"):
+                extracted_data = ExtractedData.parse_obj(json_data)
         except Exception as e:
-            logger.error(f"Error generating response from LLM: {e}", exc_info=True)
+            logger.error(f"Pydantic validation failed: {e}")
+            count(PARSE_FAILURES, stage="validation")
             return BotResponse(
                 original_query=query.text,
-                response_text=(
-                    "Lo siento, ocurrió un error inesperado al procesar tu solicitud."
-                ),
-                reasoning=f"Excepción: {e}",
+                response_text="La respuesta del modelo no tiene el formato esperado.",
+                reasoning=f"Error de validación de Pydantic: {e}",
                 detected_intent=None,
                 detected_product=None,
                 confidence=0.0,
+                parse_failed=True,
+            )
+
+        return self._bot_response_from_data(query, extracted_data, reasoning)
+
+    def _bot_response_from_data(
+        self, query: CustomerQuery, data: ExtractedData, reasoning: Optional[str]
+    ) -> BotResponse:
+        """Builds the BotResponse for validated structured data."""
+        # The user-facing response is now composed of the response and next steps
+        final_response_text = (
+            f"{data.response}\n\n**Próximos Pasos:**\n{data.next_steps}"
+        )
+
+        return BotResponse(
+            original_query=query.text,
+            response_text=final_response_text,
+            detected_intent=data.intent,
+            detected_product=data.product,
+            confidence=data.confidence,
+            reasoning=reasoning or "No reasoning provided.",
+        )
+
+    def _parse_structured(
+        self, query: CustomerQuery, result: dict
+    ) -> Optional[BotResponse]:
+        """Returns the BotResponse of a structured output, or None if invalid."""
+        parsed = result.get("parsed")
+        if parsed is None:
+            error = result.get("parsing_error") or "no structured output"
+            logger.warning(f"Structured output failed validation: {error}")
+            count(PARSE_FAILURES, stage="structured_output")
+            return None
+        return self._bot_response_from_data(query, parsed, parsed.reasoning)
+
+    def _structured_retry_messages(
+        self, messages: list[BaseMessage], result: dict
+    ) -> list[BaseMessage]:
+        """Appends the validation error so the retry can correct it."""
+        error = result.get("parsing_error") or "no se recibió la salida estructurada"
+        retry = HumanMessage(content=STRUCTURED_RETRY_INSTRUCTION.format(error=error))
+        return [*messages, retry]
+
+    def _build_structured_failure(self, query: CustomerQuery) -> BotResponse:
+        """Builds the BotResponse returned when every structured attempt failed."""
+        return BotResponse(
+            original_query=query.text,
+            response_text="No pude procesar la estructura de la respuesta.",
+            reasoning="La salida estructurada no fue válida tras reintentar.",
+            detected_intent=None,
+            detected_product=None,
+            confidence=0.0,
+            parse_failed=True,
+        )
+
+    async def _agenerate_structured(
+        self, query: CustomerQuery
+    ) -> tuple[BotResponse, Optional[dict[str, int]]]:
+        """Structured mode: retries once when the output fails validation."""
+        messages = self._build_messages(query)
+        usage = None
+        for _ in range(STRUCTURED_OUTPUT_ATTEMPTS):
+            with track(LLM_LATENCY, caller="prompt_service"):
+                result = await self.structured_llm.ainvoke(messages)
+            usage = _add_usage(usage, result["raw"])
+            bot_response = self._parse_structured(query, result)
+            if bot_response is not None:
+                return bot_response, usage
+            messages = self._structured_retry_messages(messages, result)
+        return self._build_structured_failure(query), usage
+
+    async def _agenerate_text(
+        self, query: CustomerQuery
+    ) -> tuple[BotResponse, Optional[dict[str, int]]]:
+        """Text mode: parses the reasoning and JSON block of the completion."""
+        with track(LLM_LATENCY, caller="prompt_service"):
+            response = await self.llm_client.ainvoke(self._build_messages(query))
+        bot_response = self._build_bot_response(query, response.content)
+        return bot_response, _add_usage(None, response)
+
+    def _record_generation(
+        self,
+        bot_response: BotResponse,
+        usage: Optional[dict[str, int]],
+        latency: float,
+    ) -> None:
+        """Sets a fresh response's token counts and latency, and counts tokens."""
+        bot_response.latency_seconds = latency
+        if usage is None:
+            return
+        for field, tokens in usage.items():
+            setattr(bot_response, field, tokens)
+            count(
+                LLM_TOKENS,
+                tokens,
+                caller="prompt_service",
+                kind=field.removesuffix("_tokens"),
+            )
+
+    def _validate_labels(self, query: CustomerQuery, response: BotResponse) -> None:
+        """Flags a fresh answer whose labels differ from the local classifier's."""
+        if self.query_classifier is None or response.detected_intent is None:
+            return
+        classification = self.query_classifier.classify(query.text)
+        response.local_classification = classification
+        differing = [
+            field
+            for field, local, generated in (
+                ("intent", classification.intent, response.detected_intent),
+                ("product", classification.product, response.detected_product),
+            )
+            if local != generated
+        ]
+        for field in differing:
+            count(CLASSIFIER_DISAGREEMENTS, field=field)
+        if differing:
+            response.classification_disagreement = True
+            logger.warning(
+                f"Local classifier disagrees on {', '.join(differing)} for "
+                f"'{query.text[:40]}': {classification.intent.value}/"
+                f"{classification.product.value} "
+                f"({classification.confidence:.2f})"
+            )
+
+    async def _avalidate_labels(
+        self, query: CustomerQuery, response: BotResponse
+    ) -> None:
+        """`_validate_labels` off the event loop (it runs the embedding model)."""
+        if self.query_classifier is not None:
+            await asyncio.to_thread(self._validate_labels, query, response)
+
+    def _build_error_response(
+        self, query: CustomerQuery, error: Exception
+    ) -> BotResponse:
+        """Builds the fallback BotResponse returned when the LLM call fails."""
+        logger.error(f"Error generating response from LLM: {error}", exc_info=True)
+        count(FALLBACK_RESPONSES, component="prompt_service")
+        return BotResponse(
+            original_query=query.text,
+            response_text=(
+                "Lo siento, ocurrió un error inesperado al procesar tu solicitud."
+            ),
+            reasoning=f"Excepción: {error}",
+            detected_intent=None,
+            detected_product=None,
+            confidence=0.0,
+        )
+
+    async def agenerate_response(self, query: CustomerQuery) -> BotResponse:
+        """
+        Generate a response to a customer query without blocking the event loop.
+
+        Uses the client's native `ainvoke`, so many queries can be in flight on a
+        single worker while the provider is responding. Identical queries in
+        flight at the same time (before the first answer reaches the cache)
+        share one LLM call, unless their calls have different priorities.
+        """
+        cached = await self._run_cache_op(self._get_cached, query)
+        if cached is not None:
+            return cached
+        # A chat query must not wait behind an evaluation call's admission
+        priority = current_llm_priority()
+        key = (self.cache_namespace, priority, normalize_query(query.text))
+        return await _GENERATIONS.ado(key, self._agenerate_uncached, query)
+
+    async def _agenerate_uncached(self, query: CustomerQuery) -> BotResponse:
+        """Calls the LLM in the configured output mode and caches the answer."""
+        try:
+            logger.info(f"Sending query to LLM: {query.text}")
+            start = time.perf_counter()
+            if self.structured_llm is not None:
+                bot_response, usage = await self._agenerate_structured(query)
+            else:
+                bot_response, usage = await self._agenerate_text(query)
+        except Exception as e:
+            return self._build_error_response(query, e)
+
+        latency = time.perf_counter() - start
+        self._record_generation(bot_response, usage, latency)
+        await self._avalidate_labels(query, bot_response)
+        await self._run_cache_op(self._store_cached, query, bot_response, latency)
+        return bot_response
+
+    async def aroute_query(self, query: CustomerQuery) -> QueryRoute:
+        """
+        Returns a query's intent and product, calling the LLM only when needed.
+
+        When the local classifier is confident about both labels, they are
+        returned without a generation. Otherwise the answer is generated (and
+        cached like any /chat answer) and its labels are returned.
+        """
+        if self.query_classifier is not None:
+            classification = await asyncio.to_thread(
+                self.query_classifier.classify, query.text
             )
+            if self.query_classifier.is_confident(classification):
+                count(QUERY_ROUTES, source="local")
+                return QueryRoute(
+                    original_query=query.text,
+                    intent=classification.intent,
+                    product=classification.product,
+                    confidence=classification.confidence,
+                    source="local",
+                )
+        bot_response = await self.agenerate_response(query)
+        count(QUERY_ROUTES, source="llm")
+        return QueryRoute(
+            original_query=query.text,
+            intent=bot_response.detected_intent,
+            product=bot_response.detected_product,
+            confidence=bot_response.confidence,
+            source="llm",
+        )
+
+    def generate_response(self, query: CustomerQuery) -> BotResponse:
+        """
+        Generate a response to a customer query (blocking).
+
+        A thin wrapper over `agenerate_response`, for sync callers. Called from
+        a coroutine, it blocks that coroutine's event loop like any sync call.
+        """
+        return _run_blocking(self.agenerate_response(query))
+
+    async def astream_response(
+        self, query: CustomerQuery
+    ) -> AsyncIterator[tuple[str, dict]]:
+        """
+        Streams a response to a customer query as `(event_name, payload)` tuples.
+
+        Emits `reasoning` and `field` events (see StreamingResponseParser) while
+        the completion streams, then a single `final` event carrying the
+        validated BotResponse and the stream's timing metrics: time to first
+        token and time to the first answer field, in seconds, which are also
+        recorded as Prometheus histograms. In structured mode the answer
+        arrives in one piece, so only the `final` event is sent.
+        """
+        start = time.perf_counter()
+        time_to_first_token = None
+        time_to_first_field = None
+
+        bot_response = await self._run_cache_op(self._get_cached, query)
+        if bot_response is None and self.structured_llm is not None:
+            bot_response = await self._agenerate_uncached(query)
+        if bot_response is None:
+            parser = StreamingResponseParser()
+            usage = None
+            try:
+                logger.info(f"Streaming query to LLM: {query.text}")
+                async for chunk in self.llm_client.astream(self._build_messages(query)):
+                    usage = _add_usage(usage, chunk)
+                    if not isinstance(chunk.content, str) or not chunk.content:
+                        continue
+                    if time_to_first_token is None:
+                        time_to_first_token = time.perf_counter() - start
+                        observe(
+                            STREAM_FIRST_TOKEN_LATENCY,
+                            time_to_first_token,
+                            caller="prompt_service",
+                        )
+                    for event in parser.feed(chunk.content):
+                        if event[0] == "field" and time_to_first_field is None:
+                            time_to_first_field = time.perf_counter() - start
+                            observe(
+                                STREAM_FIRST_FIELD_LATENCY,
+                                time_to_first_field,
+                                caller="prompt_service",
+                            )
+                        yield event
+                observe(
+                    LLM_LATENCY, time.perf_counter() - start, caller="prompt_service"
+                )
+                bot_response = self._build_bot_response(query, parser.text)
+            except Exception as e:
+                bot_response = self._build_error_response(query, e)
+            else:
+                self._record_generation(
+                    bot_response, usage, time.perf_counter() - start
+                )
+                await self._avalidate_labels(query, bot_response)
+                await self._run_cache_op(
+                    self._store_cached,
+                    query,
+                    bot_response,
+                    bot_response.latency_seconds,
+                )
+
+        metrics = {
+            "time_to_first_token": time_to_first_token,
+            "time_to_first_answer_field": time_to_first_field,
+            "total_time": time.perf_counter() - start,
+        }
+        logger.info(f"Stream metrics for '{query.text[:40]}': {metrics}")
+        yield (
+            "final",
+            {"response": bot_response.model_dump(mode="json"), "metrics": metrics},
+        )
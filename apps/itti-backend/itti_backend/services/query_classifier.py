@@ -0,0 +1,261 @@
+"""
+Local Intent/Product classifier: k nearest labelled queries in embedding space.
+
+Trained from the evaluation dataset plus any labelled production logs, it
+predicts a query's Intent and Product without calling the LLM. Encoding one
+short query with MiniLM takes a few milliseconds on CPU, and the vote over the
+labelled queries a few microseconds. PromptService uses it to route queries
+(`/chat/route`) and to flag LLM answers whose labels it disagrees with.
+"""
+
+import hashlib
+import logging
+import os
+from typing import Any, Optional
+
+import numpy as np
+import pandas as pd
+
+from ..core.metrics import QUERY_CLASSIFIER_LATENCY, track
+from ..models.fintech_models import Intent, Product, QueryClassification
+
+logger = logging.getLogger(__name__)
+
+DATASET_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "data", "evaluation_dataset.csv"
+)
+# Labelled files use the evaluation dataset's columns
+LABEL_COLUMNS = ["query", "expected_intent", "expected_product"]
+INTENTS = list(Intent)
+PRODUCTS = list(Product)
+# Candidate softmax temperatures and smoothing priors for calibration
+_TEMPERATURES = (0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0)
+_PRIORS = (0.01, 0.1, 0.3, 1.0, 3.0)
+# Labelled queries used to calibrate (leave-one-out needs all their pairs)
+_CALIBRATION_ROWS = 2000
+# Cosine similarity above which a labelled query is the query itself
+_SAME_QUERY = 0.9999
+
+
+def load_labelled_queries(paths: Optional[list[str]] = None) -> pd.DataFrame:
+    """
+    Loads the evaluation dataset plus labelled query files.
+
+    Args:
+        paths: CSV or JSON Lines files with the LABEL_COLUMNS, e.g. production
+            logs labelled after review. Rows whose labels are not a valid
+            Intent and Product are skipped.
+
+    Returns:
+        A frame with the LABEL_COLUMNS.
+    """
+    frames = [pd.read_csv(DATASET_PATH)]
+    for path in paths or []:
+        if path.endswith((".jsonl", ".json")):
+            frames.append(pd.read_json(path, lines=path.endswith(".jsonl")))
+        else:
+            frames.append(pd.read_csv(path))
+    frame = pd.concat([f[LABEL_COLUMNS] for f in frames], ignore_index=True)
+    valid = frame["expected_intent"].isin([i.value for i in INTENTS]) & frame[
+        "expected_product"
+    ].isin([p.value for p in PRODUCTS])
+    if not valid.all():
+        logger.warning(f"Skipped {int((~valid).sum())} rows with unknown labels")
+    return frame[valid & frame["query"].notna()].reset_index(drop=True)
+
+
+class KNNQueryClassifier:
+    """
+    Predicts Intent and Product from the `k` most similar labelled queries.
+
+    Each neighbour votes for its labels with a softmax weight of its cosine
+    similarity, and a small prior is spread over every class. The temperature
+    and the prior of each task are picked on the labelled queries by
+    leave-one-out log-likelihood, so a confidence of 0.9 is right about 90% of
+    the time on data like the training set.
+    """
+
+    def __init__(
+        self,
+        embedding_model: Any,
+        labelled: pd.DataFrame,
+        k: int = 5,
+        min_confidence: float = 0.9,
+    ):
+        """
+        Embeds and calibrates the labelled queries.
+
+        Args:
+            embedding_model: A SentenceTransformer-like model with `encode`.
+            labelled: Labelled queries (see `load_labelled_queries`).
+            k: Neighbours that vote for each prediction.
+            min_confidence: Confidence at which `is_confident` trusts a
+                prediction without the LLM.
+        """
+        if labelled.empty:
+            raise ValueError("The query classifier needs labelled queries")
+        self.embedding_model = embedding_model
+        self.k = min(k, len(labelled))
+        self.min_confidence = min_confidence
+        self._embeddings = self._embed(labelled["query"].tolist())
+        self._intents = np.array(
+            [INTENTS.index(Intent(v)) for v in labelled["expected_intent"]]
+        )
+        self._products = np.array(
+            [PRODUCTS.index(Product(v)) for v in labelled["expected_product"]]
+        )
+        self.intent_calibration = self._calibrate(self._intents, len(INTENTS))
+        self.product_calibration = self._calibrate(self._products, len(PRODUCTS))
+        # Part of the evaluator's result keys: changes with the training data
+        digest = hashlib.sha256(
+            pd.util.hash_pandas_object(labelled, index=False).values.tobytes()
+        )
+        self.version = f"{digest.hexdigest()[:12]}:{self.k}"
+        logger.info(
+            f"Query classifier: {len(labelled)} labelled queries, k={self.k}, "
+            f"calibration {self.intent_calibration} / {self.product_calibration}"
+        )
+
+    def _embed(self, texts: list[str]) -> np.ndarray:
+        return self.embedding_model.encode(
+            texts, convert_to_numpy=True, normalize_embeddings=True
+        ).astype(np.float32)
+
+    def _calibrate(self, labels: np.ndarray, classes: int) -> tuple[float, float]:
+        """Returns the (temperature, prior) with the best leave-one-out likelihood."""
+        rows = np.arange(min(len(labels), _CALIBRATION_ROWS))
+        if len(rows) < 2:
+            return _TEMPERATURES[0], _PRIORS[0]
+        similarities = self._embeddings[rows] @ self._embeddings[rows].T
+        # Held out as `classify_many(exclude_same=True)` scores them: without
+        # the row's duplicates, and without the row even if rounding hides it
+        _exclude_same(similarities)
+        np.fill_diagonal(similarities, -np.inf)
+        k = min(self.k, len(rows) - 1)
+        neighbours, top = _top_k(similarities, k)
+        best = None
+        for temperature in _TEMPERATURES:
+            for prior in _PRIORS:
+                probabilities = _vote(
+                    top, labels[rows][neighbours], classes, temperature, prior
+                )
+                likelihood = np.log(probabilities[rows, labels[rows]]).mean()
+                if best is None or likelihood > best[0]:
+                    best = (likelihood, temperature, prior)
+        return best[1], best[2]
+
+    def classify_many(
+        self, texts: list[str], exclude_same: bool = False
+    ) -> list[QueryClassification]:
+        """
+        Classifies several queries with one batched `encode` call.
+
+        Args:
+            texts: The queries.
+            exclude_same: Ignore labelled queries identical to the query, so
+                queries of the training data are scored as if held out, as
+                they are when calibrating.
+        """
+        with track(QUERY_CLASSIFIER_LATENCY, stage="embed"):
+            queries = self._embed(texts)
+        with track(QUERY_CLASSIFIER_LATENCY, stage="knn"):
+            similarities = queries @ self._embeddings.T
+            if exclude_same:
+                _exclude_same(similarities)
+            neighbours, top = _top_k(similarities, self.k)
+            intents = _vote(
+                top, self._intents[neighbours], len(INTENTS), *self.intent_calibration
+            )
+            products = _vote(
+                top,
+                self._products[neighbours],
+                len(PRODUCTS),
+                *self.product_calibration,
+            )
+        results = []
+        for intent, product in zip(intents, products):
+            intent_confidence = float(intent.max())
+            product_confidence = float(product.max())
+            results.append(
+                QueryClassification(
+                    intent=INTENTS[int(intent.argmax())],
+                    product=PRODUCTS[int(product.argmax())],
+                    intent_confidence=intent_confidence,
+                    product_confidence=product_confidence,
+                    confidence=min(intent_confidence, product_confidence),
+                )
+            )
+        return results
+
+    def classify(self, text: str) -> QueryClassification:
+        """Classifies one query."""
+        return self.classify_many([text])[0]
+
+    def is_confident(self, classification: QueryClassification) -> bool:
+        """Whether both labels are confident enough to skip the LLM."""
+        return classification.confidence >= self.min_confidence
+
+
+def _exclude_same(similarities: np.ndarray) -> None:
+    """Hides, in place, the labelled queries identical to each query."""
+    similarities[similarities >= _SAME_QUERY] = -np.inf
+
+
+def _top_k(similarities: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """Returns the indices and similarities of each row's `k` largest columns."""
+    if k < similarities.shape[1]:
+        neighbours = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+    else:
+        neighbours = np.broadcast_to(
+            np.arange(similarities.shape[1]), similarities.shape
+        )
+    return neighbours, np.take_along_axis(similarities, neighbours, axis=1)
+
+
+def _vote(
+    similarities: np.ndarray,
+    labels: np.ndarray,
+    classes: int,
+    temperature: float,
+    prior: float,
+) -> np.ndarray:
+    """Returns per-class probabilities from the neighbours' weighted votes."""
+    # Shifted by the row maximum, so the softmax cannot overflow; excluded
+    # neighbours (-inf) get no weight
+    top = similarities.max(axis=1, keepdims=True)
+    top = np.where(np.isfinite(top), top, 0.0)
+    weights = np.exp((similarities - top) / temperature)
+    votes = np.zeros((len(labels), classes))
+    np.add.at(votes, (np.arange(len(labels))[:, None], labels), weights)
+    votes += prior / classes
+    return votes / votes.sum(axis=1, keepdims=True)
+
+
+def build_query_classifier() -> Optional[KNNQueryClassifier]:
+    """
+    Builds the local query classifier from environment variables.
+
+    - QUERY_CLASSIFIER_ENABLED: "true" to enable it (default "false").
+    - QUERY_CLASSIFIER_MODEL: embedding model (default all-MiniLM-L6-v2).
+    - QUERY_CLASSIFIER_LABELLED_PATHS: comma-separated labelled query files,
+      added to the evaluation dataset.
+    - QUERY_CLASSIFIER_K: neighbours per prediction (default 5).
+    - QUERY_CLASSIFIER_MIN_CONFIDENCE: confidence at which /chat/route skips
+      the LLM (default 0.9).
+
+    Returns:
+        The fitted classifier, or None when it is disabled.
+    """
+    if os.getenv("QUERY_CLASSIFIER_ENABLED", "false").lower() != "true":
+        return None
+    from .embedding_models import DEFAULT_EMBEDDING_MODEL, get_embedding_model
+
+    paths = os.getenv("QUERY_CLASSIFIER_LABELLED_PATHS", "")
+    return KNNQueryClassifier(
+        get_embedding_model(
+            os.getenv("QUERY_CLASSIFIER_MODEL", DEFAULT_EMBEDDING_MODEL)
+        ),
+        load_labelled_queries([p.strip() for p in paths.split(",") if p.strip()]),
+        k=int(os.getenv("QUERY_CLASSIFIER_K", 5)),
+        min_confidence=float(os.getenv("QUERY_CLASSIFIER_MIN_CONFIDENCE", 0.9)),
+    )
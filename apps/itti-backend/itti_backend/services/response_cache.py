@@ -0,0 +1,224 @@
+"""Two-level (exact + semantic) cache for PromptService responses."""
+
+import hashlib
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import numpy as np
+
+from ..models.fintech_models import BotResponse
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_query(text: str) -> str:
+    """Lowercases, strips accents and punctuation, and collapses whitespace."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    without_accents = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return _NON_WORD.sub(" ", without_accents).strip()
+
+
+def build_namespace(system_prompt: str, model_name: str) -> str:
+    """Builds the cache namespace for a system prompt and model pair."""
+    prompt_hash = hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()[:16]
+    return f"{prompt_hash}:{model_name}"
+
+
+@dataclass
+class _CacheEntry:
+    response: BotResponse
+    created_at: float
+    latency: float  # Seconds the original LLM call took
+    embedding: Optional[np.ndarray] = None
+
+
+class ResponseCache:
+    """
+    LRU + TTL cache of BotResponse objects for repeated customer queries.
+
+    Level 1 is an exact match on the normalized query text. Level 2, enabled
+    when an embedding model is given, returns the nearest cached query whose
+    cosine similarity is at least `similarity_threshold`. Entries are scoped by
+    a namespace built from the system-prompt hash and the model name, so a
+    prompt or model change never serves stale answers.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float = 3600.0,
+        embedding_model: Any = None,
+        similarity_threshold: float = 0.95,
+    ):
+        """
+        Initializes the cache.
+
+        Args:
+            max_entries: Maximum number of cached responses (LRU eviction).
+            ttl_seconds: Lifetime of an entry, in seconds.
+            embedding_model: An optional SentenceTransformer-like model with an
+                `encode` method. Enables the semantic level when provided.
+            similarity_threshold: Minimum cosine similarity for a semantic hit.
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.embedding_model = embedding_model
+        self.similarity_threshold = similarity_threshold
+        self._entries: OrderedDict[tuple[str, str], _CacheEntry] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            "exact_hits": 0,
+            "semantic_hits": 0,
+            "misses": 0,
+            "latency_saved_seconds": 0.0,
+        }
+
+    @property
+    def semantic_enabled(self) -> bool:
+        """Whether the embedding nearest-neighbour level is active."""
+        return self.embedding_model is not None
+
+    def _embed(self, text: str) -> np.ndarray:
+        return self.embedding_model.encode(
+            text, convert_to_numpy=True, normalize_embeddings=True
+        )
+
+    def _is_expired(self, entry: _CacheEntry, now: float) -> bool:
+        return now - entry.created_at > self.ttl_seconds
+
+    def _hit(self, key: tuple[str, str], entry: _CacheEntry, kind: str) -> None:
+        self._entries.move_to_end(key)
+        self._stats[kind] += 1
+        self._stats["latency_saved_seconds"] += entry.latency
+
+    def get(self, text: str, namespace: str) -> Optional[BotResponse]:
+        """
+        Looks up a cached response for a query.
+
+        Args:
+            text: The customer's query text.
+            namespace: The namespace from `build_namespace`.
+
+        Returns:
+            A copy of the cached BotResponse with `original_query` set to `text`,
+            or None on a miss.
+        """
+        key = (namespace, normalize_query(text))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._is_expired(entry, now):
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._hit(key, entry, "exact_hits")
+                return entry.response.model_copy(update={"original_query": text})
+            if not self.semantic_enabled:
+                self._stats["misses"] += 1
+                return None
+
+        # Encode outside the lock; it is the expensive part of a lookup
+        query_embedding = self._embed(text)
+
+        with self._lock:
+            candidates = [
+                (k, e)
+                for k, e in self._entries.items()
+                if k[0] == namespace
+                and e.embedding is not None
+                and not self._is_expired(e, now)
+            ]
+            if candidates:
+                matrix = np.stack([e.embedding for _, e in candidates])
+                similarities = matrix @ query_embedding
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.similarity_threshold:
+                    best_key, best_entry = candidates[best]
+                    self._hit(best_key, best_entry, "semantic_hits")
+                    return best_entry.response.model_copy(
+                        update={"original_query": text}
+                    )
+            self._stats["misses"] += 1
+            return None
+
+    def put(
+        self, text: str, namespace: str, response: BotResponse, latency: float
+    ) -> None:
+        """
+        Stores a response for a query.
+
+        Args:
+            text: The customer's query text.
+            namespace: The namespace from `build_namespace`.
+            response: The response to cache.
+            latency: Seconds the LLM took to produce it, used for the
+                latency-saved counter.
+        """
+        normalized = normalize_query(text)
+        embedding = self._embed(text) if self.semantic_enabled else None
+        entry = _CacheEntry(
+            response=response,
+            created_at=time.monotonic(),
+            latency=latency,
+            embedding=embedding,
+        )
+        with self._lock:
+            self._entries[(namespace, normalized)] = entry
+            self._entries.move_to_end((namespace, normalized))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Removes every entry (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> dict:
+        """Returns hit, miss and latency-saved counters plus the current size."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["exact_hits"] + stats["semantic_hits"] + stats["misses"]
+        hits = stats["exact_hits"] + stats["semantic_hits"]
+        stats["hit_rate"] = hits / lookups if lookups else 0.0
+        return stats
+
+
+def build_response_cache() -> Optional[ResponseCache]:
+    """
+    Builds a ResponseCache from environment variables.
+
+    - RESPONSE_CACHE_ENABLED: "true" (default) or "false".
+    - RESPONSE_CACHE_MAX_ENTRIES / RESPONSE_CACHE_TTL_SECONDS: size and lifetime.
+    - RESPONSE_CACHE_SEMANTIC: "true" to enable the embedding level (loads
+      RESPONSE_CACHE_EMBEDDING_MODEL, default all-MiniLM-L6-v2).
+    - RESPONSE_CACHE_SIMILARITY_THRESHOLD: minimum cosine similarity for a hit.
+
+    Returns:
+        The configured cache, or None when caching is disabled.
+    """
+    if os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() != "true":
+        return None
+
+    embedding_model = None
+    if os.getenv("RESPONSE_CACHE_SEMANTIC", "false").lower() == "true":
+        from .embedding_models import get_embedding_model
+
+        embedding_model = get_embedding_model(
+            os.getenv("RESPONSE_CACHE_EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+        )
+
+    return ResponseCache(
+        max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 1024)),
+        ttl_seconds=float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", 3600)),
+        embedding_model=embedding_model,
+        similarity_threshold=float(
+            os.getenv("RESPONSE_CACHE_SIMILARITY_THRESHOLD", 0.95)
+        ),
+    )
@@ -0,0 +1,77 @@
+"""Incremental parser for streamed LLM completions in the PromptService format."""
+
+import json
+import re
+
+_JSON_FENCE = "```json"
+_REASONING_PATTERN = re.compile(
+    r"\*\*RAZONAMIENTO:\*\*(.*?)(?=```json)", re.DOTALL | re.IGNORECASE
+)
+# A complete JSON string value: the closing quote must already be in the buffer
+_FIELD_PATTERNS = {
+    name: re.compile(rf'"{name}"\s*:\s*"((?:[^"\\]|\\.)*)"')
+    for name in ("response", "next_steps")
+}
+
+
+class StreamingResponseParser:
+    """
+    Extracts the reasoning and answer fields from a completion as it streams.
+
+    Feed it text chunks in order; each call returns the events that became
+    complete with that chunk, as `(event_name, payload)` tuples:
+
+    - `("reasoning", {"text": ...})` once the ```json fence starts.
+    - `("field", {"name": ..., "value": ...})` for `response` and `next_steps`,
+      as soon as their JSON string value is closed.
+
+    Every event is emitted at most once.
+    """
+
+    def __init__(self):
+        """Initializes an empty parser."""
+        self._buffer = ""
+        self._reasoning_sent = False
+        self._fields_sent: set[str] = set()
+
+    @property
+    def text(self) -> str:
+        """The full text received so far."""
+        return self._buffer
+
+    def feed(self, chunk: str) -> list[tuple[str, dict]]:
+        """
+        Adds a chunk of the completion and returns any newly complete events.
+
+        Args:
+            chunk: The next piece of streamed text.
+
+        Returns:
+            A list of `(event_name, payload)` tuples, possibly empty.
+        """
+        self._buffer += chunk
+        events = []
+
+        fence = self._buffer.find(_JSON_FENCE)
+        if fence == -1:
+            return events
+
+        if not self._reasoning_sent:
+            self._reasoning_sent = True
+            match = _REASONING_PATTERN.search(self._buffer)
+            if match:
+                events.append(("reasoning", {"text": match.group(1).strip()}))
+
+        json_part = self._buffer[fence + len(_JSON_FENCE) :]
+        for name, pattern in _FIELD_PATTERNS.items():
+            if name in self._fields_sent:
+                continue
+            match = pattern.search(json_part)
+            if match:
+                self._fields_sent.add(name)
+                try:
+                    value = json.loads(f'"{match.group(1)}"')
+                except json.JSONDecodeError:
+                    value = match.group(1)
+                events.append(("field", {"name": name, "value": value}))
+        return events
@@ -5,25 +5,53 @@ import requests
 
 # Configuration
 BASE_URL = "http://localhost:8000"
-EVALUATION_ENDPOINT = "/evaluation/run-full-dataset"
+JOBS_ENDPOINT = "/evaluation/jobs"
 MAX_RETRIES = 3
 RETRY_DELAY = 5  # seconds
+POLL_INTERVAL = 2  # seconds
+
+
+def wait_for_job(job_url):
+    """Polls the job until it finishes and returns its final status."""
+    while True:
+        response = requests.get(job_url, timeout=30)
+        response.raise_for_status()
+        status = response.json()
+        eta = status.get("eta_seconds")
+        eta_text = f", ETA {eta:.0f}s" if eta is not None else ""
+        print(
+            f"Progreso: {status['completed_items']}/{status['total_items']} "
+            f"({status['progress']:.0%}{eta_text}) - {status['status']}"
+        )
+        if status["status"] in ("completed", "failed", "cancelled"):
+            return status
+        time.sleep(POLL_INTERVAL)
 
 
 def run_evaluation():
-    """Connects to the API and runs the comprehensive evaluation."""
+    """Connects to the API and runs the comprehensive evaluation as a job."""
     print("--- Iniciando Evaluación Comprehensiva ---")
-    url = f"{BASE_URL}{EVALUATION_ENDPOINT}"
+    url = f"{BASE_URL}{JOBS_ENDPOINT}"
+    job_url = None
 
     for attempt in range(MAX_RETRIES):
         try:
             print(f"\nAttempt {attempt + 1} of {MAX_RETRIES}...")
-            print(f"Sending POST request to {url}")
-
-            # The request can take a while, so we set a generous timeout
-            response = requests.post(url, timeout=300)  # 5 minutes timeout
-
-            # Check if the request was successful
+            # Only start the job once; retries resume polling the same job
+            if job_url is None:
+                print(f"Sending POST request to {url}")
+                response = requests.post(url, timeout=30)
+                response.raise_for_status()
+                job_url = f"{url}/{response.json()['job_id']}"
+                print(f"Job creado: {job_url}")
+
+            status = wait_for_job(job_url)
+            if status["status"] != "completed":
+                print(f"\n--- ❌ Evaluación {status['status']} ---")
+                print(f"Error: {status.get('error')}")
+                return
+
+            response = requests.get(f"{job_url}/report", timeout=30)
             response.raise_for_status()
 
             print("\n--- ✅ Evaluación Completada Exitosamente ---")
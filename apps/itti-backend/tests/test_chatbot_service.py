@@ -0,0 +1,62 @@
+"""Tests for the VuelaConNosotros ChatbotService and its routes."""
+
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from itti_backend.orchestrator.chatbot_graph import create_chatbot_graph
+from itti_backend.orchestrator.checkpointing import BoundedMemorySaver
+from itti_backend.orchestrator.node_registry import NodeRegistry
+from itti_backend.services.chatbot_service import ChatbotService
+from itti_backend.services.fake_llm import FakeLatencyChatModel
+
+
+def _build_service() -> ChatbotService:
+    registry = NodeRegistry.from_llm(FakeLatencyChatModel(response_text="saludo"))
+    return ChatbotService(
+        create_chatbot_graph(registry, checkpointer=BoundedMemorySaver())
+    )
+
+
+def _history(service: ChatbotService, session_id: str) -> list:
+    config = {"configurable": {"thread_id": session_id}}
+    return service.chatbot_graph.get_state(config).values.get("history", [])
+
+
+def test_session_state_survives_across_turns():
+    service = _build_service()
+
+    async def conversation():
+        first = await service.aprocess_message("hola", session_id="s1")
+        second = await service.aprocess_message("gracias", session_id="s1")
+        return first, second
+
+    first, second = asyncio.run(conversation())
+
+    assert _history(service, "s1") == [
+        {"user": "hola", "assistant": first},
+        {"user": "gracias", "assistant": second},
+    ]
+
+
+def test_sessions_do_not_share_state():
+    service = _build_service()
+
+    service.process_message("hola", session_id="s1")
+    service.process_message("gracias", session_id="s2")
+
+    assert [turn["user"] for turn in _history(service, "s1")] == ["hola"]
+    assert [turn["user"] for turn in _history(service, "s2")] == ["gracias"]
+
+
+def test_app_starts_without_llm_credentials(monkeypatch):
+    monkeypatch.setenv("LLM_PROVIDER", "gemini")
+    monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+    from itti_backend.main import app
+
+    with TestClient(app) as client:
+        response = client.post("/vuelaconnosotros/chat", json={"message": "hola"})
+        health = client.get("/docs")
+
+    assert response.status_code == 503
+    assert health.status_code == 200
@@ -0,0 +1,55 @@
+"""Tests for the bounded checkpointer backends."""
+
+from itti_backend.orchestrator.chatbot_graph import create_chatbot_graph
+from itti_backend.orchestrator.checkpointing import BoundedMemorySaver
+from itti_backend.orchestrator.node_registry import NodeRegistry
+from itti_backend.services.chatbot_service import ChatbotService
+from itti_backend.services.fake_llm import FakeLatencyChatModel
+
+
+def _build_service(saver: BoundedMemorySaver) -> ChatbotService:
+    registry = NodeRegistry.from_llm(FakeLatencyChatModel(response_text="saludo"))
+    return ChatbotService(create_chatbot_graph(registry, checkpointer=saver))
+
+
+def test_memory_saver_bounds_session_history():
+    saver = BoundedMemorySaver(checkpoints_per_session=2)
+    service = _build_service(saver)
+
+    service.process_message("hola", session_id="long")
+    blobs_after_one_turn = len(saver.blobs)
+    for _ in range(10):
+        service.process_message("gracias", session_id="long")
+
+    assert len(saver.storage["long"][""]) == 2
+    assert {key[2] for key in saver.writes} <= set(saver.storage["long"][""])
+    assert len(saver.blobs) <= blobs_after_one_turn
+    config = {"configurable": {"thread_id": "long"}}
+    history = service.chatbot_graph.get_state(config).values["history"]
+    assert [turn["user"] for turn in history] == ["hola"] + ["gracias"] * 10
+
+
+def test_memory_saver_drops_writes_that_arrive_after_pruning():
+    saver = BoundedMemorySaver(checkpoints_per_session=2)
+    service = _build_service(saver)
+
+    service.process_message("hola", session_id="long")
+    pruned = min(saver.storage["long"][""])
+    for _ in range(3):
+        service.process_message("gracias", session_id="long")
+    # A background save delivering the first checkpoint's writes late
+    config = {"configurable": {"thread_id": "long", "checkpoint_id": pruned}}
+    saver.put_writes(config, [("history", [])], task_id="late")
+
+    assert pruned not in saver.storage["long"][""]
+    assert ("long", "", pruned) not in saver.writes
+
+
+def test_memory_saver_evicts_least_recently_used_session():
+    saver = BoundedMemorySaver(max_sessions=2)
+    service = _build_service(saver)
+
+    for session_id in ("a", "b", "c"):
+        service.process_message("hola", session_id=session_id)
+
+    assert set(saver.storage) == {"b", "c"}
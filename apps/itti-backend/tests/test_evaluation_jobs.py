@@ -0,0 +1,234 @@
+"""Tests for the background evaluation jobs and their endpoints."""
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from itti_backend.models.fintech_models import EvaluationResult, Intent, Product
+from itti_backend.services.comprehensive_evaluator import ComprehensiveEvaluator
+from itti_backend.services.evaluation_jobs import EvaluationJobManager
+
+PROMPT_SERVICE = SimpleNamespace(output_mode="text")
+
+
+def result(index: int) -> EvaluationResult:
+    return EvaluationResult(
+        query=f"Consulta {index}",
+        generated_response="Respuesta",
+        ideal_response="Respuesta",
+        detected_intent=Intent.BENEFITS,
+        expected_intent=Intent.BENEFITS,
+        intent_correct=True,
+        detected_product=Product.DEBIT_CARD,
+        expected_product=Product.DEBIT_CARD,
+        product_correct=index % 2 == 0,
+        semantic_similarity=1.0,
+        is_semantically_similar=True,
+    )
+
+
+class StubEvaluator(ComprehensiveEvaluator):
+    """
+    Evaluator whose full run yields scripted results, last dataset row first.
+
+    Stops before yielding `block_at` results until `release` is set, and raises
+    instead of yielding result number `fail_at`. Reports are the real ones.
+    """
+
+    def __init__(self, size: int = 4, block_at=None, fail_at=None, delay=0.0):
+        self.dataset = [None] * size
+        self.query_classifier = None
+        self.block_at = block_at
+        self.fail_at = fail_at
+        self.delay = delay
+        self.release = asyncio.Event()
+        self.closed = False
+
+    async def iter_full_evaluation(self, prompt_service, max_concurrency, force):
+        try:
+            for position, index in enumerate(reversed(range(len(self.dataset)))):
+                if position == self.block_at:
+                    await self.release.wait()
+                await asyncio.sleep(self.delay)
+                if position == self.fail_at:
+                    raise RuntimeError("scoring failed")
+                # The first row of the run was stored by an earlier one
+                yield index, result(index), position == 0
+        finally:
+            self.closed = True
+
+
+async def wait_for_results(job, count: int) -> None:
+    while len(job.results) < count:
+        await asyncio.sleep(0.01)
+
+
+def test_a_job_reports_progress_then_its_results_in_dataset_order():
+    evaluator = StubEvaluator(size=4, block_at=2)
+
+    async def run():
+        jobs = EvaluationJobManager()
+        job = jobs.submit(evaluator, PROMPT_SERVICE)
+        assert job.get_status().status == "queued"
+        await wait_for_results(job, 2)
+        running = job.get_status()
+        evaluator.release.set()
+        await job.task
+        return running, job
+
+    running, job = asyncio.run(run())
+    assert running.status == "running"
+    assert (running.completed_items, running.reused_items) == (2, 1)
+    assert running.progress == 0.5
+    assert running.summary_metrics.total_evaluated == 2
+    status = job.get_status()
+    assert (status.status, status.completed_items, status.progress) == (
+        "completed",
+        4,
+        1.0,
+    )
+    assert status.eta_seconds is None
+    report = job.get_report()
+    assert [r.query for r in report.detailed_results] == [
+        f"Consulta {i}" for i in range(4)
+    ]
+    assert (report.reused_items, report.recomputed_items) == (1, 3)
+    assert report.output_mode == "text"
+
+
+def test_cancelling_a_running_job_keeps_its_results_and_ends_its_streams():
+    evaluator = StubEvaluator(size=4, block_at=2)
+
+    async def run():
+        jobs = EvaluationJobManager()
+        job = jobs.submit(evaluator, PROMPT_SERVICE)
+        streamed = []
+
+        async def consume():
+            async for item in job.stream_results():
+                streamed.append(item[0])
+
+        stream = asyncio.create_task(consume())
+        await wait_for_results(job, 2)
+        await jobs.cancel(job.id)
+        await asyncio.wait_for(stream, timeout=1)
+        return job, streamed
+
+    job, streamed = asyncio.run(run())
+    assert job.status == "cancelled"
+    assert job.finished_at is not None
+    assert streamed == [3, 2]
+    assert len(job.get_report().detailed_results) == 2
+    # The evaluation's generator was closed, cancelling its generations
+    assert evaluator.closed
+
+
+def test_streams_end_when_the_job_completes_or_fails():
+    async def stream(evaluator, start=0):
+        job = EvaluationJobManager().submit(evaluator, PROMPT_SERVICE)
+        items = [item[0] async for item in job.stream_results(start)]
+        # A stream opened after the job finished replays it and ends
+        replay = [item[0] async for item in job.stream_results()]
+        return job, items, replay
+
+    job, items, replay = asyncio.run(
+        asyncio.wait_for(stream(StubEvaluator(delay=0.01), start=1), timeout=5)
+    )
+    assert job.status == "completed"
+    assert items == [2, 1, 0]
+    assert replay == [3, 2, 1, 0]
+
+    job, items, _ = asyncio.run(
+        asyncio.wait_for(stream(StubEvaluator(fail_at=2)), timeout=5)
+    )
+    assert (job.status, job.error) == ("failed", "scoring failed")
+    assert items == [3, 2]
+
+
+def test_jobs_beyond_the_pool_wait_and_can_be_cancelled_while_queued():
+    first, second = StubEvaluator(block_at=0), StubEvaluator()
+
+    async def run():
+        jobs = EvaluationJobManager(max_workers=1)
+        running = jobs.submit(first, PROMPT_SERVICE)
+        queued = jobs.submit(second, PROMPT_SERVICE)
+        await asyncio.sleep(0.05)
+        assert (running.status, queued.status) == ("running", "queued")
+
+        await jobs.cancel(queued.id)
+        first.release.set()
+        await running.task
+        return running, queued
+
+    running, queued = asyncio.run(run())
+    assert running.status == "completed"
+    assert queued.status == "cancelled"
+    assert queued.results == []
+
+
+def test_only_the_newest_finished_jobs_are_kept():
+    async def run():
+        jobs = EvaluationJobManager(max_finished_jobs=1)
+        old = jobs.submit(StubEvaluator(), PROMPT_SERVICE)
+        await old.task
+        new = jobs.submit(StubEvaluator(), PROMPT_SERVICE)
+        await new.task
+        return jobs, old, new
+
+    jobs, old, new = asyncio.run(run())
+    assert jobs.get(old.id) is None
+    assert jobs.get(new.id) is new
+
+
+@pytest.fixture
+def client():
+    from itti_backend.main import app, get_evaluation_prompt_service, get_evaluator
+
+    evaluators = []
+    app.dependency_overrides[get_evaluation_prompt_service] = lambda: PROMPT_SERVICE
+    app.dependency_overrides[get_evaluator] = lambda: evaluators.pop(0)
+    with TestClient(app) as client:
+        client.evaluators = evaluators
+        yield client
+    app.dependency_overrides.clear()
+
+
+def _events(body: str) -> list[tuple[str, dict]]:
+    events = []
+    for block in body.strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append((event.removeprefix("event: "), json.loads(data[6:])))
+    return events
+
+
+def test_results_stream_ends_with_the_final_status(client):
+    client.evaluators.append(StubEvaluator(delay=0.02))
+
+    job = client.post("/evaluation/jobs").json()
+    body = client.get(f"/evaluation/jobs/{job['job_id']}/results").text
+
+    events = _events(body)
+    assert [event for event, _ in events] == ["result"] * 4 + ["end"]
+    assert [data["index"] for _, data in events[:-1]] == [3, 2, 1, 0]
+    assert events[0][1]["reused"] is True
+    assert events[-1][1]["status"] == "completed"
+    report = client.get(f"/evaluation/jobs/{job['job_id']}/report").json()
+    assert report["recomputed_items"] == 3
+
+
+def test_an_unfinished_job_has_no_report(client):
+    client.evaluators.append(StubEvaluator(block_at=0))
+
+    job_id = client.post("/evaluation/jobs").json()["job_id"]
+
+    assert client.get(f"/evaluation/jobs/{job_id}/report").status_code == 409
+    cancelled = client.post(f"/evaluation/jobs/{job_id}/cancel").json()
+    assert cancelled["status"] == "cancelled"
+    # Cancelled before any result: still nothing to report
+    report = client.get(f"/evaluation/jobs/{job_id}/report")
+    assert report.status_code == 409
+    assert report.json()["detail"] == "Evaluation job has no results"
+    assert client.get("/evaluation/jobs/unknown").status_code == 404
@@ -0,0 +1,156 @@
+"""Tests for the per-item evaluation result store and the runs that reuse it."""
+
+import asyncio
+import sqlite3
+
+import pytest
+import torch
+
+from itti_backend.models.fintech_models import (
+    CustomerQuery,
+    EvaluationResult,
+    Intent,
+    Product,
+)
+from itti_backend.services import comprehensive_evaluator
+from itti_backend.services.comprehensive_evaluator import ComprehensiveEvaluator
+from itti_backend.services.evaluation_store import (
+    EvaluationResultStore,
+    evaluation_item_key,
+)
+from itti_backend.services.fake_llm import FakeLatencyChatModel
+from itti_backend.services.prompt_service import PromptService
+
+QUERY = CustomerQuery(
+    text="¿Qué beneficios tiene la tarjeta de débito?",
+    expected_intent=Intent.BENEFITS,
+    expected_product=Product.DEBIT_CARD,
+    ideal_response="No tiene cuota de manejo.",
+)
+KEY_ARGS = ("abc:model", "gemini", "3")
+
+
+class StubEmbeddingModel:
+    """SentenceTransformer stand-in: every text gets the same embedding."""
+
+    def encode(self, texts, batch_size=None, convert_to_tensor=True):
+        return torch.ones(len(texts), 4)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = EvaluationResultStore(str(tmp_path / "evaluation.sqlite"))
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def evaluator(monkeypatch, store):
+    monkeypatch.setattr(
+        comprehensive_evaluator,
+        "get_embedding_model",
+        lambda name: StubEmbeddingModel(),
+    )
+
+    def build(**settings):
+        return ComprehensiveEvaluator(
+            FakeLatencyChatModel(), result_store=store, **settings
+        )
+
+    return build
+
+
+def results(size: int) -> list[EvaluationResult]:
+    return [
+        EvaluationResult(
+            query=f"Consulta {i}",
+            generated_response="Respuesta",
+            ideal_response="Respuesta",
+            detected_intent=Intent.BENEFITS,
+            expected_intent=Intent.BENEFITS,
+            intent_correct=True,
+            detected_product=Product.DEBIT_CARD,
+            expected_product=Product.DEBIT_CARD,
+            product_correct=True,
+            semantic_similarity=1.0,
+            is_semantically_similar=True,
+        )
+        for i in range(size)
+    ]
+
+
+def run(evaluator: ComprehensiveEvaluator, llm=None, force: bool = False):
+    service = PromptService(llm or FakeLatencyChatModel())
+    return asyncio.run(evaluator.run_full_evaluation(service, force=force))
+
+
+def test_the_item_key_is_stable():
+    # Changing it invalidates every stored result: it must not change by accident
+    assert evaluation_item_key(QUERY, *KEY_ARGS) == (
+        "c8a41cc8e680f89524f388a63c9ded07ade2425a692061b544e41f9c399936df"
+    )
+
+
+@pytest.mark.parametrize(
+    ("query", "args"),
+    [
+        (QUERY.model_copy(update={"text": "¿Y la tarjeta de crédito?"}), KEY_ARGS),
+        (QUERY.model_copy(update={"expected_intent": Intent.FEES_RATES}), KEY_ARGS),
+        (QUERY.model_copy(update={"expected_product": Product.LOAN}), KEY_ARGS),
+        (QUERY.model_copy(update={"ideal_response": "Otra respuesta."}), KEY_ARGS),
+        (QUERY, ("def:model", "gemini", "3")),
+        (QUERY, ("abc:model", "openai", "3")),
+        (QUERY, ("abc:model", "gemini", "4")),
+    ],
+    ids=["text", "intent", "product", "ideal", "namespace", "provider", "version"],
+)
+def test_every_input_changes_the_item_key(query, args):
+    assert evaluation_item_key(query, *args) != evaluation_item_key(QUERY, *KEY_ARGS)
+
+
+def test_lookups_past_the_chunk_size(store):
+    stored = {f"key-{i}": result for i, result in enumerate(results(3))}
+    store.put_many(list(stored.items()))
+    # Held to the chunk size, a single IN over every key would fail
+    store._conn.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 500)
+    keys = [f"missing-{i}" for i in range(1200)]
+    keys[0], keys[600], keys[1199] = "key-0", "key-1", "key-2"
+
+    found = store.get_many(keys)
+
+    assert found == stored
+
+
+def test_a_second_run_reuses_every_stored_item(evaluator):
+    first = run(evaluator())
+    second = run(evaluator())
+
+    total = first.summary_metrics.total_evaluated
+    assert (first.reused_items, first.recomputed_items) == (0, total)
+    assert (second.reused_items, second.recomputed_items) == (total, 0)
+    assert second.detailed_results == first.detailed_results
+
+
+def test_force_recomputes_every_item(evaluator):
+    run(evaluator())
+    forced = run(evaluator(), force=True)
+
+    assert forced.reused_items == 0
+    assert forced.recomputed_items == forced.summary_metrics.total_evaluated
+
+
+def test_a_new_evaluator_version_recomputes_every_item(evaluator, monkeypatch):
+    run(evaluator())
+    monkeypatch.setattr(comprehensive_evaluator, "EVALUATOR_VERSION", "test-next")
+
+    report = run(evaluator())
+
+    assert report.reused_items == 0
+
+
+def test_failed_generations_are_not_stored(evaluator):
+    failed = run(evaluator(), llm=FakeLatencyChatModel(response_text="No sé."))
+    retried = run(evaluator(), llm=FakeLatencyChatModel(response_text="No sé."))
+
+    assert failed.summary_metrics.parse_failure_rate == 1.0
+    assert retried.reused_items == 0
@@ -0,0 +1,199 @@
+"""Tests for the SQLite flight inventory behind the flight tools."""
+
+import sqlite3
+import threading
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+from itti_backend.services.flight_inventory import (
+    AVAILABILITY_QUERY,
+    RESERVATION_QUERIES,
+    STATUS_QUERIES,
+    FlightInventory,
+    build_flight_inventory,
+)
+
+TODAY = date.today()
+
+
+def _day(offset: int) -> str:
+    return (TODAY + timedelta(days=offset)).isoformat()
+
+
+def _flight(number: str, day: str, destination: str, status: str) -> dict:
+    return {
+        "flight_number": number,
+        "origin": "BUE",
+        "destination": destination,
+        "date": day,
+        "departure": "10:00",
+        "arrival": "12:00",
+        "status": status,
+        "seats_available": 5,
+    }
+
+
+@pytest.fixture
+def inventory():
+    inventory = FlightInventory()
+    inventory.insert_flights(
+        pd.DataFrame(
+            [
+                _flight("VW123", _day(-7), "MAD", "a tiempo"),
+                _flight("VW123", _day(2), "MIA", "demorado"),
+                _flight("VW123", _day(9), "MAD", "programado"),
+                _flight("VW456", _day(-3), "SCL", "a tiempo"),
+            ]
+        )
+    )
+    inventory.insert_reservations(
+        pd.DataFrame(
+            [
+                {"flight_number": "VW123", "date": _day(-7), "passenger_name": "Ana"},
+                {"flight_number": "vw123", "date": _day(9), "passenger_name": "Ana"},
+                {
+                    "flight_number": "VW123",
+                    "date": _day(2),
+                    "passenger_name": "Juan Pérez",
+                },
+            ]
+        )
+    )
+    yield inventory
+    inventory.close()
+
+
+def test_queries_are_index_searches(inventory):
+    params = {1: ("VW123",), 2: ("VW123", "ana")}
+    queries = [(query, params[1]) for query in STATUS_QUERIES]
+    queries += [(query, params[2]) for query in RESERVATION_QUERIES]
+    for query, key in queries:
+        plan = inventory._conn.execute(f"EXPLAIN QUERY PLAN {query}", (*key, _day(0)))
+        details = [row[-1] for row in plan]
+        assert all(d.startswith("SEARCH") for d in details), (query, details)
+    plan = inventory._conn.execute(
+        f"EXPLAIN QUERY PLAN {AVAILABILITY_QUERY}", ("BUE", "MIA", _day(2))
+    )
+    assert all(row[-1].startswith("SEARCH") for row in plan)
+
+
+def test_each_departure_of_a_flight_number_is_kept(inventory):
+    assert inventory.counts() == (4, 3)
+    assert inventory.flight_status("VW123", _day(-7))["status"] == "a tiempo"
+    assert inventory.flight_status("vw 123", _day(2))["status"] == "demorado"
+    assert inventory.flight_status("VW123", _day(3)) is None
+
+
+def test_status_without_a_date_is_the_next_departure(inventory):
+    status = inventory.flight_status("VW123")
+
+    assert status == {
+        "status": "demorado",
+        "departure": "10:00",
+        "arrival": "12:00",
+        "date": _day(2),
+    }
+
+
+def test_status_falls_back_to_the_last_departure(inventory):
+    assert inventory.flight_status("VW456")["date"] == _day(-3)
+    assert inventory.flight_status("ZZ0000") is None
+
+
+def test_reservation_joins_its_own_departure(inventory):
+    # Ana flies the MAD departures, not the MIA one in between
+    details = inventory.reservation("VW123", "ANA")
+    assert details == {
+        "flight_number": "VW123",
+        "origin": "BUE",
+        "destination": "MAD",
+        "date": _day(9),
+        "passenger": "Ana",
+    }
+    assert inventory.reservation("VW123", "ana", _day(-7))["date"] == _day(-7)
+    assert inventory.reservation("VW123", "juan perez")["destination"] == "MIA"
+    assert inventory.reservation("VW123", "Juan Pérez", _day(9)) is None
+
+
+def test_available_flights_are_sorted_by_departure():
+    inventory = FlightInventory()
+    inventory.insert_flights(
+        pd.DataFrame(
+            [
+                {**_flight("VW2", _day(1), "MIA", "programado"), "departure": "23:30"},
+                {**_flight("VW1", _day(1), "MIA", "programado"), "departure": "22:00"},
+                {**_flight("VW3", _day(1), "MIA", "cancelado"), "departure": "08:00"},
+                {**_flight("VW4", _day(1), "MIA", "programado"), "seats_available": 0},
+            ]
+        )
+    )
+
+    flights = inventory.available_flights("bue", "mia", _day(1))
+    assert flights == [
+        {"flight_number": "VW1", "time": "22:00"},
+        {"flight_number": "VW2", "time": "23:30"},
+    ]
+
+
+def test_lookups_do_not_wait_for_the_write_lock(inventory):
+    results = []
+    # Held by a load in progress; lookups read on their own connection
+    with inventory._lock:
+        reader = threading.Thread(
+            target=lambda: results.append(inventory.flight_status("VW123"))
+        )
+        reader.start()
+        reader.join(timeout=5)
+    assert results and results[0]["status"] == "demorado"
+
+
+def test_each_thread_reads_on_its_own_connection(inventory):
+    connections = []
+
+    def lookup():
+        inventory.flight_status("VW123")
+        connections.append(inventory._local.conn)
+
+    threads = [threading.Thread(target=lookup) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({id(conn) for conn in connections}) == 3
+    with pytest.raises(sqlite3.OperationalError):
+        connections[0].execute("DELETE FROM flights")
+
+
+def test_a_database_file_is_shared_by_instances(tmp_path):
+    path = str(tmp_path / "inventory.sqlite")
+    writer = FlightInventory(path)
+    writer.insert_flights(pd.DataFrame([_flight("VW123", _day(1), "MAD", "a tiempo")]))
+    reader = FlightInventory(path)
+
+    assert reader.flight_status("VW123")["date"] == _day(1)
+    reader.close()
+    writer.close()
+
+
+def test_the_old_schema_is_rejected(tmp_path):
+    path = str(tmp_path / "old.sqlite")
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "CREATE TABLE reservations (flight_number TEXT, passenger_key TEXT, "
+            "passenger_name TEXT, PRIMARY KEY (flight_number, passenger_key))"
+        )
+    conn.close()
+
+    with pytest.raises(ValueError, match="old flight inventory schema"):
+        FlightInventory(path)
+
+
+def test_demo_inventory_answers_the_tools():
+    inventory = build_flight_inventory()
+
+    assert inventory.flight_status("VW123")["status"] == "a tiempo"
+    assert inventory.reservation("VW123", "juan perez")["passenger"] == "Juan Pérez"
+    assert len(inventory.available_flights("BUE", "MIA", "2025-09-20")) == 2
+    inventory.close()
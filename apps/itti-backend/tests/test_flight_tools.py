@@ -0,0 +1,162 @@
+"""Tests for the flight tools and their per-tool TTL caches."""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from itti_backend.agents import tools
+from itti_backend.agents.flight_status_agent import FlightStatusAgent
+from itti_backend.services.fake_llm import FakeLatencyChatModel
+
+
+class CountingBackend:
+    """Wraps a flight-ops backend function and counts its calls."""
+
+    def __init__(self, backend, delay: float = 0):
+        self.backend = backend
+        self.delay = delay
+        self.calls = 0
+        self.threads: set[int] = set()
+
+    def __call__(self, *args: str) -> dict:
+        self.calls += 1
+        self.threads.add(threading.get_ident())
+        if self.delay:
+            time.sleep(self.delay)
+        return self.backend(*args)
+
+
+@pytest.fixture(autouse=True)
+def empty_caches():
+    tools.clear_tool_caches()
+    yield
+    tools.clear_tool_caches()
+
+
+@pytest.fixture
+def status_backend(monkeypatch):
+    backend = CountingBackend(tools._fetch_flight_status)
+    monkeypatch.setattr(tools, "_fetch_flight_status", backend)
+    return backend
+
+
+def test_hits_skip_the_backend_and_return_copies(status_backend):
+    first = tools.get_flight_status.invoke({"flight_number": "VW123"})
+    first["status"] = "cancelado"
+    again = asyncio.run(tools.get_flight_status.ainvoke({"flight_number": "VW123"}))
+
+    assert status_backend.calls == 1
+    assert again["status"] == "a tiempo"
+
+
+def test_not_found_results_are_cached(status_backend):
+    for _ in range(3):
+        result = tools.get_flight_status.invoke({"flight_number": "XX999"})
+
+    assert result["status"] == "desconocido"
+    assert status_backend.calls == 1
+
+
+def test_flight_numbers_match_exactly_after_normalization(status_backend):
+    assert tools.get_flight_status.invoke({"flight_number": "vw 123"})["status"] == (
+        "a tiempo"
+    )
+    # Free text around the number is not stripped by the tool
+    free_text = tools.get_flight_status.invoke({"flight_number": "vuelo VW123"})
+    assert free_text["status"] == "desconocido"
+
+
+def test_invalidate_flight_drops_the_cached_status(status_backend):
+    tools.get_flight_status.invoke({"flight_number": "VW123"})
+
+    assert tools.invalidate_flight("vw123") == 1
+    tools.get_flight_status.invoke({"flight_number": "VW123"})
+    assert status_backend.calls == 2
+
+
+def test_invalidate_availability_matches_the_given_fields(monkeypatch):
+    backend = CountingBackend(tools._fetch_flight_availability)
+    monkeypatch.setattr(tools, "_fetch_flight_availability", backend)
+    for destination in ("MIA", "MAD"):
+        tools.check_flight_availability.invoke(
+            {"origin": "BUE", "destination": destination, "date": "2025-09-20"}
+        )
+
+    assert tools.invalidate_availability(destination="mia") == 1
+    assert len(tools.AVAILABILITY_CACHE.entries) == 1
+    assert backend.calls == 2
+
+
+def test_concurrent_async_misses_share_one_backend_call(monkeypatch):
+    backend = CountingBackend(tools._fetch_flight_status)
+    monkeypatch.setattr(tools, "_fetch_flight_status", backend)
+    monkeypatch.setattr(tools, "FLIGHT_OPS_LATENCY_SECONDS", 0.05)
+
+    async def burst():
+        return await asyncio.gather(
+            *(
+                tools.get_flight_status.ainvoke({"flight_number": "VW123"})
+                for _ in range(8)
+            )
+        )
+
+    results = asyncio.run(burst())
+    assert backend.calls == 1
+    assert all(result["status"] == "a tiempo" for result in results)
+    assert len({id(result) for result in results}) == 8
+
+
+def test_concurrent_thread_misses_share_one_backend_call(monkeypatch):
+    backend = CountingBackend(tools._fetch_flight_status, delay=0.1)
+    monkeypatch.setattr(tools, "_fetch_flight_status", backend)
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(
+            pool.map(
+                lambda _: tools.get_flight_status.invoke({"flight_number": "VW123"}),
+                range(8),
+            )
+        )
+
+    assert backend.calls == 1
+    assert all(result["status"] == "a tiempo" for result in results)
+
+
+def test_async_backend_call_does_not_block_the_event_loop(monkeypatch):
+    backend = CountingBackend(tools._fetch_flight_status, delay=0.2)
+    monkeypatch.setattr(tools, "_fetch_flight_status", backend)
+
+    async def main():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        task = asyncio.create_task(ticker())
+        await tools.get_flight_status.ainvoke({"flight_number": "VW123"})
+        task.cancel()
+        return ticks
+
+    assert asyncio.run(main()) >= 5
+    assert threading.get_ident() not in backend.threads
+
+
+def test_concurrent_status_agents_share_the_tool_lookup(monkeypatch):
+    backend = CountingBackend(tools._fetch_flight_status)
+    monkeypatch.setattr(tools, "_fetch_flight_status", backend)
+    monkeypatch.setattr(tools, "FLIGHT_OPS_LATENCY_SECONDS", 0.05)
+    agent = FlightStatusAgent(llm=FakeLatencyChatModel(response_text="A tiempo"))
+    state = {"current_message": "¿Cómo viene el vuelo VW123?"}
+
+    async def burst():
+        return await asyncio.gather(*(agent.arun(state) for _ in range(8)))
+
+    results = asyncio.run(burst())
+    assert backend.calls == 1
+    assert all(result["agent_response"] == "A tiempo" for result in results)
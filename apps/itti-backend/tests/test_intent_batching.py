@@ -0,0 +1,139 @@
+"""Tests for micro-batched LLM intent classification."""
+
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+import pytest
+
+from itti_backend.nlu.intent_classifier import IntentClassifier
+from itti_backend.services.fake_llm import FakeLatencyChatModel
+
+# Messages the rule tier does not answer, with the intent the fake gives them
+INTENTS = {
+    "¿Me podrían decir si hay novedades del AR1000 de mañana?": (
+        "consultar_estado_vuelo"
+    ),
+    "Quiero pasar mi reserva 1001 para otro día": "cambiar_vuelo",
+    "¿Cuántas valijas puedo llevar en la reserva 1002?": "desconocida",
+    "¿Me podrían decir si hay novedades del AR1003 de mañana?": (
+        "consultar_estado_vuelo"
+    ),
+    "Quiero pasar mi reserva 1004 para otro día": "cambiar_vuelo",
+    "¿Cuántas valijas puedo llevar en la reserva 1005?": "desconocida",
+}
+TEXTS = list(INTENTS)
+
+
+class BatchingFakeChatModel(FakeLatencyChatModel):
+    """Fake classifier: answers a JSON list of messages with a JSON list."""
+
+    calls: int = 0
+    batch_calls: int = 0
+    batch_reply: Any = None  # Replaces the batched answer when set
+    failing_batches: bool = False
+    failing_texts: set = set()
+
+    def _build_result(self, messages, tools=None):
+        text = str(messages[-1].content)
+        if text.startswith("["):
+            answer = [INTENTS[t] for t in json.loads(text)]
+            reply = self.batch_reply or json.dumps(answer)
+        else:
+            reply = INTENTS[text]
+        result = self.model_copy(update={"response_text": reply})
+        return FakeLatencyChatModel._build_result(result, messages, tools)
+
+    def _generate(self, messages: Any, *args: Any, **kwargs: Any):
+        self.calls += 1
+        text = str(messages[-1].content)
+        if text.startswith("["):
+            self.batch_calls += 1
+            if self.failing_batches:
+                raise RuntimeError("batch failed")
+        elif text in self.failing_texts:
+            raise RuntimeError("call failed")
+        return super()._generate(messages, *args, **kwargs)
+
+
+def classify_all(model: IntentClassifier, texts: list[str]) -> list[str]:
+    with ThreadPoolExecutor(len(texts)) as pool:
+        return list(pool.map(model.classify, texts))
+
+
+def classifier(llm: BatchingFakeChatModel, **settings: Any) -> IntentClassifier:
+    settings.setdefault("batch_window_ms", 50)
+    return IntentClassifier(llm=llm, use_fast_path=False, **settings)
+
+
+def test_each_caller_gets_its_own_intent():
+    llm = BatchingFakeChatModel(latency=0.05, failing_texts=set())
+
+    assert classify_all(classifier(llm), TEXTS) == [INTENTS[t] for t in TEXTS]
+    assert llm.calls < len(TEXTS)
+
+
+def test_a_full_batch_does_not_wait_for_its_window():
+    llm = BatchingFakeChatModel(failing_texts=set())
+    model = classifier(llm, batch_window_ms=2000, max_batch_size=4)
+
+    start = time.perf_counter()
+    classify_all(model, TEXTS[:4])
+    assert time.perf_counter() - start < 1
+
+
+@pytest.mark.parametrize(
+    "settings",
+    [{"batch_reply": "No sé"}, {"failing_batches": True}],
+    ids=["unparsable", "failed"],
+)
+def test_a_bad_batch_falls_back_to_one_call_per_message(settings):
+    llm = BatchingFakeChatModel(failing_texts=set(), **settings)
+
+    assert classify_all(classifier(llm), TEXTS) == [INTENTS[t] for t in TEXTS]
+    assert llm.batch_calls >= 1
+
+
+def test_unknown_batched_intents_are_classified_again():
+    llm = BatchingFakeChatModel(failing_texts=set())
+    model = classifier(llm)
+    # The batched answer names an intent the classifier doesn't have
+    llm.batch_reply = json.dumps(["reembolso", *(INTENTS[t] for t in TEXTS[1:])])
+
+    intents = model._classify_batch_with_llm(TEXTS)
+    assert intents == [INTENTS[t] for t in TEXTS]
+    assert llm.calls == 2
+
+
+def test_a_failed_message_only_fails_its_own_caller():
+    llm = BatchingFakeChatModel(failing_batches=True, failing_texts={TEXTS[0]})
+
+    intents = classify_all(classifier(llm), TEXTS)
+    # The failed message falls back to "desconocida"; the others are answered
+    assert intents == ["desconocida"] + [INTENTS[t] for t in TEXTS[1:]]
+
+
+def test_batching_is_opt_in_for_every_provider():
+    # The window is read at import: reload the module once per provider, in a
+    # process of its own
+    script = """
+import importlib, os
+from itti_backend.nlu import intent_classifier
+for provider in ("replay", "record", "gemini", "openai"):
+    os.environ["LLM_PROVIDER"] = provider
+    print(provider, importlib.reload(intent_classifier).INTENT_BATCH_WINDOW_MS)
+"""
+    env = {k: v for k, v in os.environ.items() if k != "INTENT_BATCH_WINDOW_MS"}
+    output = subprocess.run(
+        [sys.executable, "-c", script],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    windows = dict(line.split() for line in output.stdout.splitlines()[-4:])
+    assert windows == dict.fromkeys(("replay", "record", "gemini", "openai"), "0.0")
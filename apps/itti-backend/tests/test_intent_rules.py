@@ -0,0 +1,82 @@
+"""Tests for the deterministic rule tier in front of the intent classifier."""
+
+import pytest
+
+from itti_backend.nlu.intent_classifier import FEW_SHOT_EXAMPLES, IntentClassifier
+from itti_backend.nlu.intent_rules import IntentRuleMatcher
+from itti_backend.services.fake_llm import FakeLatencyChatModel
+
+# Messages the rule tier must answer, with their intent
+ANSWERED = [
+    ("Buenos días", "saludo"),
+    ("¿A qué hora sale el AR1000?", "consultar_estado_vuelo"),
+    ("¿Mi vuelo sale a tiempo?", "consultar_estado_vuelo"),
+    ("Cambiar reserva 1001 para el viernes", "cambiar_vuelo"),
+    ("Mil gracias, muy amable", "agradecimiento"),
+]
+# Messages the rule tier must leave to the LLM: unknown, or more than one intent
+DEFERRED = [
+    "¿Cuál es la capital de Mongolia?",
+    "Quiero cambiar mi vuelo porque el vuelo VW123 está demorado",
+    "Hola, ¿puedo llevar a mi perro?",
+    "¿Puedo cambiar de asiento?",
+    "hola gracias",
+    "VW123",
+    "",
+]
+
+
+class CountingChatModel(FakeLatencyChatModel):
+    """Fake classifier that counts its calls."""
+
+    calls: int = 0
+
+    def _generate(self, *args, **kwargs):
+        self.calls += 1
+        return super()._generate(*args, **kwargs)
+
+
+@pytest.mark.parametrize(("text", "intent"), FEW_SHOT_EXAMPLES)
+def test_few_shot_examples_are_answered_or_deferred(text, intent):
+    predicted = IntentRuleMatcher().match(text)
+
+    # The LLM owns "desconocida": the rules never claim a message is unknown
+    assert predicted == (None if intent == "desconocida" else intent)
+
+
+@pytest.mark.parametrize(("text", "intent"), ANSWERED)
+def test_unambiguous_messages_are_answered(text, intent):
+    assert IntentRuleMatcher().match(text) == intent
+
+
+@pytest.mark.parametrize("text", DEFERRED)
+def test_unknown_and_ambiguous_messages_are_deferred(text):
+    assert IntentRuleMatcher().match(text) is None
+
+
+def test_accents_and_punctuation_do_not_change_the_answer():
+    matcher = IntentRuleMatcher()
+
+    assert matcher.match("ADIÓS!!") == matcher.match("adios") == "despedida"
+
+
+def test_stats_count_hits_and_fallbacks():
+    matcher = IntentRuleMatcher()
+    for text, _ in FEW_SHOT_EXAMPLES:
+        matcher.match(text)
+
+    stats = matcher.get_stats()
+    assert stats["total_rule_hits"] == len(FEW_SHOT_EXAMPLES) - 1
+    assert stats["llm_fallbacks"] == 1
+    assert stats["hit_rate"] == pytest.approx(5 / 6)
+
+
+def test_the_classifier_asks_the_llm_only_for_deferred_messages():
+    llm = CountingChatModel(response_text="desconocida")
+    model = IntentClassifier(llm=llm, batch_window_ms=0)
+
+    assert model.classify("Muchas gracias por tu ayuda") == "agradecimiento"
+    assert llm.calls == 0
+    assert model.classify("¿Cuál es la capital de Mongolia?") == "desconocida"
+    assert llm.calls == 1
+    assert model.get_fast_path_stats()["llm_fallbacks"] == 1
@@ -0,0 +1,75 @@
+"""Tests for the record/replay chat models."""
+
+import asyncio
+
+import pytest
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from itti_backend.models.fintech_models import CustomerQuery, Intent
+from itti_backend.services.fake_llm import FakeLatencyChatModel
+from itti_backend.services.llm_cassette import RecordingChatModel, ReplayChatModel
+from itti_backend.services.prompt_service import PromptService
+
+MESSAGES = [SystemMessage(content="Eres un asistente."), HumanMessage(content="Hola")]
+QUERY = CustomerQuery(text="¿Qué beneficios tiene la tarjeta de débito?")
+
+
+@pytest.fixture
+def cassette(tmp_path):
+    return str(tmp_path / "cassette.jsonl")
+
+
+def test_replay_keeps_usage_metadata(cassette):
+    recorded = RecordingChatModel(
+        client=FakeLatencyChatModel(), cassette_path=cassette
+    ).invoke(MESSAGES)
+
+    replayed = ReplayChatModel(cassette_path=cassette).invoke(MESSAGES)
+
+    assert replayed.content == recorded.content
+    assert replayed.usage_metadata == recorded.usage_metadata
+    assert replayed.usage_metadata["input_tokens"] > 0
+
+
+@pytest.mark.parametrize("output_mode", ["text", "structured"])
+def test_prompt_service_replays_offline(cassette, output_mode):
+    recorder = RecordingChatModel(client=FakeLatencyChatModel(), cassette_path=cassette)
+    recorded = asyncio.run(
+        PromptService(recorder, output_mode=output_mode).agenerate_response(QUERY)
+    )
+
+    replay = ReplayChatModel(cassette_path=cassette)
+    replayed = asyncio.run(
+        PromptService(replay, output_mode=output_mode).agenerate_response(QUERY)
+    )
+
+    assert replayed.detected_intent == recorded.detected_intent == Intent.BENEFITS
+    assert replayed.response_text == recorded.response_text
+    assert replayed.output_tokens == recorded.output_tokens > 0
+
+
+def test_streamed_completion_is_recorded(cassette):
+    recorder = RecordingChatModel(client=FakeLatencyChatModel(), cassette_path=cassette)
+
+    async def stream():
+        return "".join([chunk.content async for chunk in recorder.astream(MESSAGES)])
+
+    streamed = asyncio.run(stream())
+
+    replayed = ReplayChatModel(cassette_path=cassette).invoke(MESSAGES)
+    assert replayed.content == streamed
+    assert replayed.usage_metadata["output_tokens"] > 0
+
+
+def test_bound_tools_are_part_of_the_prompt(cassette):
+    RecordingChatModel(client=FakeLatencyChatModel(), cassette_path=cassette).invoke(
+        MESSAGES
+    )
+    replay = ReplayChatModel(cassette_path=cassette)
+
+    def lookup_flight(flight_number: str) -> str:
+        """Looks up a flight."""
+        return flight_number
+
+    with pytest.raises(ValueError, match="not in the cassette"):
+        replay.bind_tools([lookup_flight]).invoke(MESSAGES)
@@ -0,0 +1,154 @@
+"""Tests for the LLM router's failover, hedging and circuit breakers."""
+
+import asyncio
+import time
+from collections.abc import Iterator
+from typing import Any
+
+import pytest
+from langchain_core.messages import AIMessageChunk, HumanMessage
+from langchain_core.outputs import ChatGenerationChunk
+
+from itti_backend.services.fake_llm import FakeLatencyChatModel
+from itti_backend.services.llm_router import (
+    AllProvidersUnavailableError,
+    RouterChatModel,
+)
+from itti_backend.services.llm_scheduler import current_llm_priority, llm_priority
+
+MESSAGES = [HumanMessage(content="¿Cuál es el estado de mi vuelo?")]
+
+
+class ScriptedChatModel(FakeLatencyChatModel):
+    """Fake provider whose calls follow a script of (latency, succeeds) steps."""
+
+    script: Any = None  # Iterator of (latency, ok) steps
+    calls: int = 0
+    priorities: list = []
+
+    def _step(self) -> tuple[float, bool]:
+        self.calls += 1
+        self.priorities.append(current_llm_priority())
+        return next(self.script)
+
+    def _raise(self) -> None:
+        raise RuntimeError(f"{self.response_text} failed")
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        latency, ok = self._step()
+        time.sleep(latency)
+        if not ok:
+            self._raise()
+        return self._build_result(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        latency, ok = self._step()
+        await asyncio.sleep(latency)
+        if not ok:
+            self._raise()
+        return self._build_result(messages)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        latency, ok = self._step()
+        await asyncio.sleep(latency)
+        if not ok:
+            self._raise()
+        yield ChatGenerationChunk(message=AIMessageChunk(content=self.response_text))
+
+
+def steady(latency: float, ok: bool = True) -> Iterator[tuple[float, bool]]:
+    while True:
+        yield latency, ok
+
+
+def provider(name: str, script: Iterator[tuple[float, bool]]) -> ScriptedChatModel:
+    return ScriptedChatModel(response_text=name, script=script, priorities=[])
+
+
+def router(*clients: ScriptedChatModel, **settings: Any) -> RouterChatModel:
+    return RouterChatModel(
+        clients=list(clients),
+        providers=[client.response_text for client in clients],
+        **settings,
+    )
+
+
+async def _answer(model: RouterChatModel, path: str) -> str:
+    if path == "invoke":
+        return (await asyncio.to_thread(model.invoke, MESSAGES)).content
+    if path == "ainvoke":
+        return (await model.ainvoke(MESSAGES)).content
+    return "".join([chunk.content async for chunk in model.astream(MESSAGES)])
+
+
+@pytest.mark.parametrize("path", ["invoke", "ainvoke", "astream"])
+def test_a_failed_call_fails_over(path):
+    primary = provider("primary", steady(0.01, ok=False))
+    model = router(primary, provider("secondary", steady(0.01)))
+
+    assert asyncio.run(_answer(model, path)) == "secondary"
+    assert primary.calls == 1
+
+
+@pytest.mark.parametrize("path", ["invoke", "ainvoke"])
+def test_a_slow_call_is_hedged(path):
+    model = router(
+        provider("primary", steady(1.0)),
+        provider("secondary", steady(0.01)),
+        hedge_max_delay=0.05,
+    )
+
+    start = time.perf_counter()
+    assert asyncio.run(_answer(model, path)) == "secondary"
+    assert time.perf_counter() - start < 0.5
+    # The losing call doesn't count as a failure
+    assert model.health[0].state == "closed"
+
+
+def test_the_circuit_opens_then_one_probe_closes_it():
+    primary = provider("primary", steady(0.0, ok=False))
+    model = router(
+        primary,
+        provider("secondary", steady(0.0)),
+        breaker_min_calls=5,
+        breaker_cooldown_seconds=0.2,
+    )
+
+    async def run():
+        for _ in range(20):
+            await model.ainvoke(MESSAGES)
+        assert primary.calls == 5
+        assert model.health[0].state == "open"
+
+        primary.script = steady(0.0)
+        await asyncio.sleep(0.2)
+        return await asyncio.gather(*(model.ainvoke(MESSAGES) for _ in range(5)))
+
+    answers = asyncio.run(run())
+    assert primary.calls == 6
+    assert model.health[0].state == "closed"
+    assert answers[0].content == "primary"
+
+
+def test_every_circuit_open_fails_fast():
+    model = router(provider("only", steady(0.0, ok=False)), breaker_min_calls=1)
+
+    with pytest.raises(RuntimeError, match="only failed"):
+        model.invoke(MESSAGES)
+    with pytest.raises(AllProvidersUnavailableError):
+        model.invoke(MESSAGES)
+
+
+@pytest.mark.parametrize("path", ["invoke", "ainvoke"])
+def test_calls_keep_the_caller_priority(path):
+    primary = provider("primary", steady(1.0))
+    secondary = provider("secondary", steady(0.01))
+    model = router(primary, secondary, hedge_max_delay=0.05)
+
+    async def run():
+        with llm_priority("evaluation"):
+            return await _answer(model, path)
+
+    assert asyncio.run(run()) == "secondary"
+    # Both the first call and its hedge ran with the caller's priority
+    assert primary.priorities == secondary.priorities == ["evaluation"]
@@ -0,0 +1,86 @@
+"""Tests for the LLM admission control (PriorityRateLimiter)."""
+
+import asyncio
+import time
+
+import pytest
+from langchain_core.messages import HumanMessage
+from prometheus_client import REGISTRY
+
+from itti_backend.services.fake_llm import FakeLatencyChatModel
+from itti_backend.services.llm_scheduler import PriorityRateLimiter, llm_priority
+
+MESSAGES = [HumanMessage(content="¿Cuáles son los beneficios de la tarjeta?")]
+
+
+def fake_client(limiter: PriorityRateLimiter) -> FakeLatencyChatModel:
+    return FakeLatencyChatModel(
+        latency=0.0, rate_limiter=limiter, callbacks=[limiter.usage_callback]
+    )
+
+
+def test_a_queued_interactive_call_is_admitted_first():
+    limiter = PriorityRateLimiter("test-priority", requests_per_second=4)
+    while limiter.acquire(blocking=False):
+        pass
+    admitted = []
+
+    async def call(priority: str, delay: float) -> None:
+        await asyncio.sleep(delay)
+        with llm_priority(priority):
+            await limiter.aacquire()
+        admitted.append(priority)
+
+    async def run():
+        await asyncio.gather(call("evaluation", 0), call("interactive", 0.05))
+
+    asyncio.run(run())
+    assert admitted == ["interactive", "evaluation"]
+
+
+def test_tokens_are_charged_from_usage_after_the_call():
+    limiter = PriorityRateLimiter("test-tokens", tokens_per_minute=600_000)
+
+    message = asyncio.run(fake_client(limiter).ainvoke(MESSAGES))
+
+    used = 600_000 - limiter._tokens.level
+    assert used == pytest.approx(message.usage_metadata["total_tokens"], abs=1)
+
+
+def test_evaluation_stops_at_the_reserve_and_chat_at_the_debt():
+    limiter = PriorityRateLimiter(
+        "test-reserve", tokens_per_minute=600_000, reserve=0.5
+    )
+
+    limiter.charge(350_000)
+    with llm_priority("evaluation"):
+        assert not limiter.acquire(blocking=False)
+    assert limiter.acquire(blocking=False)
+
+    limiter.charge(251_000)
+    assert not limiter.acquire(blocking=False)
+    time.sleep(0.2)  # The debt is repaid at 10,000 tokens per second
+    assert limiter.acquire(blocking=False)
+
+
+def test_unknown_priorities_are_rejected():
+    with (
+        pytest.raises(ValueError, match="Unknown LLM priority"),
+        llm_priority("batch"),
+    ):
+        pass
+
+
+def test_sync_calls_take_the_priority_of_their_context():
+    limiter = PriorityRateLimiter("test-sync", requests_per_second=100)
+
+    async def run():
+        with llm_priority("evaluation"):
+            await asyncio.to_thread(fake_client(limiter).invoke, MESSAGES)
+
+    asyncio.run(run())
+    waits = REGISTRY.get_sample_value(
+        "llm_queue_wait_seconds_count",
+        {"provider": "test-sync", "priority": "evaluation"},
+    )
+    assert waits == 1
@@ -0,0 +1,200 @@
+"""Tests for the provider-side system prompt cache and PromptService tokens."""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_openai import ChatOpenAI
+
+from itti_backend.models.fintech_models import BotResponse, CustomerQuery
+from itti_backend.services.fake_llm import FakeLatencyChatModel, _estimate_tokens
+from itti_backend.services.llm_cassette import RecordingChatModel
+from itti_backend.services.llm_router import RouterChatModel, build_llm_router
+from itti_backend.services.prompt_prefix_cache import PromptPrefixCache
+from itti_backend.services.prompt_service import PromptService
+
+TEXTS = [
+    "¿Qué beneficios tiene la tarjeta de débito?",
+    "¿Cómo abro una cuenta de ahorros?",
+    "Quiero saber los requisitos del préstamo personal",
+]
+
+
+class FakeGeminiPrefixCache(PromptPrefixCache):
+    """Creates Gemini cached content through a scripted function."""
+
+    def __init__(self, create, **kwargs):
+        super().__init__(**kwargs)
+        self.create = create
+        self.calls = 0
+
+    def _create_gemini_cache(self, llm_client, system_prompt, namespace):
+        self.calls += 1
+        return self.create(namespace)
+
+
+def _gemini() -> ChatGoogleGenerativeAI:
+    return ChatGoogleGenerativeAI(model="gemini-2.0-flash", google_api_key="test")
+
+
+async def _generate(service: PromptService, path: str, text: str) -> BotResponse:
+    query = CustomerQuery(text=text)
+    if path == "blocking":
+        return await asyncio.to_thread(service.generate_response, query)
+    if path == "stream":
+        async for name, payload in service.astream_response(query):
+            if name == "final":
+                return BotResponse(**payload["response"])
+    return await service.agenerate_response(query)
+
+
+@pytest.mark.parametrize(
+    "mode, path",
+    [
+        ("text", "blocking"),
+        ("text", "async"),
+        ("text", "stream"),
+        ("structured", "async"),
+    ],
+)
+def test_token_accounting_with_a_shared_prefix(mode, path):
+    service = PromptService(
+        FakeLatencyChatModel(), output_mode=mode, prefix_cache=PromptPrefixCache()
+    )
+    prefix_tokens = _estimate_tokens(service.system_prompt)
+
+    async def run():
+        return [await _generate(service, path, text) for text in TEXTS]
+
+    responses = asyncio.run(run())
+
+    for i, (text, response) in enumerate(zip(TEXTS, responses)):
+        assert response.input_tokens == prefix_tokens + _estimate_tokens(text)
+        # The first call writes the provider's cache, the rest read it
+        assert response.cached_input_tokens == (prefix_tokens if i else 0)
+        assert response.output_tokens > 0
+
+
+def test_every_call_shares_the_system_message():
+    service = PromptService(FakeLatencyChatModel(), prefix_cache=PromptPrefixCache())
+
+    first, second = (service._build_messages(CustomerQuery(text=t)) for t in TEXTS[:2])
+
+    assert first[0] is second[0] is service.system_message
+
+
+def test_gemini_cache_failure_is_retried():
+    outcomes = iter([RuntimeError("unavailable"), "cachedContents/1"])
+
+    def create(namespace):
+        outcome = next(outcomes)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    cache = FakeGeminiPrefixCache(create)
+    llm = _gemini()
+
+    client, prompt_cached = cache.prepare(llm, "prompt", "ns")
+    assert (client, prompt_cached) == (llm, False)
+    assert cache.prepare(llm, "prompt", "ns") == (llm, False)
+    assert cache.calls == 1  # Not retried before its backoff
+
+    cache._entries["ns"].refresh_at = 0  # The backoff has passed
+    client, prompt_cached = cache.prepare(llm, "prompt", "ns")
+
+    assert prompt_cached
+    assert client.cached_content == "cachedContents/1"
+    assert cache.calls == 2
+
+
+def test_gemini_cache_creation_does_not_block_other_namespaces():
+    release = threading.Event()
+
+    def create(namespace):
+        if namespace == "slow":
+            release.wait(5)
+        return f"cachedContents/{namespace}"
+
+    cache = FakeGeminiPrefixCache(create)
+    llm = _gemini()
+    with ThreadPoolExecutor(4) as pool:
+        slow = [pool.submit(cache.prepare, llm, "prompt", "slow") for _ in range(3)]
+        fast_client, _ = pool.submit(cache.prepare, llm, "prompt", "fast").result(2)
+        release.set()
+        slow_clients = [future.result(5)[0] for future in slow]
+
+    assert fast_client.cached_content == "cachedContents/fast"
+    assert {c.cached_content for c in slow_clients} == {"cachedContents/slow"}
+    assert cache.calls == 2  # One creation per namespace
+
+
+def test_live_entry_is_served_while_it_is_refreshed():
+    release = threading.Event()
+    names = iter(["cachedContents/old", "cachedContents/new"])
+
+    def create(namespace):
+        name = next(names)
+        if name.endswith("new"):
+            release.wait(5)
+        return name
+
+    cache = FakeGeminiPrefixCache(create)
+    llm = _gemini()
+    cache.prepare(llm, "prompt", "ns")
+    cache._entries["ns"].refresh_at = 0  # Due for a refresh, not expired
+
+    with ThreadPoolExecutor(1) as pool:
+        refresh = pool.submit(cache.prepare, llm, "prompt", "ns")
+        while "ns" not in cache._refreshing:
+            time.sleep(0.001)
+        client, _ = cache.prepare(llm, "prompt", "ns")
+        release.set()
+        refreshed, _ = refresh.result(5)
+
+    assert client.cached_content == "cachedContents/old"
+    assert refreshed.cached_content == "cachedContents/new"
+
+
+def _openai() -> ChatOpenAI:
+    return ChatOpenAI(model="gpt-4o-mini", api_key="test")
+
+
+def test_router_clients_are_prepared_with_the_prompt_inline(caplog):
+    cache = FakeGeminiPrefixCache(lambda namespace: "cachedContents/1")
+    router = build_llm_router(["openai", "gemini"], [_openai(), _gemini()])
+
+    client, prompt_cached = cache.prepare(router, "prompt", "ns")
+
+    assert isinstance(client, RouterChatModel) and not prompt_cached
+    assert client.clients[0].model_kwargs["prompt_cache_key"] == "ns"
+    # Both providers get the same messages, so Gemini can't drop the prompt
+    assert client.clients[1] is router.clients[1]
+    assert cache.calls == 0
+    assert "not used behind a router or recorder" in caplog.text
+    # The prepared router shares the original's circuit breakers
+    assert client.health is router.health
+    assert cache.prepare(router, "prompt", "ns") == (client, False)
+
+
+def test_recorded_client_is_prepared_with_the_prompt_inline(tmp_path):
+    cache = FakeGeminiPrefixCache(lambda namespace: "cachedContents/1")
+    recorder = RecordingChatModel(
+        client=_openai(), cassette_path=str(tmp_path / "cassette.jsonl")
+    )
+
+    client, prompt_cached = cache.prepare(recorder, "prompt", "ns")
+
+    assert isinstance(client, RecordingChatModel) and not prompt_cached
+    assert client.client.model_kwargs["prompt_cache_key"] == "ns"
+    assert client.cassette_path == recorder.cassette_path
+
+
+def test_a_client_without_prefix_caching_is_logged(caplog):
+    llm = FakeLatencyChatModel()
+
+    assert PromptPrefixCache().prepare(llm, "prompt", "ns") == (llm, False)
+    assert "No prompt prefix caching for FakeLatencyChatModel" in caplog.text
@@ -0,0 +1,127 @@
+"""Tests for the PromptService generation paths."""
+
+import asyncio
+
+import pytest
+from prometheus_client import REGISTRY
+
+from itti_backend.models.fintech_models import CustomerQuery, Intent, Product
+from itti_backend.services.fake_llm import DEFAULT_FAKE_RESPONSE, FakeLatencyChatModel
+from itti_backend.services.prompt_service import (
+    STRUCTURED_OUTPUT_ATTEMPTS,
+    PromptService,
+)
+from itti_backend.services.response_cache import ResponseCache
+
+QUERY = CustomerQuery(text="¿Qué beneficios tiene la tarjeta de débito?")
+
+
+@pytest.mark.parametrize("output_mode", ["text", "structured"])
+def test_generate_response_matches_async_path(output_mode):
+    service = PromptService(FakeLatencyChatModel(), output_mode=output_mode)
+
+    sync_response = service.generate_response(QUERY)
+    async_response = asyncio.run(service.agenerate_response(QUERY))
+
+    assert sync_response.detected_intent == Intent.BENEFITS
+    assert sync_response.detected_product == Product.DEBIT_CARD
+    assert sync_response.response_text == async_response.response_text
+    assert sync_response.output_tokens == async_response.output_tokens
+
+
+def test_generate_response_inside_running_loop():
+    service = PromptService(FakeLatencyChatModel())
+
+    async def call_blocking():
+        return service.generate_response(QUERY)
+
+    response = asyncio.run(call_blocking())
+
+    assert response.detected_intent == Intent.BENEFITS
+
+
+def _stream_observations() -> list[float]:
+    return [
+        REGISTRY.get_sample_value(f"{name}_count", {"caller": "prompt_service"}) or 0
+        for name in (
+            "llm_stream_time_to_first_token_seconds",
+            "llm_stream_time_to_first_answer_field_seconds",
+        )
+    ]
+
+
+def test_stream_records_time_to_first_token_and_field():
+    service = PromptService(FakeLatencyChatModel())
+    before = _stream_observations()
+
+    async def consume():
+        return [event async for event in service.astream_response(QUERY)]
+
+    events = asyncio.run(consume())
+
+    assert [after - b for after, b in zip(_stream_observations(), before)] == [1, 1]
+    metrics = events[-1][1]["metrics"]
+    assert 0 < metrics["time_to_first_token"] <= metrics["time_to_first_answer_field"]
+
+
+class ScriptedReplyChatModel(FakeLatencyChatModel):
+    """Fake LLM that gives its replies in order, then repeats the last one."""
+
+    replies: list = []
+    prompts: list = []
+
+    async def _agenerate(self, messages, *args, **kwargs):
+        self.prompts.append(messages)
+        self.response_text = self.replies[min(len(self.prompts), len(self.replies)) - 1]
+        return await super()._agenerate(messages, *args, **kwargs)
+
+
+def _parse_failures(stage: str) -> float:
+    return (
+        REGISTRY.get_sample_value("prompt_parse_failures_total", {"stage": stage}) or 0
+    )
+
+
+def test_invalid_structured_output_is_retried_with_the_error():
+    llm = ScriptedReplyChatModel(replies=["No sé.", DEFAULT_FAKE_RESPONSE], prompts=[])
+    service = PromptService(llm, output_mode="structured")
+    before = _parse_failures("structured_output")
+
+    response = asyncio.run(service.agenerate_response(QUERY))
+
+    assert response.detected_intent == Intent.BENEFITS
+    assert not response.parse_failed
+    assert len(llm.prompts) == STRUCTURED_OUTPUT_ATTEMPTS == 2
+    # The retry repeats the conversation and asks to respect the schema
+    retry = llm.prompts[1]
+    assert retry[:-1] == llm.prompts[0]
+    assert "no cumplió el esquema" in retry[-1].content
+    assert _parse_failures("structured_output") - before == 1
+
+
+def test_structured_output_invalid_twice_falls_back():
+    llm = ScriptedReplyChatModel(replies=["No sé."], prompts=[])
+    cache = ResponseCache()
+    service = PromptService(llm, output_mode="structured", response_cache=cache)
+    before = _parse_failures("structured_output")
+
+    response = asyncio.run(service.agenerate_response(QUERY))
+
+    assert response.parse_failed
+    assert response.detected_intent is None
+    assert response.response_text == "No pude procesar la estructura de la respuesta."
+    assert len(llm.prompts) == STRUCTURED_OUTPUT_ATTEMPTS
+    assert _parse_failures("structured_output") - before == STRUCTURED_OUTPUT_ATTEMPTS
+    # A failed answer is not served again
+    assert cache.get(QUERY.text, service.cache_namespace) is None
+
+
+def test_text_output_without_json_falls_back():
+    service = PromptService(FakeLatencyChatModel(response_text="No sé."))
+    before = _parse_failures("json_extraction")
+
+    response = asyncio.run(service.agenerate_response(QUERY))
+
+    assert response.parse_failed
+    assert response.detected_intent is None
+    assert _parse_failures("json_extraction") - before == 1
@@ -0,0 +1,154 @@
+"""Tests for the local k-NN Intent/Product classifier."""
+
+import asyncio
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from itti_backend.models.fintech_models import CustomerQuery, Intent, Product
+from itti_backend.services.fake_llm import FakeLatencyChatModel
+from itti_backend.services.prompt_service import PromptService
+from itti_backend.services.query_classifier import (
+    LABEL_COLUMNS,
+    KNNQueryClassifier,
+    build_query_classifier,
+)
+
+# One cluster of queries per pair of labels
+LABELS = [
+    (Intent.BENEFITS, Product.DEBIT_CARD),
+    (Intent.REQUIREMENTS, Product.LOAN),
+    (Intent.FEES_RATES, Product.CREDIT_CARD),
+]
+
+
+class StubEmbeddingModel:
+    """SentenceTransformer stand-in that looks up fixed embeddings by text."""
+
+    def __init__(self, vectors: dict[str, np.ndarray]):
+        self.vectors = vectors
+
+    def encode(self, texts, convert_to_numpy=True, normalize_embeddings=True):
+        return np.array([self.vectors[text] for text in texts])
+
+
+def labelled_clusters(size: int = 30, spread: float = 0.9, noise: float = 0.25):
+    """
+    Returns queries around one centre per label pair, and their embeddings.
+
+    A `noise` share of the queries carries the next cluster's labels.
+    """
+    rng = np.random.default_rng(0)
+    centres = rng.normal(size=(len(LABELS), 8))
+    rows, vectors = [], {}
+    for i in range(size):
+        cluster = i % len(LABELS)
+        vector = centres[cluster] + rng.normal(scale=spread, size=8)
+        text = f"consulta {i}"
+        vectors[text] = vector / np.linalg.norm(vector)
+        if rng.random() < noise:
+            cluster = (cluster + 1) % len(LABELS)
+        intent, product = LABELS[cluster]
+        rows.append((text, intent.value, product.value))
+    for cluster in range(len(LABELS)):
+        vectors[f"centro {cluster}"] = centres[cluster] / np.linalg.norm(
+            centres[cluster]
+        )
+    return pd.DataFrame(rows, columns=LABEL_COLUMNS), vectors
+
+
+def test_the_nearest_queries_vote_for_the_labels():
+    labelled, vectors = labelled_clusters(spread=0.3, noise=0.0)
+    classifier = KNNQueryClassifier(StubEmbeddingModel(vectors), labelled)
+
+    for cluster, (intent, product) in enumerate(LABELS):
+        classification = classifier.classify(f"centro {cluster}")
+        assert (classification.intent, classification.product) == (intent, product)
+        assert classifier.is_confident(classification)
+
+
+def test_noisy_labels_give_lower_confidence():
+    clean, vectors = labelled_clusters(spread=0.3, noise=0.0)
+    noisy, _ = labelled_clusters(spread=0.3, noise=0.4)
+    model = StubEmbeddingModel(vectors)
+
+    texts = [f"centro {cluster}" for cluster in range(len(LABELS))]
+    clean_confidence = [
+        c.confidence for c in KNNQueryClassifier(model, clean).classify_many(texts)
+    ]
+    noisy_confidence = [
+        c.confidence for c in KNNQueryClassifier(model, noisy).classify_many(texts)
+    ]
+    assert np.mean(noisy_confidence) < np.mean(clean_confidence)
+
+
+def test_a_training_query_can_be_scored_as_held_out():
+    labelled, vectors = labelled_clusters(spread=0.3, noise=0.0)
+    # One query carries labels its whole cluster disagrees with
+    labelled.loc[0, ["expected_intent", "expected_product"]] = [
+        Intent.OTHER.value,
+        Product.UNKNOWN.value,
+    ]
+    classifier = KNNQueryClassifier(StubEmbeddingModel(vectors), labelled, k=1)
+
+    assert classifier.classify("consulta 0").intent == Intent.OTHER
+    held_out = classifier.classify_many(["consulta 0"], exclude_same=True)[0]
+    assert (held_out.intent, held_out.product) == LABELS[0]
+
+
+def test_duplicated_queries_do_not_sharpen_the_calibration():
+    labelled, vectors = labelled_clusters()
+    model = StubEmbeddingModel(vectors)
+    duplicated = pd.concat([labelled, labelled], ignore_index=True)
+
+    plain = KNNQueryClassifier(model, labelled)
+    twice = KNNQueryClassifier(model, duplicated)
+
+    # Calibrated as they are scored (without their duplicates), the copies
+    # can't vouch for each other
+    for single, double in (
+        (plain.intent_calibration, twice.intent_calibration),
+        (plain.product_calibration, twice.product_calibration),
+    ):
+        temperature, prior = single
+        assert double[0] >= temperature
+        assert double[1] >= prior
+    assert twice.intent_calibration != (0.01, 0.01)
+
+
+def test_empty_training_data_is_rejected():
+    with pytest.raises(ValueError, match="needs labelled queries"):
+        KNNQueryClassifier(StubEmbeddingModel({}), pd.DataFrame(columns=LABEL_COLUMNS))
+
+
+def test_the_classifier_is_disabled_by_default(monkeypatch):
+    monkeypatch.delenv("QUERY_CLASSIFIER_ENABLED", raising=False)
+
+    assert build_query_classifier() is None
+
+
+@pytest.mark.parametrize(
+    ("classifier", "source"),
+    [("none", "llm"), ("confident", "local"), ("unsure", "llm")],
+)
+def test_routing_skips_the_llm_only_when_confident(classifier, source):
+    labelled, vectors = labelled_clusters(spread=0.3, noise=0.0)
+    vectors["¿Qué beneficios tiene la tarjeta de débito?"] = vectors["centro 0"]
+    query_classifier = {
+        "none": None,
+        "confident": KNNQueryClassifier(StubEmbeddingModel(vectors), labelled),
+        "unsure": KNNQueryClassifier(
+            StubEmbeddingModel(vectors), labelled, min_confidence=1.01
+        ),
+    }[classifier]
+    service = PromptService(FakeLatencyChatModel(), query_classifier=query_classifier)
+
+    route = asyncio.run(
+        service.aroute_query(
+            CustomerQuery(text="¿Qué beneficios tiene la tarjeta de débito?")
+        )
+    )
+
+    assert route.source == source
+    assert (route.intent, route.product) == LABELS[0]
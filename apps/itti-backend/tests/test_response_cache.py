@@ -0,0 +1,159 @@
+"""Tests for the exact + semantic ResponseCache."""
+
+import numpy as np
+import pytest
+
+from itti_backend.models.fintech_models import BotResponse, Intent, Product
+from itti_backend.services import response_cache
+from itti_backend.services.response_cache import ResponseCache, build_namespace
+
+NAMESPACE = build_namespace("system prompt", "model")
+
+# Unit vectors the stub embedder gives each query: the first two are
+# paraphrases (similarity 0.96), the third is another question (0.6)
+EMBEDDINGS = {
+    "¿Qué beneficios tiene la tarjeta de débito?": [1.0, 0.0],
+    "beneficios de la tarjeta debito": [0.96, 0.28],
+    "¿Cuál es la tasa del préstamo?": [0.6, 0.8],
+}
+
+
+class FakeClock:
+    """Stands in for the `time` module: `monotonic` only moves when told to."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+class StubEmbedder:
+    """SentenceTransformer-like model with fixed embeddings; counts its calls."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, text, convert_to_numpy=True, normalize_embeddings=True):
+        self.calls += 1
+        return np.array(EMBEDDINGS[text])
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(response_cache, "time", clock)
+    return clock
+
+
+def answer(text: str = "Respuesta") -> BotResponse:
+    return BotResponse(
+        original_query="¿Qué beneficios tiene la tarjeta de débito?",
+        response_text=text,
+        detected_intent=Intent.BENEFITS,
+        detected_product=Product.DEBIT_CARD,
+        confidence=0.9,
+    )
+
+
+def test_exact_hits_ignore_case_accents_and_punctuation(clock):
+    cache = ResponseCache()
+    cache.put("¿Qué beneficios tiene la tarjeta de débito?", NAMESPACE, answer(), 2.0)
+
+    hit = cache.get("que beneficios tiene la TARJETA de debito", NAMESPACE)
+
+    assert hit.response_text == "Respuesta"
+    assert hit.original_query == "que beneficios tiene la TARJETA de debito"
+    assert cache.get("¿Qué beneficios tiene la tarjeta?", NAMESPACE) is None
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = ResponseCache(max_entries=2)
+    cache.put("uno", NAMESPACE, answer("1"), 1.0)
+    cache.put("dos", NAMESPACE, answer("2"), 1.0)
+    cache.get("uno", NAMESPACE)  # "dos" is now the least recently used
+
+    cache.put("tres", NAMESPACE, answer("3"), 1.0)
+
+    assert cache.get("dos", NAMESPACE) is None
+    assert cache.get("uno", NAMESPACE).response_text == "1"
+    assert cache.get("tres", NAMESPACE).response_text == "3"
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = ResponseCache(ttl_seconds=60)
+    cache.put("uno", NAMESPACE, answer(), 1.0)
+
+    clock.now += 60
+    assert cache.get("uno", NAMESPACE) is not None
+    clock.now += 1
+    assert cache.get("uno", NAMESPACE) is None
+    assert cache.get_stats()["entries"] == 0
+
+
+def test_semantic_hits_respect_the_threshold(clock):
+    embedder = StubEmbedder()
+    cache = ResponseCache(embedding_model=embedder, similarity_threshold=0.95)
+    cache.put("¿Qué beneficios tiene la tarjeta de débito?", NAMESPACE, answer(), 2.0)
+
+    hit = cache.get("beneficios de la tarjeta debito", NAMESPACE)
+    assert hit.response_text == "Respuesta"
+    assert hit.original_query == "beneficios de la tarjeta debito"
+    assert cache.get("¿Cuál es la tasa del préstamo?", NAMESPACE) is None
+    # An exact hit never runs the embedding model
+    calls = embedder.calls
+    cache.get("¿Qué beneficios tiene la tarjeta de débito?", NAMESPACE)
+    assert embedder.calls == calls
+
+
+def test_expired_entries_are_not_semantic_hits(clock):
+    cache = ResponseCache(ttl_seconds=60, embedding_model=StubEmbedder())
+    cache.put("¿Qué beneficios tiene la tarjeta de débito?", NAMESPACE, answer(), 2.0)
+
+    clock.now += 61
+    assert cache.get("beneficios de la tarjeta debito", NAMESPACE) is None
+
+
+def test_a_hit_is_a_copy(clock):
+    cache = ResponseCache()
+    cache.put("uno", NAMESPACE, answer(), 1.0)
+
+    cache.get("uno", NAMESPACE).response_text = "Modificada"
+
+    assert cache.get("uno", NAMESPACE).response_text == "Respuesta"
+
+
+def test_namespaces_separate_models_and_prompts(clock):
+    cache = ResponseCache(embedding_model=StubEmbedder())
+    other_model = build_namespace("system prompt", "other-model")
+    other_prompt = build_namespace("another system prompt", "model")
+    cache.put("¿Qué beneficios tiene la tarjeta de débito?", NAMESPACE, answer(), 2.0)
+
+    assert len({NAMESPACE, other_model, other_prompt}) == 3
+    assert build_namespace("system prompt", "model") == NAMESPACE
+    for namespace in (other_model, other_prompt):
+        assert (
+            cache.get("¿Qué beneficios tiene la tarjeta de débito?", namespace) is None
+        )
+        assert cache.get("beneficios de la tarjeta debito", namespace) is None
+
+
+def test_stats_count_hits_misses_and_latency_saved(clock):
+    cache = ResponseCache(embedding_model=StubEmbedder())
+    cache.put("¿Qué beneficios tiene la tarjeta de débito?", NAMESPACE, answer(), 2.0)
+
+    cache.get("¿Qué beneficios tiene la tarjeta de débito?", NAMESPACE)
+    cache.get("beneficios de la tarjeta debito", NAMESPACE)
+    cache.get("¿Cuál es la tasa del préstamo?", NAMESPACE)
+
+    assert cache.get_stats() == {
+        "exact_hits": 1,
+        "semantic_hits": 1,
+        "misses": 1,
+        "latency_saved_seconds": 4.0,
+        "entries": 1,
+        "hit_rate": pytest.approx(2 / 3),
+    }
+    cache.clear()
+    assert cache.get_stats()["entries"] == 0
+    assert cache.get_stats()["exact_hits"] == 1
@@ -0,0 +1,130 @@
+"""Tests for request coalescing (SingleFlight) and its use by PromptService."""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from itti_backend.core.singleflight import SingleFlight
+from itti_backend.models.fintech_models import CustomerQuery
+from itti_backend.services.fake_llm import FakeLatencyChatModel
+from itti_backend.services.prompt_service import PromptService
+
+
+class CountingChatModel(FakeLatencyChatModel):
+    """Fake chat model that counts the calls it answers."""
+
+    calls: int = 0
+
+    async def _agenerate(self, *args: Any, **kwargs: Any):
+        self.calls += 1
+        return await super()._agenerate(*args, **kwargs)
+
+
+def test_concurrent_threads_share_one_call():
+    flights = SingleFlight("test")
+    calls = 0
+    started = threading.Event()
+
+    def slow():
+        nonlocal calls
+        calls += 1
+        started.set()
+        time.sleep(0.1)
+        return "ok"
+
+    with ThreadPoolExecutor(4) as pool:
+        leader = pool.submit(flights.do, "key", slow)
+        started.wait(1)
+        followers = [pool.submit(flights.do, "key", slow) for _ in range(3)]
+        results = [leader.result()] + [f.result() for f in followers]
+
+    assert results == ["ok"] * 4
+    assert calls == 1
+
+
+def test_errors_are_raised_in_every_caller():
+    flights = SingleFlight("test")
+
+    async def fail():
+        await asyncio.sleep(0.05)
+        raise RuntimeError("upstream error")
+
+    async def burst():
+        return await asyncio.gather(
+            *(flights.ado("key", fail) for _ in range(3)), return_exceptions=True
+        )
+
+    results = asyncio.run(burst())
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_cancelled_leader_leaves_the_call_to_the_others():
+    flights = SingleFlight("test")
+    calls = 0
+
+    async def slow():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    async def scenario():
+        leader = asyncio.create_task(flights.ado("key", slow))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flights.ado("key", slow))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(scenario()) == "ok"
+    assert calls == 1
+
+
+def test_abandoned_call_is_cancelled():
+    flights = SingleFlight("test")
+
+    async def scenario():
+        only = asyncio.create_task(flights.ado("key", asyncio.sleep, 1))
+        await asyncio.sleep(0)
+        only.cancel()
+        await asyncio.gather(only, return_exceptions=True)
+
+    asyncio.run(scenario())
+
+    assert not flights._flights
+
+
+def test_disabled_flight_calls_upstream_every_time():
+    flights = SingleFlight("test", enabled=False)
+    calls = 0
+
+    async def call():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+
+    async def burst():
+        await asyncio.gather(*(flights.ado("key", call) for _ in range(3)))
+
+    asyncio.run(burst())
+
+    assert calls == 3
+
+
+def test_identical_chat_queries_share_one_llm_call():
+    llm = CountingChatModel(latency=0.05)
+    service = PromptService(llm_client=llm)
+    query = CustomerQuery(text="¿Qué beneficios tiene la tarjeta de débito?")
+
+    async def burst():
+        return await asyncio.gather(
+            *(service.agenerate_response(query) for _ in range(16))
+        )
+
+    responses = asyncio.run(burst())
+
+    assert llm.calls == 1
+    assert all(r.detected_intent is not None for r in responses)